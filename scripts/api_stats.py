@@ -0,0 +1,72 @@
+"""Consolidated GitHub stars / GHCR pulls store.
+
+All apps' API stats live in one file, apps/_stats.json, written atomically by
+update_api_data.py and loaded once by the site generator:
+
+    {
+      "cert-manager": {
+        "stars": {"gh_stars": 13793, "updated": "2026-05-07T13:28:46Z", "etag": "..."},
+        "pulls": {"gh_pulls": 378, "updated": "2026-05-07T13:30:59Z"}
+      }
+    }
+
+It replaces the per-app stars.yaml / pulls.yaml files; `migrate()` imports those.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import fsutil
+import yaml
+
+CATALOG_ROOT = Path(__file__).parent.parent
+APPS_DIR = CATALOG_ROOT / "apps"
+STATS_FILE = APPS_DIR / "_stats.json"
+
+# kind -> legacy per-app file
+LEGACY_FILES = {"stars": "stars.yaml", "pulls": "pulls.yaml"}
+
+
+def load(path: Path = STATS_FILE) -> dict:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(stats: dict, path: Path = STATS_FILE):
+    data = json.dumps(stats, indent=2, sort_keys=True) + "\n"
+    fsutil.write_atomic(path, data.encode())
+
+
+def get(stats: dict, app: str, kind: str) -> dict:
+    """The app's stats of one kind ("stars" or "pulls"), {} if unknown."""
+    return stats.get(app, {}).get(kind, {})
+
+
+def put(stats: dict, app: str, kind: str, entry: dict):
+    stats.setdefault(app, {})[kind] = entry
+
+
+def migrate(apps_dir: Path = APPS_DIR, path: Path = STATS_FILE) -> int:
+    """Import per-app stars.yaml / pulls.yaml into the store and delete them. Returns files imported.
+
+    An entry already in the store is only replaced by a newer legacy file.
+    """
+    stats = load(path)
+    imported = []
+    for app_dir in sorted(p for p in apps_dir.iterdir() if p.is_dir()):
+        for kind, fname in LEGACY_FILES.items():
+            legacy = app_dir / fname
+            if not legacy.exists():
+                continue
+            with open(legacy) as f:
+                entry = yaml.safe_load(f) or {}
+            if str(entry.get("updated", "")) >= str(get(stats, app_dir.name, kind).get("updated", "")):
+                put(stats, app_dir.name, kind, entry)
+            imported.append(legacy)
+    save(stats, path)
+    for legacy in imported:
+        os.unlink(legacy)
+    return len(imported)
@@ -1,14 +1,19 @@
 import yaml
 import argparse
+import concurrent.futures
 from jinja2 import Template
 import os
 import subprocess
 import pathlib
-import re
 import json
-import sys
 import shutil
 import utils
+import helm_cache
+import helm_index
+import helm_repos
+import http_pool
+import manifests
+import oci_client
 
 
 def _semver_parts(version: str):
@@ -51,6 +56,7 @@ def try_generate_lock_file(chart_dir: str) -> bool:
     subprocess.run(["helm", "dependency", "update", str(chart_path)], check=True)
     if not lock_file.exists():
         raise RuntimeError("helm dependency update ran, but Chart.lock was not created")
+    helm_cache.store_dependencies(chart_path)
     return True
 
 
@@ -136,8 +142,9 @@ def write_charts_info(app: str, s: str) -> dict:
         file.write(s)
 
 
-def prune_old_patches(app: str, charts: list) -> list:
-    """Keep only the latest patch per (dep_name, major, minor). Remove chart dirs for pruned versions."""
+def prune_old_patches(app: str, charts: list, remove_dirs: bool = True) -> list:
+    """Keep only the latest patch per (dep_name, major, minor). Remove chart dirs for pruned versions
+    unless remove_dirs is False."""
     best = {}
     for chart in charts:
         sv = _semver_parts(chart['version'])
@@ -158,6 +165,8 @@ def prune_old_patches(app: str, charts: list) -> list:
             pruned.append(chart)
         else:
             print(f"Pruning superseded patch version: {chart['dep_name']} {chart['version']}")
+            if not remove_dirs:
+                continue
             chart_dir = f"apps/{app}/charts/{chart['name']}-{chart['version']}"
             if os.path.isdir(chart_dir):
                 shutil.rmtree(chart_dir)
@@ -165,31 +174,34 @@ def prune_old_patches(app: str, charts: list) -> list:
     return pruned
 
 
-def update_charts_cfg(args: str, updates_list: list, cfg: dict):
-    if len(updates_list) > 0 and args.update_cfg:
-        cfg['st-charts'].extend(updates_list)
-        cfg['st-charts'] = prune_old_patches(args.app, cfg['st-charts'])
+def update_charts_cfg(args: str, updates_list: list, cfg: dict) -> list:
+    """Add updates to st-charts.yaml and prune superseded patches. Returns the pruned charts.
+
+    Without --update-cfg nothing is written, the charts that would be pruned are still returned."""
+    if len(updates_list) == 0:
+        return []
+    before = cfg['st-charts'] + updates_list
+    kept = prune_old_patches(args.app, before, remove_dirs=args.update_cfg)
+    if args.update_cfg:
+        cfg['st-charts'] = kept
         output = yaml.dump(cfg, sort_keys=False)
         print(output)
         write_charts_cfg(args.app, output)
+    return [chart for chart in before if not any(chart is k for k in kept)]
 
 
-def check_updates(args: str):
-    cfg = read_charts_cfg(args.app, allow_return_none=True)
-    if cfg is None:
-        print('Charts config not found.')
-        return
+def find_updates(cfg: dict, index_client) -> tuple[list, dict]:
     last_deps = get_last_deps(cfg)
     updates_list = []
     updates_dict = {}
     for chart, data in last_deps.items():
-        if not data['repository'].startswith("https"):
+        if not data['repository'].startswith(("http://", "https://")):
             print(f"Unsupported repo '{data['repository']}' to automatically check updates, skipping.")
             continue
-        subprocess.run(["helm", "repo", "add", chart, data['repository']], check=True)
-        subprocess.run(["helm", "repo", "update"], check=True)
-        result = subprocess.run(["helm", "show", "chart", f"{chart}/{chart}"], check=True, capture_output=True, text=True)
-        up_to_date_chart = yaml.safe_load(result.stdout)
+        latest = index_client.latest(data['repository'], chart)
+        if latest is None:
+            raise RuntimeError(f"Chart '{chart}' not found in {data['repository']}/index.yaml")
+        up_to_date_chart = {'version': latest['version']}
         print(f"Last version found: {up_to_date_chart['version']}")
         try_ignore_prefix_v(up_to_date_chart, data['version'])
         if up_to_date_chart['version'] != data['version']:
@@ -198,12 +210,104 @@ def check_updates(args: str):
             item['version'] = up_to_date_chart['version']
             updates_list.append(item)
             updates_dict[item['name']] = item
-        subprocess.run(["helm", "repo", "remove", chart], check=True)
-    update_charts_cfg(args, updates_list, cfg)
+    return updates_list, updates_dict
+
+
+def apply_updates(args, cfg: dict, updates_list: list, updates_dict: dict) -> list:
+    pruned = update_charts_cfg(args, updates_list, cfg)
     if args.generate_charts:
         generate(args)
-    if args.update_example:
+    if args.update_example and os.path.exists(f"apps/{args.app}/example/Chart.yaml"):
         update_example_chart(args, updates_dict)
+    return pruned
+
+
+def check_updates(args: str):
+    if args.all:
+        check_updates_all(args)
+        return
+    if not args.app:
+        raise SystemExit("check-updates: app name or --all required")
+    cfg = read_charts_cfg(args.app, allow_return_none=True)
+    if cfg is None:
+        print('Charts config not found.')
+        return
+    updates_list, updates_dict = find_updates(cfg, helm_index.default_client())
+    apply_updates(args, cfg, updates_list, updates_dict)
+
+
+def prefetch_indexes(repositories: list, index_client, jobs: int) -> dict:
+    """Fetch every repository index once, concurrently. Returns {repository: error} for failures."""
+    errors = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(index_client.entries, repo): repo for repo in repositories}
+        for future in concurrent.futures.as_completed(futures):
+            repo = futures[future]
+            try:
+                future.result()
+            except (*http_pool.ERRORS, yaml.YAMLError, ValueError) as e:
+                print(f"::warning::Failed to fetch index for {repo}: {e}")
+                errors[repo] = str(e)
+    return errors
+
+
+def check_updates_all(args):
+    """Check updates for every app with st-charts.yaml in one pass and write a summary of pending bumps."""
+    cfgs = {}
+    for app in sorted(os.listdir("apps")):
+        cfg = read_charts_cfg(app, allow_return_none=True)
+        if cfg is not None:
+            cfgs[app] = cfg
+
+    repo_apps = {}
+    for app, cfg in cfgs.items():
+        for data in get_last_deps(cfg).values():
+            if data['repository'].startswith(("http://", "https://")):
+                repo_apps.setdefault(data['repository'].rstrip('/'), set()).add(app)
+    print(f"Checking {len(cfgs)} apps across {len(repo_apps)} repositories...")
+
+    index_client = helm_index.default_client()
+    repo_errors = prefetch_indexes(sorted(repo_apps), index_client, args.jobs)
+
+    summary = {'updates': [], 'pruned': [], 'errors': []}
+    for app, cfg in cfgs.items():
+        print(f"==> {app}")
+        app_args = argparse.Namespace(**{**vars(args), 'app': app})
+        try:
+            updates_list, updates_dict = find_updates(cfg, index_client)
+            current = get_last_deps(cfg)
+            for item in updates_list:
+                summary['updates'].append({
+                    'app': app, 'chart': item['name'], 'dep_name': item['dep_name'], 'repository': item['repository'],
+                    'current': str(current[item['dep_name']]['version']), 'latest': str(item['version'])})
+            for chart in apply_updates(app_args, cfg, updates_list, updates_dict):
+                summary['pruned'].append({'app': app, 'chart': chart['name'], 'version': str(chart['version'])})
+        except Exception as e:  # noqa: BLE001 - one app's failure must not hide the other apps' updates
+            print(f"::error::{app}: {e}")
+            failed_repos = [r for r, apps in repo_apps.items() if app in apps and r in repo_errors]
+            summary['errors'].append({'app': app, 'error': str(e), 'repositories': failed_repos})
+
+    summary['apps'] = sorted({item['app'] for item in summary['updates']})
+    output = json.dumps(summary, indent=2)
+    if args.summary:
+        with open(args.summary, "w", encoding='utf-8') as f:
+            f.write(output + "\n")
+        print(f"Summary written to {args.summary}")
+    else:
+        print(output)
+    print(f"{len(summary['updates'])} pending updates in {len(summary['apps'])} apps, {len(summary['errors'])} errors")
+
+
+def read_chart_info(repository: str, chart: str, version: str) -> dict:
+    """Chart version metadata: from the repository index for HTTP repos, from the chart tarball for OCI."""
+    if repository.startswith("http"):
+        entry = helm_index.default_client().get(repository, chart, version)
+        if entry is not None:
+            return entry
+    tgz = helm_cache.fetch_chart(repository, chart, version)
+    if tgz is None:
+        raise RuntimeError(f"Unable to fetch chart {chart}:{version} from {repository}")
+    return helm_cache.read_chart_metadata(tgz)
 
 
 def generate_charts_info(app: str, cfg: dict, rewrite: bool):
@@ -215,22 +319,9 @@ def generate_charts_info(app: str, cfg: dict, rewrite: bool):
         print(f"{charts_file} already exists!")
         return
     deps = cfg['st-charts']
-    repos = dict()
     out_charts = dict()
     for data in deps:
-        repo = data['dep_name']
-        if data['repository'].startswith("http") and data['repository'] not in repos:
-            repo_name = repo
-            subprocess.run(["helm", "repo", "add", repo_name, data['repository']], check=True)
-            subprocess.run(["helm", "repo", "update"], check=True)
-            repos[data['repository']] = repo_name
-        elif data['repository'].startswith("oci"):
-            repo_name = data['repository']
-        else:
-            repo_name = repos.get(data['repository'])
-        args = ["helm", "show", "chart", f"{repo_name}/{repo}", "--version", data['version']]
-        result = subprocess.run(args, check=True, capture_output=True, text=True)
-        up_to_date_chart = yaml.safe_load(result.stdout)
+        up_to_date_chart = read_chart_info(data['repository'], data['dep_name'], str(data['version']))
         name = data['name']
         out_chart = dict(
             version=str(data['version']),
@@ -240,63 +331,66 @@ def generate_charts_info(app: str, cfg: dict, rewrite: bool):
         if name not in out_charts:
             out_charts[name] = []
         out_charts[name].append(out_chart)
-    for _, repo in repos.items():
-        subprocess.run(["helm", "repo", "remove", repo], check=True)
     output = yaml.dump(dict(charts=out_charts), sort_keys=False)
     print(output)
     write_charts_info(app, output)
 
 
-def check_image_arch(image: str):
+def check_image_arch(image: str, platforms: list | None):
     print(f"- {image} ", end="")
-    args = ["crane", "manifest", image]
-    manifest = bash_cmd_run(args)
-    if manifest is None:
+    if platforms is None:
+        print("(manifest unavailable)")
         return
-    manifest_dict = json.loads(manifest.stdout)
-    if "manifests" not in manifest_dict:
-        print(f"::warning::No manifest found for '{image}'!")
-        return
-    archs = []
-    for item in manifest_dict['manifests']:
-        archs.append(item.get('platform', {}).get('architecture', ''))
+    archs = [p.split('/')[1] if '/' in p else p for p in platforms]
     for required_arch in ["amd64", "arm64"]:
         if required_arch not in archs:
             print(f"\n::warning::Required architecture '{required_arch}' not found for image '{image}'")
     print(f"({', '.join(archs)})")
 
 
-def bash_cmd_run(args: list, check: bool = True, capture_output: bool = True, text: bool = True):
-    try:
-        result = subprocess.run(args, check=check, capture_output=capture_output, text=text)
-        return result
-    except subprocess.CalledProcessError as e:
-        print(f"Running: {' '.join(args)}")
-        print("Command failed!")
-        print("Return code:", e.returncode)
-        print("Command:", e.cmd)
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr, file=sys.stderr)
-        return None
+def fetch_image_platforms(images: list, jobs: int) -> dict:
+    """Inspect image manifests concurrently. Returns {image: [platform, ...] or None on failure}."""
+    client = oci_client.OCIClient()
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(client.platforms, image): image for image in images}
+        for future in concurrent.futures.as_completed(futures):
+            image = futures[future]
+            try:
+                results[image] = future.result()
+            except (*http_pool.ERRORS, ValueError, KeyError) as e:
+                print(f"::warning::Unable to inspect manifest of '{image}': {e}")
+                results[image] = None
+    return results
+
+
+def get_chart_images(app: str) -> list:
+    example_chart = pathlib.Path(f"apps/{app}/example")
+    rendered_path = helm_cache.render_chart(example_chart)
+    if rendered_path is None:
+        return []
+    return manifests.extract_images(rendered_path)
 
 
 def check_images(args: str):
-    app = args.app
-    example_chart = f"apps/{app}/example"
-    args_build = ["helm", "dependency", "build", example_chart]
-    bash_cmd_run(args_build)
-    args = ["helm", "template", "chart", example_chart]
-    result = bash_cmd_run(args)
-    if result is None:
-        return
-    image_regex = r'(?:[a-zA-Z0-9\-_.]+(?:[.:][a-zA-Z0-9\-_.]+)?\/)?[a-zA-Z0-9\-_.]+(?:\/[a-zA-Z0-9\-_.]+)*(?::[a-zA-Z0-9\-_.]+)'
-    matches = re.findall(r'image:\s*["\']?(' + image_regex + r')["\']?', result.stdout)
-    images = sorted(set(filter(lambda x: "{{" not in x and "}}" not in x, matches)))
-    if len(images) == 0:
-        return
-    print(f"{len(images)} images found:")
-    for image in images:
-        check_image_arch(image)
+    if args.all:
+        apps = sorted(app for app in os.listdir("apps") if os.path.exists(f"apps/{app}/example/Chart.yaml"))
+    elif args.app:
+        apps = args.app
+    else:
+        raise SystemExit("check-images: app name(s) or --all required")
+    with helm_repos.RepoSession(helm_repos.collect_repositories(apps)):
+        app_images = {app: get_chart_images(app) for app in apps}
+    all_images = sorted({image for images in app_images.values() for image in images})
+    platforms = fetch_image_platforms(all_images, args.jobs)
+    for app, images in app_images.items():
+        if len(images) == 0:
+            continue
+        if len(apps) > 1:
+            print(f"==> {app}")
+        print(f"{len(images)} images found:")
+        for image in images:
+            check_image_arch(image, platforms[image])
 
 
 if __name__ == '__main__':
@@ -311,7 +405,13 @@ if __name__ == '__main__':
     show.set_defaults(func=generate)
 
     check_upd = subparsers.add_parser("check-updates", help="Generate charts from config")
-    check_upd.add_argument("app")
+    check_upd.add_argument("app", nargs="?")
+    check_upd.add_argument("--all", "-a", action="store_true", default=False,
+                        help="Check all apps in one run, fetching each repository index once")
+    check_upd.add_argument("--summary", "-s", default=None,
+                        help="With --all: write a JSON summary of pending updates to this file")
+    check_upd.add_argument("--jobs", "-j", type=int, default=8,
+                        help="With --all: number of repository indexes fetched concurrently")
     check_upd.add_argument("--update-cfg", "-u", action="store_true", default=False,
                         help="Update app 'st-charts.yaml' config")
     check_upd.add_argument("--generate-charts", "-g", action="store_true", default=False,
@@ -322,8 +422,12 @@ if __name__ == '__main__':
                         help="Rewrite existing 'charts.yaml' config")
     check_upd.set_defaults(func=check_updates)
 
-    check_images_parser = subparsers.add_parser("check-images", help="Generate charts from config")
-    check_images_parser.add_argument("app")
+    check_images_parser = subparsers.add_parser("check-images", help="Check example chart images architectures")
+    check_images_parser.add_argument("app", nargs="*")
+    check_images_parser.add_argument("--all", "-a", action="store_true", default=False,
+                                     help="Check images of all apps with an example chart")
+    check_images_parser.add_argument("--jobs", "-j", type=int, default=16,
+                                     help="Number of image manifests inspected concurrently")
     check_images_parser.set_defaults(func=check_images)
 
     args = parser.parse_args()
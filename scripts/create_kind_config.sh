@@ -20,3 +20,10 @@ done
 for _ in $(seq 1 "$WORKERS"); do
   echo "- role: worker" >> kind-config.yaml
 done
+
+cat <<EOF >> kind-config.yaml
+containerdConfigPatches:
+  - |-
+    [plugins."io.containerd.grpc.v1.cri".registry]
+      config_path = "/etc/containerd/certs.d"
+EOF
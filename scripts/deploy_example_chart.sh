@@ -2,10 +2,11 @@
 set -euo pipefail
 
 chart=apps/$APP/example
-helm dependency build "$chart"
+python3 ./scripts/helm_cache.py build-deps "$chart"
 
 ns=$(./scripts/get_mcs_namespace.sh)
 KUBECONFIG="kcfg_$TEST_MODE" helm upgrade --install "$APP" "$chart" -n "$ns" --create-namespace
 
-wfd=$(python3 ./scripts/utils.py get-wait-for-pods "$APP")
-WAIT_FOR_PODS=$wfd NAMESPACE=$ns ./scripts/wait_for_deployment.sh
+test_env=$(python3 ./scripts/utils.py test-env "$APP")
+eval "$test_env"
+WAIT_FOR_PODS=$WAIT_FOR_PODS NAMESPACE=$ns ./scripts/wait_for_deployment.sh
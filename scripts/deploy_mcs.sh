@@ -3,19 +3,20 @@ set -euo pipefail
 
 ./scripts/ensure_mcs_config.sh
 
+if [[ "${PRELOAD_IMAGES:-}" == "true" ]]; then
+    python3 ./scripts/image_cache.py preload "$APP" --kind-load "${PRELOAD_KIND_CLUSTER:-adopted}"
+fi
+
 kubectl apply -f apps/"$APP"/mcs.yaml
 
-wfd=$(python3 ./scripts/utils.py get-wait-for-pods "$APP")
-wfr=$(python3 ./scripts/utils.py get-wait-for-running "$APP")
-wfc=$(python3 ./scripts/utils.py get-wait-for-creating "$APP")
+test_env=$(python3 ./scripts/utils.py test-env "$APP")
+eval "$test_env"
 ns=$(./scripts/get_mcs_namespace.sh)
 
 check_clusters() {
   for test_mode in ${TEST_MODE//,/ }; do
     (
-        export WAIT_FOR_PODS=$wfd
-        export WAIT_FOR_RUNNING=$wfr
-        export WAIT_FOR_CREATING=$wfc
+        export WAIT_FOR_PODS WAIT_FOR_RUNNING WAIT_FOR_CREATING
         export NAMESPACE=$ns
         # shellcheck disable=SC2030
         export TEST_MODE=$test_mode
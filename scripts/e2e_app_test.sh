@@ -1,31 +1,26 @@
 #!/bin/bash
 
-# .medium:
-# Batch 1: ./scripts/e2e_app_test.sh ingress-nginx dex kyverno velero cert-manager external-secrets
-# Batch 2: ./scripts/e2e_app_test.sh tika arangodb argo-cd cadvisor ceph clearml cloudcasa cluster-autoscaler
-# Batch 3: ./scripts/e2e_app_test.sh envoy-gateway external-dns falco
-# Batch 4: ./scripts/e2e_app_test.sh finops-agent flux-operator gatekeeper grafana
-# Batch 5: ./scripts/e2e_app_test.sh harbor harness headlamp hpe-csi
-# Batch 6: ./scripts/e2e_app_test.sh istio istio-ambient jenkins jupyterhub
-# Batch 7: ./scripts/e2e_app_test.sh kagent keda knative kube-prometheus-stack kubecost
-# Batch 8: ./scripts/e2e_app_test.sh kubeflow-spark-operator kuberay kyverno-guardrails
-# Batch 9: ./scripts/e2e_app_test.sh local-ai metallb milvus minio mirantis-kyverno-guardrails
-# Batch 10: ./scripts/e2e_app_test.sh mirantis-velero mlflow mongodb msr mysql
-# Batch 11: ./scripts/e2e_app_test.sh n8n nats netapp nginx-ingress-f5 nirmata
-# Batch 12: ./scripts/e2e_app_test.sh node-feature-discovery nvidia opencost
-# Batch 13: ./scripts/e2e_app_test.sh penpot postgresql postgresql-operator prometheus pure
-# Batch 14: ./scripts/e2e_app_test.sh qdrant rabbitmq redis stacklight strimzi-kafka-operator
-# Batch 15: ./scripts/e2e_app_test.sh teleport tetrate-istio valkey
-# Batch 16: ./scripts/e2e_app_test.sh victoriametrics wandb
-# .xlarge
-# Batch 17: ./scripts/e2e_app_test.sh elasticsearch open-webui
-# .2xlarge
-# Batch 18: ./scripts/e2e_app_test.sh gitlab kserve
+# Usage:
+#   ./scripts/e2e_app_test.sh APP1 [APP2 ...]
+#   ./scripts/e2e_app_test.sh --shard i/N [APP1 ...]   # i-th of N duration-balanced batches (default: all apps)
+#
+# Batches are planned by scripts/shard.py from durations recorded by previous runs:
+#   python3 ./scripts/shard.py plan --kind e2e --shards 16
+# Apps needing bigger instances declare `test_instance_size` (xlarge, 2xlarge) in data.yaml;
+# plan them separately. To test several apps at once on one cluster, see scripts/e2e_parallel.py.
 
 set -euo pipefail
 
+if [ "${1:-}" == "--shard" ]; then
+  shard="${2:?Usage: $0 --shard i/N [APP1 ...]}"
+  shift 2
+  mapfile -t shard_apps < <(python3 ./scripts/shard.py apps --kind e2e --shard "$shard" "$@")
+  set -- "${shard_apps[@]}"
+  echo "Shard $shard: $*"
+fi
+
 if [ $# -eq 0 ]; then
-  echo "Usage: $0 APP1 [APP2 ...]"
+  echo "Usage: $0 APP1 [APP2 ...] | $0 --shard i/N [APP1 ...]"
   exit 1
 fi
 
@@ -41,9 +36,11 @@ count=0
 for app in "$@"; do
   count=$((count + 1))
   echo "Testing end 2 end '$app' in '$TEST_MODE' [$count/$total]"
+  started=$SECONDS
   APP="$app" ./scripts/install_servicetemplates.sh
   APP="$app" ./scripts/deploy_mcs.sh
   APP="$app" ./scripts/remove_mcs.sh
+  python3 ./scripts/shard.py record e2e "$app" $((SECONDS - started))
 
   echo "✅ '$app' tested end 2 end (✅ installed, ✅ deployed, ✅ removed) [$count/$total]"
 done
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Run e2e app tests concurrently on one management cluster.
+
+Every app is tested as in e2e_app_test.sh (install_servicetemplates.sh ->
+deploy_mcs.sh -> remove_mcs.sh), each with its own MultiClusterService and
+namespace, but several apps run at the same time. An app only runs on a
+cluster whose workers are at least the instance size it declares in data.yaml
+(`test_instance_size`, default: medium). Apps are packed onto the test cluster
+by the memory they request (`test_memory` in GiB, default: half of their
+instance size), longest recorded run first, and the number of concurrent apps
+is capped by the cluster size. Apps deploying into the same namespace never
+overlap, and service template installs are serialized because apps share kgst
+releases.
+
+Per-app logs and a JSON report with per-step timings and status are written
+to the report directory; successful runs are recorded for shard.py.
+
+Usage:
+    python3 scripts/e2e_parallel.py dex kyverno external-dns                 # on a medium worker
+    python3 scripts/e2e_parallel.py --cluster-size xlarge --workers 2 APP...
+    python3 scripts/e2e_parallel.py --shard 2/4 --cluster-size large         # apps of one shard.py shard
+    python3 scripts/e2e_parallel.py --dry-run APP...                         # show requests and namespaces only
+
+Environment variables:
+    TEST_MODE - test cluster(s), passed to the test scripts as for e2e_app_test.sh
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import shard
+import yaml
+
+ROOT_DIR = Path(__file__).parent.parent
+APPS_DIR = ROOT_DIR / "apps"
+
+# Instance size -> memory in GiB (AWS t3/t4g family, each size doubles the previous one)
+SIZES = {"small": 2, "medium": 4, "large": 8, "xlarge": 16, "2xlarge": 32}
+DEFAULT_SIZE = "medium"
+# Memory an app requests when data.yaml does not say: the instance size fits two such apps
+DEFAULT_MEMORY_SHARE = 0.5
+# Cluster size -> apps tested at once on one worker of that size
+MAX_CONCURRENCY = {"small": 1, "medium": 2, "large": 3, "xlarge": 4, "2xlarge": 6}
+
+STEPS = (
+    ("install", "./scripts/install_servicetemplates.sh"),
+    ("deploy", "./scripts/deploy_mcs.sh"),
+    ("remove", "./scripts/remove_mcs.sh"),
+)
+
+
+# ---------------------------------------------------------------------------
+# App requirements
+# ---------------------------------------------------------------------------
+
+def _load_yaml(path: Path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def app_size(app: str) -> str:
+    size = _load_yaml(APPS_DIR / app / "data.yaml").get("test_instance_size", DEFAULT_SIZE)
+    if size not in SIZES:
+        raise ValueError(f"{app}: unknown test_instance_size '{size}', expected one of {', '.join(SIZES)}")
+    return size
+
+
+def app_memory(app: str, size: str) -> float:
+    """Memory in GiB the app's test is packed by."""
+    memory = _load_yaml(APPS_DIR / app / "data.yaml").get("test_memory", SIZES[size] * DEFAULT_MEMORY_SHARE)
+    if not isinstance(memory, int | float) or not 0 < memory <= SIZES[size]:
+        raise ValueError(f"{app}: test_memory must be a number of GiB up to its {size} instance size ({SIZES[size]})")
+    return memory
+
+
+def app_namespaces(app: str) -> set[str]:
+    """Namespaces the app's MultiClusterService deploys into."""
+    mcs_file = APPS_DIR / app / "mcs.yaml"
+    if mcs_file.exists():
+        services = _load_yaml(mcs_file).get("spec", {}).get("serviceSpec", {}).get("services") or []
+        return {s["namespace"] for s in services if s.get("namespace")}
+    namespace = _load_yaml(APPS_DIR / app / "data.yaml").get("test_namespace", app)
+    chart = _load_yaml(APPS_DIR / app / "example" / "Chart.yaml")
+    return {namespace} | {dep["mcs_namespace"] for dep in chart.get("dependencies") or [] if "mcs_namespace" in dep}
+
+
+# ---------------------------------------------------------------------------
+# Running
+# ---------------------------------------------------------------------------
+
+class AppRun:
+    def __init__(self, app: str, size: str, memory: float, namespaces: set[str], estimate: float, report_dir: Path):
+        self.app = app
+        self.size = size
+        self.memory = memory
+        self.namespaces = namespaces
+        self.estimate = estimate
+        self.log = report_dir / f"{app}.log"
+        self.status = "pending"
+        self.failed_step = None
+        self.steps = {}  # step -> seconds
+        self.started = None
+        self.duration = None
+
+    def report(self) -> dict:
+        return {
+            "app": self.app,
+            "status": self.status,
+            "failed_step": self.failed_step,
+            "size": self.size,
+            "memory": self.memory,
+            "namespaces": sorted(self.namespaces),
+            "duration": self.duration,
+            "steps": self.steps,
+            "log": str(self.log),
+        }
+
+
+def run_app(run: AppRun, install_lock: threading.Lock) -> AppRun:
+    run.started = time.monotonic()
+    env = dict(os.environ, APP=run.app)
+    with open(run.log, "w") as log:
+        for step, script in STEPS:
+            if run.failed_step and step != "remove":
+                continue
+            log.write(f"### {step}: {script}\n")
+            log.flush()
+            started = time.monotonic()
+            if step == "install":
+                with install_lock:
+                    rc = subprocess.call([script], cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+            else:
+                rc = subprocess.call([script], cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+            run.steps[step] = round(time.monotonic() - started, 1)
+            if rc != 0 and not run.failed_step:
+                run.failed_step = step
+    run.duration = round(time.monotonic() - run.started, 1)
+    run.status = "failed" if run.failed_step else "passed"
+    if run.status == "passed":
+        shard.record("e2e", run.app, run.app, run.duration)
+    return run
+
+
+def schedule(runs: list[AppRun], capacity: int, concurrency: int, start):
+    """Start runs (largest and longest first) whenever they fit; returns when all finished.
+
+    start(run) must return a future. A run fits while the memory of running apps plus its own
+    stays within capacity, fewer than `concurrency` apps run and none of its namespaces is in use.
+    """
+    pending = sorted(runs, key=lambda r: (-r.memory, -r.estimate, r.app))
+    running = {}  # future -> run
+    while pending or running:
+        used = sum(r.memory for r in running.values())
+        busy = set().union(*(r.namespaces for r in running.values()))
+        for run in list(pending):
+            if len(running) >= concurrency:
+                break
+            if used + run.memory <= capacity and not run.namespaces & busy:
+                pending.remove(run)
+                run.status = "running"
+                print(f"▶️  {run.app} ({run.size}, {' '.join(sorted(run.namespaces))}) started")
+                running[start(run)] = run
+                used += run.memory
+                busy |= run.namespaces
+        if not running:
+            # Nothing fits next to nothing: cannot happen for runs within capacity
+            break
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            run = running.pop(future)
+            try:
+                future.result()
+            except (OSError, ValueError) as e:  # log or test script unusable, durations file unreadable
+                run.status, run.failed_step = "failed", run.failed_step or f"error: {e}"
+            mark = "✅" if run.status == "passed" else f"❌ ({run.failed_step})"
+            print(f"{mark} {run.app} finished in {run.duration}s")
+
+
+def print_summary(runs: list[AppRun]):
+    width = max(len(r.app) for r in runs)
+    print(f"\n{'APP'.ljust(width)}  STATUS   SIZE     TOTAL   " + "  ".join(s.upper().ljust(7) for s, _ in STEPS))
+    for r in sorted(runs, key=lambda r: r.app):
+        steps = "  ".join(str(r.steps.get(s, "-")).ljust(7) for s, _ in STEPS)
+        print(f"{r.app.ljust(width)}  {r.status.ljust(7)}  {r.size.ljust(7)}  {str(r.duration or '-').ljust(6)}  {steps}")
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Run e2e app tests concurrently on one test cluster")
+    parser.add_argument("apps", nargs="*", help="Apps to test (default: all, or all of --shard)")
+    parser.add_argument("--shard", type=shard.parse_shard, metavar="i/N", help="Test only the apps of this shard")
+    parser.add_argument("--cluster-size", choices=SIZES, default=DEFAULT_SIZE, help="Worker instance size")
+    parser.add_argument("--workers", type=int, default=1, help="Number of workers in the test cluster")
+    parser.add_argument("--jobs", type=int, help="Max apps at once (default: by cluster size and workers)")
+    parser.add_argument("--report-dir", type=Path, default=Path("e2e-report"), help="Logs and report.json")
+    parser.add_argument("--dry-run", action="store_true", help="Only show how apps would be packed")
+    args = parser.parse_args()
+
+    apps = args.apps or shard.all_apps("e2e")
+    missing = [app for app in apps if not (APPS_DIR / app).is_dir()]
+    if missing:
+        parser.error(f"apps not found: {' '.join(missing)}")
+    if args.shard:
+        apps = shard.shard_apps("e2e", apps, *args.shard)
+
+    capacity = SIZES[args.cluster_size] * args.workers
+    concurrency = args.jobs or MAX_CONCURRENCY[args.cluster_size] * args.workers
+    estimates = shard.estimate("e2e", apps, shard.load_durations())
+    args.report_dir.mkdir(parents=True, exist_ok=True)
+    runs, skipped = [], []
+    for app in apps:
+        size = app_size(app)
+        run = AppRun(app, size, app_memory(app, size), app_namespaces(app), estimates[app], args.report_dir)
+        if SIZES[run.size] > SIZES[args.cluster_size]:
+            run.status = "skipped"
+            skipped.append(run)
+        else:
+            runs.append(run)
+
+    print(f"Testing {len(runs)} apps in '{os.environ.get('TEST_MODE', '')}' on {args.workers}x "
+          f"{args.cluster_size} ({capacity} GiB), up to {concurrency} at once")
+    for run in skipped:
+        print(f"⏭️  {run.app} skipped: needs a worker of size {run.size}")
+    if args.dry_run:
+        for run in sorted(runs, key=lambda r: (-r.memory, -r.estimate, r.app)):
+            print(f"  {run.app}: {run.size}, {run.memory:g} GiB, ~{run.estimate:.0f}s, namespaces: {' '.join(sorted(run.namespaces))}")
+        return
+
+    install_lock = threading.Lock()
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        schedule(runs, capacity, concurrency, lambda run: pool.submit(run_app, run, install_lock))
+
+    all_runs = runs + skipped
+    report = {
+        "test_mode": os.environ.get("TEST_MODE"),
+        "cluster_size": args.cluster_size,
+        "workers": args.workers,
+        "concurrency": concurrency,
+        "duration": round(time.monotonic() - started, 1),
+        "apps": [r.report() for r in sorted(all_runs, key=lambda r: r.app)],
+    }
+    with open(args.report_dir / "report.json", "w") as f:
+        json.dump(report, f, indent=2)
+    print_summary(all_runs)
+    print(f"\nReport: {args.report_dir / 'report.json'} ({report['duration']}s)")
+    sys.exit(1 if any(r.status == "failed" for r in runs) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""File helpers shared by catalog tools."""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+# Read once: the umask can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _replace_atomic(path: Path, write):
+    """Create path from write(tmp_path) via a temp file + rename, honoring the umask like open() does."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        os.close(fd)
+        write(tmp)
+        # mkstemp creates 0600 files
+        os.chmod(tmp, 0o666 & ~_UMASK)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_atomic(path: Path, data: bytes):
+    """Write a file via a temp file + rename so readers never see partial content."""
+    def write(tmp):
+        with open(tmp, "wb") as f:
+            f.write(data)
+    _replace_atomic(path, write)
+
+
+def copy_atomic(src: Path, dst: Path):
+    """Copy a file so that readers of dst never see partial content."""
+    _replace_atomic(dst, lambda tmp: shutil.copyfile(src, tmp))
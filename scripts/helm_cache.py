@@ -0,0 +1,428 @@
+"""Local caches for Helm operations shared by catalog tools.
+
+Chart tarballs are stored under $CATALOG_CACHE_DIR/charts, keyed by repository
+URL, chart name and version. HTTP repository charts are downloaded from the URL
+in the repository index and checked against the index digest; each entry records
+the tarball sha256, which is verified on every hit; the least recently used entries are evicted once the
+cache grows over CATALOG_CHART_CACHE_MAX_MB.
+
+Rendered manifests are stored under $CATALOG_CACHE_DIR/rendered (default:
+~/.cache/k0rdent-catalog/rendered), one file per rendered chart. A local chart
+is keyed by chart name, version, Chart.lock digest and a hash of its files
+(values, templates, crds, files read by templates, ...) besides charts/; a
+remote chart is keyed by repository, chart name and version, so a cache hit
+skips `helm pull`, `helm dependency build` and `helm template`. A chart without
+Chart.lock whose dependency versions are ranges is keyed on the dependencies a
+`helm dependency build` resolves, as a new upstream release changes them.
+
+Environment variables:
+    CATALOG_CACHE_DIR          - cache root directory (default: ~/.cache/k0rdent-catalog)
+    CATALOG_CHART_CACHE_MAX_MB - chart tarball cache size cap (default: 2048)
+
+Usage:
+    python3 scripts/helm_cache.py build-deps apps/cert-manager/example   # helm dependency build via cache
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+
+import fsutil
+import helm_repos
+import http_pool
+import yaml
+
+CACHE_DIR = Path(os.environ.get("CATALOG_CACHE_DIR", Path.home() / ".cache" / "k0rdent-catalog"))
+RENDER_CACHE_DIR = CACHE_DIR / "rendered"
+CHART_CACHE_DIR = CACHE_DIR / "charts"
+CHART_CACHE_MAX_BYTES = int(os.environ.get("CATALOG_CHART_CACHE_MAX_MB", "2048")) * 1024 * 1024
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Cache keys
+# ---------------------------------------------------------------------------
+
+def _lock_digest(chart_dir: Path, resolved: bool = False) -> str | None:
+    """Chart.lock digest, or a hash of Chart.yaml when the chart has no lock file.
+
+    Without a lock file, dependency version ranges resolve to whatever upstream has
+    published last: the digest is then None, or with resolved=True (after a dependency
+    build) covers the dependency tarballs in charts/ too.
+    """
+    lock_file = chart_dir / "Chart.lock"
+    if lock_file.exists():
+        with open(lock_file) as f:
+            lock = yaml.safe_load(f) or {}
+        if lock.get("digest"):
+            return lock["digest"]
+    h = hashlib.sha256((chart_dir / "Chart.yaml").read_bytes())
+    ranged = any(not _is_exact_version(str(dep.get("version", ""))) for dep in _chart_dependencies(chart_dir)
+                 if not dep.get("repository", "").startswith("file://"))
+    if ranged:
+        if not resolved:
+            return None
+        for tgz in sorted((chart_dir / "charts").glob("*.tgz")):
+            h.update(tgz.name.encode() + b"\0" + _file_sha256(tgz).encode())
+    return h.hexdigest()
+
+
+def _files_digest(chart_dir: Path) -> str:
+    """Hash of the chart's own files — everything besides deps that affects rendering.
+
+    charts/ is covered by the lock digest, and so is Chart.lock, which helm writes on
+    dependency builds.
+    """
+    h = hashlib.sha256()
+    for path in sorted(chart_dir.rglob("*")):
+        rel = path.relative_to(chart_dir)
+        if not path.is_file() or rel.parts[0] in ("charts", "tmpcharts") or rel == Path("Chart.lock"):
+            continue
+        h.update(str(rel).encode() + b"\0")
+        h.update(_sha256(path.read_bytes()).encode())
+    return h.hexdigest()
+
+
+def local_chart_key(chart_dir: Path, resolved: bool = False) -> str | None:
+    """Cache key for a chart directory.
+
+    None if it has no Chart.yaml, or if it has ranged dependencies without Chart.lock
+    and resolved is not set, see _lock_digest.
+    """
+    chart_yaml = chart_dir / "Chart.yaml"
+    if not chart_yaml.exists():
+        return None
+    lock_digest = _lock_digest(chart_dir, resolved)
+    if lock_digest is None:
+        return None
+    with open(chart_yaml) as f:
+        chart = yaml.safe_load(f) or {}
+    parts = [
+        "local",
+        str(chart.get("name", "")),
+        str(chart.get("version", "")),
+        lock_digest,
+        _files_digest(chart_dir),
+    ]
+    return _sha256("\n".join(parts).encode())
+
+
+def remote_chart_key(repository: str, name: str, version: str) -> str:
+    """Cache key for a published chart version — immutable once released."""
+    return _sha256("\n".join(["remote", repository.rstrip("/"), name, version]).encode())
+
+
+# ---------------------------------------------------------------------------
+# Rendered manifests
+# ---------------------------------------------------------------------------
+
+def _render_path(key: str) -> Path:
+    return RENDER_CACHE_DIR / key[:2] / f"{key}.yaml"
+
+
+def lookup_render(key: str | None) -> Path | None:
+    """Return the cached rendered manifest for key, if present."""
+    if not key:
+        return None
+    path = _render_path(key)
+    if not path.exists():
+        return None
+    path.touch()
+    return path
+
+
+def store_render(key: str, rendered: str) -> Path:
+    path = _render_path(key)
+    fsutil.write_atomic(path, rendered.encode())
+    return path
+
+
+def helm_template(chart_dir: Path) -> str | None:
+    """Build dependencies and template a chart directory. Returns rendered YAML or None."""
+    if not build_dependencies(chart_dir):
+        print(f"    Warning: helm dependency build failed for {chart_dir}")
+        return None
+
+    res = subprocess.run(["helm", "template", "chart", str(chart_dir)], capture_output=True, text=True, check=False)
+    if res.returncode != 0:
+        print(f"    Warning: helm template failed for {chart_dir}: {res.stderr.strip()}")
+        return None
+
+    return res.stdout
+
+
+def render_chart(chart_dir: Path, key: str | None = None) -> Path | None:
+    """Render a chart directory through the cache. Returns the rendered manifest path or None.
+
+    key defaults to local_chart_key(chart_dir); pass remote_chart_key() for pulled charts.
+    """
+    if key is None:
+        if not (chart_dir / "Chart.yaml").exists():
+            print(f"    Warning: {chart_dir}/Chart.yaml not found")
+            return None
+        key = local_chart_key(chart_dir)
+    if key is None:
+        # Ranged dependencies without Chart.lock: key on what they resolve to now
+        if not build_dependencies(chart_dir):
+            print(f"    Warning: helm dependency build failed for {chart_dir}")
+            return None
+        key = local_chart_key(chart_dir, resolved=True)
+    cached = lookup_render(key)
+    if cached:
+        return cached
+    rendered = helm_template(chart_dir)
+    if rendered is None:
+        return None
+    return store_render(key, rendered)
+
+
+# ---------------------------------------------------------------------------
+# Chart tarballs
+# ---------------------------------------------------------------------------
+
+def _chart_entry_dir(repository: str, name: str, version: str) -> Path:
+    key = _sha256("\n".join([repository.rstrip("/"), name, version]).encode())
+    return CHART_CACHE_DIR / key[:2] / key
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_entry(entry_dir: Path) -> dict | None:
+    meta_file = entry_dir / "meta.json"
+    if not meta_file.exists():
+        return None
+    with open(meta_file) as f:
+        return json.load(f)
+
+
+def lookup_chart(repository: str, name: str, version: str) -> Path | None:
+    """Return the cached tarball for a chart version if present and its digest still matches."""
+    entry_dir = _chart_entry_dir(repository, name, version)
+    meta = _read_entry(entry_dir)
+    if meta is None:
+        return None
+    tgz = entry_dir / meta["file"]
+    if not tgz.exists() or _file_sha256(tgz) != meta["sha256"]:
+        print(f"    Warning: cached chart {name}:{version} is corrupt, discarding")
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return None
+    os.utime(entry_dir / "meta.json")
+    return tgz
+
+
+def store_chart(repository: str, name: str, version: str, tgz: Path, digest: str = "") -> Path:
+    """Add a downloaded tarball to the cache. digest, if given, is the expected sha256."""
+    sha256 = _file_sha256(tgz)
+    if digest and digest.removeprefix("sha256:") != sha256:
+        raise ValueError(f"Digest mismatch for {name}:{version}: expected {digest}, got sha256:{sha256}")
+    entry_dir = _chart_entry_dir(repository, name, version)
+    entry_dir.mkdir(parents=True, exist_ok=True)
+    dst = entry_dir / tgz.name
+    fsutil.copy_atomic(tgz, dst)
+    meta = {"repository": repository, "name": name, "version": version, "file": tgz.name, "sha256": sha256}
+    fsutil.write_atomic(entry_dir / "meta.json", json.dumps(meta).encode())
+    evict_charts()
+    return dst
+
+
+def _helm_pull(repository: str, name: str, version: str, dst_dir: str) -> bool:
+    if repository.startswith("oci://"):
+        cmd = ["helm", "pull", f"{repository.rstrip('/')}/{name}", "--version", version, "-d", dst_dir]
+    else:
+        cmd = ["helm", "pull", name, "--repo", repository, "--version", version, "-d", dst_dir]
+    res = subprocess.run(cmd, capture_output=True, text=True, check=False)
+    if res.returncode != 0:
+        print(f"    Warning: helm pull failed for {name}:{version} ({repository}): {res.stderr.strip()}")
+        return False
+    return True
+
+
+def _download_indexed(repository: str, name: str, version: str, dst_dir: str) -> tuple[Path, str] | None:
+    """Download a chart straight from the URL in the repository index, with its expected digest."""
+    import helm_index  # imports this module, so resolve lazily
+    try:
+        return helm_index.default_client().download(repository, name, version, dst_dir)
+    except (*http_pool.ERRORS, yaml.YAMLError, ValueError) as e:
+        print(f"    Warning: index download failed for {name}:{version} ({repository}): {e}")
+        return None
+
+
+def fetch_chart(repository: str, name: str, version: str) -> Path | None:
+    """Return a cached chart tarball, downloading it once on a miss."""
+    cached = lookup_chart(repository, name, version)
+    if cached:
+        return cached
+    with tempfile.TemporaryDirectory(prefix="chart-pull-") as tmp_dir:
+        if repository.startswith(("http://", "https://")):
+            downloaded = _download_indexed(repository, name, version, tmp_dir)
+            if downloaded:
+                tgz, digest = downloaded
+                try:
+                    return store_chart(repository, name, version, tgz, digest)
+                except ValueError as e:
+                    print(f"    Warning: {e}")
+                    return None
+        if not _helm_pull(repository, name, version, tmp_dir):
+            return None
+        tarballs = list(Path(tmp_dir).glob("*.tgz"))
+        if not tarballs:
+            return None
+        return store_chart(repository, name, version, tarballs[0])
+
+
+def evict_charts(max_bytes: int = CHART_CACHE_MAX_BYTES):
+    """Drop least recently used chart entries until the cache fits into max_bytes."""
+    if not CHART_CACHE_DIR.exists():
+        return
+    entries = []
+    total = 0
+    for meta_file in CHART_CACHE_DIR.glob("*/*/meta.json"):
+        entry_dir = meta_file.parent
+        size = sum(p.stat().st_size for p in entry_dir.iterdir() if p.is_file())
+        entries.append((meta_file.stat().st_mtime, size, entry_dir))
+        total += size
+    for _, size, entry_dir in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total -= size
+
+
+def unpack_chart(tgz: Path, dst_dir: Path) -> Path | None:
+    """Unpack a chart tarball into dst_dir. Returns the chart directory or None."""
+    with tarfile.open(tgz) as tar:
+        tar.extractall(dst_dir, filter="data")
+    for entry in dst_dir.iterdir():
+        if entry.is_dir() and (entry / "Chart.yaml").exists():
+            return entry
+    return None
+
+
+def read_chart_metadata(tgz: Path) -> dict:
+    """Read Chart.yaml straight from a chart tarball without unpacking it."""
+    with tarfile.open(tgz) as tar:
+        for member in tar:
+            if member.isfile() and member.name.count("/") == 1 and member.name.endswith("/Chart.yaml"):
+                return yaml.safe_load(tar.extractfile(member)) or {}
+    raise ValueError(f"Chart.yaml not found in {tgz}")
+
+
+def _chart_dependencies(chart_dir: Path) -> list:
+    """Resolved dependencies from Chart.lock, falling back to Chart.yaml."""
+    for fname in ["Chart.lock", "Chart.yaml"]:
+        path = chart_dir / fname
+        if path.exists():
+            with open(path) as f:
+                data = yaml.safe_load(f) or {}
+            return data.get("dependencies") or []
+    return []
+
+
+def _is_exact_version(version: str) -> bool:
+    return bool(version) and not any(c in version for c in "^~*<>=|, ") and "x" not in version.lower().split(".")
+
+
+def _is_version_suffix(s: str) -> bool:
+    """True for the '1.2.3' / 'v1.2.3' part of a '{name}-{version}.tgz' file name."""
+    s = s.removeprefix("v")
+    return bool(s) and s[0].isdigit()
+
+
+def seed_dependencies(chart_dir: Path) -> bool:
+    """Copy every dependency tarball into chart_dir/charts from the cache.
+
+    Returns False if a dependency cannot be served from a repository (e.g. file://)
+    or cannot be fetched, in which case `helm dependency build` has to run.
+    """
+    deps = _chart_dependencies(chart_dir)
+    charts_dir = chart_dir / "charts"
+    for dep in deps:
+        repository = dep.get("repository", "")
+        version = str(dep.get("version", ""))
+        if not repository.startswith(("http://", "https://", "oci://")) or not _is_exact_version(version):
+            return False
+        tgz = fetch_chart(repository, dep["name"], version)
+        if tgz is None:
+            return False
+        charts_dir.mkdir(exist_ok=True)
+        # Drop other versions of this dependency left over from earlier builds
+        for old in charts_dir.glob(f"{dep['name']}-*.tgz"):
+            if old.name != tgz.name and _is_version_suffix(old.name[len(dep["name"]) + 1:]):
+                old.unlink()
+        dst = charts_dir / tgz.name
+        if not dst.exists() or _file_sha256(dst) != _file_sha256(tgz):
+            shutil.copyfile(tgz, dst)
+    return True
+
+
+def store_dependencies(chart_dir: Path):
+    """Add tarballs that helm downloaded into chart_dir/charts to the cache."""
+    charts_dir = chart_dir / "charts"
+    for dep in _chart_dependencies(chart_dir):
+        repository = dep.get("repository", "")
+        if not repository.startswith(("http://", "https://", "oci://")):
+            continue
+        version = str(dep["version"])
+        if lookup_chart(repository, dep["name"], version):
+            continue
+        for tgz in charts_dir.glob(f"{dep['name']}-*.tgz"):
+            if tgz.name in (f"{dep['name']}-{version}.tgz", f"{dep['name']}-v{version.lstrip('v')}.tgz"):
+                store_chart(repository, dep["name"], version, tgz)
+                break
+
+
+def build_dependencies(chart_dir: Path) -> bool:
+    """`helm dependency build` that resolves charts through the shared tarball cache."""
+    if seed_dependencies(chart_dir):
+        return True
+    helm_repos.ensure_active([dep.get("repository", "") for dep in _chart_dependencies(chart_dir)])
+    res = subprocess.run(["helm", "dependency", "build", str(chart_dir)], capture_output=True, text=True, check=False)
+    if res.returncode != 0:
+        print(res.stderr.strip(), file=sys.stderr)
+        return False
+    store_dependencies(chart_dir)
+    return True
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def cmd_build_deps(args):
+    chart_dir = Path(args.chart_dir)
+    repositories = [dep.get("repository", "") for dep in _chart_dependencies(chart_dir)]
+    with helm_repos.RepoSession(repositories):
+        if not build_dependencies(chart_dir):
+            sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Helm chart and rendered-manifest cache.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_deps = subparsers.add_parser("build-deps", help="Populate chart dependencies from the chart cache")
+    build_deps.add_argument("chart_dir")
+    build_deps.set_defaults(func=cmd_build_deps)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Native Helm repository index client.
+
+Reads chart versions, appVersions and tarball digests straight from a
+repository's index.yaml instead of spawning `helm show chart` per version.
+
+Index files are fetched over a keep-alive HTTPPool with If-None-Match /
+If-Modified-Since, parsed with the libyaml C loader when available and cached
+under $CATALOG_CACHE_DIR/index as a compact JSON projection, so an unchanged
+(often 10+ MB) index costs one 304 round trip and a JSON load.
+
+Any HTTP server that serves {repository}/index.yaml works, including
+`python3 -m http.server` over a directory with a static index.yaml.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from urllib.parse import urljoin
+
+import fsutil
+import helm_cache
+import yaml
+from http_pool import HTTPPool
+
+INDEX_CACHE_DIR = helm_cache.CACHE_DIR / "index"
+
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_SEMVER_RE = re.compile(r'^v?(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$')
+
+
+def semver_key(version: str) -> tuple | None:
+    """Sort key (major, minor, patch, is_stable) or None if not semver-ish."""
+    m = _SEMVER_RE.match(str(version))
+    if not m:
+        return None
+    return (int(m.group(1)), int(m.group(2) or 0), int(m.group(3) or 0), m.group(4) is None)
+
+
+def _project_entries(index: dict) -> dict:
+    """Keep only the fields catalog tools read: name -> [{version, appVersion, digest, urls}]."""
+    entries = {}
+    for name, versions in (index.get("entries") or {}).items():
+        entries[name] = [
+            {
+                "version": str(v.get("version", "")),
+                "appVersion": str(v.get("appVersion", "") or ""),
+                "digest": v.get("digest", ""),
+                "urls": v.get("urls") or [],
+            }
+            for v in versions or []
+        ]
+    return entries
+
+
+class IndexClient:
+    """Fetches and caches repository index files. Thread-safe."""
+
+    def __init__(self, pool: HTTPPool | None = None, cache_dir: Path = INDEX_CACHE_DIR):
+        self.pool = pool or HTTPPool(timeout=60)
+        self.cache_dir = Path(cache_dir)
+        self._entries = {}  # repository -> projected entries
+        self._lock = threading.Lock()
+        self._repo_locks = {}
+
+    def _cache_file(self, repository: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha256(repository.encode()).hexdigest()}.json"
+
+    def _repo_lock(self, repository: str) -> threading.Lock:
+        with self._lock:
+            return self._repo_locks.setdefault(repository, threading.Lock())
+
+    def entries(self, repository: str) -> dict:
+        """Return {chart name: [entry, ...]} for a repository, fetching its index at most once per client."""
+        repository = repository.rstrip("/")
+        with self._repo_lock(repository):
+            if repository not in self._entries:
+                self._entries[repository] = self._fetch(repository)
+            return self._entries[repository]
+
+    def _fetch(self, repository: str) -> dict:
+        cache_file = self._cache_file(repository)
+        cached = None
+        headers = {}
+        if cache_file.exists():
+            with open(cache_file) as f:
+                cached = json.load(f)
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        resp = self.pool.get(f"{repository}/index.yaml", headers=headers)
+        if resp.status == 304 and cached is not None:
+            return cached["entries"]
+        resp.raise_for_status()
+
+        entries = _project_entries(yaml.load(resp.read(), Loader=YamlLoader) or {})
+        data = {
+            "repository": repository,
+            "etag": resp.headers.get("ETag", ""),
+            "last_modified": resp.headers.get("Last-Modified", ""),
+            "entries": entries,
+        }
+        fsutil.write_atomic(cache_file, json.dumps(data).encode())
+        return entries
+
+    def versions(self, repository: str, chart: str) -> list:
+        return self.entries(repository).get(chart, [])
+
+    def get(self, repository: str, chart: str, version: str) -> dict | None:
+        """Index entry for an exact chart version ('v' prefix tolerated)."""
+        wanted = str(version).removeprefix("v")
+        for entry in self.versions(repository, chart):
+            if entry["version"].removeprefix("v") == wanted:
+                return entry
+        return None
+
+    def latest(self, repository: str, chart: str) -> dict | None:
+        """Highest stable version, matching what `helm show chart repo/chart` picks."""
+        best, best_key = None, None
+        for entry in self.versions(repository, chart):
+            key = semver_key(entry["version"])
+            if key is None or not key[3]:
+                continue
+            if best_key is None or key > best_key:
+                best, best_key = entry, key
+        return best
+
+    def chart_url(self, repository: str, entry: dict) -> str | None:
+        """Absolute tarball URL of an index entry."""
+        if not entry.get("urls"):
+            return None
+        return urljoin(repository.rstrip("/") + "/", entry["urls"][0])
+
+    def download(self, repository: str, chart: str, version: str, dst_dir: str) -> tuple[Path, str] | None:
+        """Stream a chart tarball into dst_dir. Returns (path, expected digest) or None if not indexed."""
+        entry = self.get(repository, chart, version)
+        url = entry and self.chart_url(repository, entry)
+        if not url:
+            return None
+        dst = Path(dst_dir) / os.path.basename(url.split("?", 1)[0])
+        with self.pool.get(url, stream=True) as resp:
+            resp.raise_for_status()
+            with open(dst, "wb") as f:
+                f.writelines(resp.iter_content())
+        return dst, entry.get("digest", "")
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def default_client() -> IndexClient:
+    """Process-wide IndexClient, so every caller shares one connection pool and index cache."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = IndexClient()
+        return _default_client
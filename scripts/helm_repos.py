@@ -0,0 +1,118 @@
+"""One-time Helm repository setup for catalog tools.
+
+Instead of `helm repo add` / `helm repo update` / `helm repo remove` around every
+chart, a run collects all HTTP repositories it may need from st-charts.yaml and
+example Chart.yaml files, adds them once under collision-free names, refreshes
+them with a single `helm repo update` and removes them at exit.
+
+The session is lazy: nothing is added until a caller actually needs helm to
+resolve a repository (e.g. a rendered-manifest or chart cache miss).
+"""
+
+import atexit
+import hashlib
+import subprocess
+from pathlib import Path
+
+import yaml
+
+ROOT_DIR = Path(__file__).parent.parent
+APPS_DIR = ROOT_DIR / "apps"
+
+_active = None  # RepoSession currently in use, see ensure_active()
+
+
+def _is_http_repo(url: str) -> bool:
+    return url.startswith(("http://", "https://"))
+
+
+def _read_yaml(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return yaml.safe_load(f) or {}
+
+
+def collect_repositories(apps: list[str]) -> list[str]:
+    """All HTTP repositories referenced by the apps' st-charts.yaml and example charts."""
+    repos = set()
+    for app in apps:
+        app_dir = APPS_DIR / app
+        for item in _read_yaml(app_dir / "charts" / "st-charts.yaml").get("st-charts", []):
+            repos.add(item.get("repository", ""))
+        for chart_yaml in [*app_dir.glob("charts/*/Chart.yaml"), *app_dir.glob("*/Chart.yaml")]:
+            for dep in _read_yaml(chart_yaml).get("dependencies") or []:
+                repos.add(dep.get("repository", ""))
+    return sorted(r.rstrip("/") for r in repos if _is_http_repo(r))
+
+
+def repo_name(url: str) -> str:
+    """Stable local repo name for a URL, unlikely to clash with the user's own repos."""
+    return "catalog-" + hashlib.sha256(url.rstrip("/").encode()).hexdigest()[:10]
+
+
+class RepoSession:
+    """Adds a fixed set of Helm repositories once per run and removes them at exit."""
+
+    def __init__(self, repositories: list[str]):
+        self.repositories = sorted({r.rstrip("/") for r in repositories if _is_http_repo(r)})
+        self.added = []
+        self.ready = False
+
+    def __enter__(self):
+        global _active
+        self._previous = _active
+        _active = self
+        atexit.register(self.close)
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = self._previous
+        self.close()
+
+    def name(self, url: str) -> str:
+        """Repo name for url, setting the session up on first use."""
+        self.ensure()
+        return repo_name(url)
+
+    def ensure(self, repositories: list[str] = ()):
+        """Add every repository and refresh them all with one `helm repo update`.
+
+        repositories not known upfront are added to the session as well.
+        """
+        missing = sorted({r.rstrip("/") for r in repositories if _is_http_repo(r)} - set(self.repositories))
+        self.repositories.extend(missing)
+        if self.ready:
+            pending = missing
+        else:
+            pending = self.repositories
+            self.ready = True
+        if not pending:
+            return
+        print(f"==> Adding {len(pending)} helm repositories...")
+        names = []
+        for url in pending:
+            name = repo_name(url)
+            res = subprocess.run(["helm", "repo", "add", "--force-update", name, url],
+                                 capture_output=True, text=True, check=False)
+            if res.returncode != 0:
+                print(f"  Warning: helm repo add failed for {url}: {res.stderr.strip()}")
+                continue
+            names.append(name)
+        if names:
+            subprocess.run(["helm", "repo", "update", *names], capture_output=True, text=True, check=False)
+            self.added.extend(names)
+
+    def close(self):
+        if not self.added:
+            return
+        subprocess.run(["helm", "repo", "remove", *self.added], capture_output=True, text=True, check=False)
+        self.added = []
+        self.ready = False
+
+
+def ensure_active(repositories: list[str] = ()):
+    """Make sure the active session's repositories, plus any given ones, are configured in helm."""
+    if _active is not None:
+        _active.ensure(repositories)
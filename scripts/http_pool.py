@@ -0,0 +1,180 @@
+"""Small keep-alive HTTP client shared by catalog tools.
+
+urllib.request opens a new TCP + TLS connection for every request. HTTPPool
+keeps idle connections per (scheme, host, port) and reuses them, follows
+redirects (dropping Authorization when the host changes) and transparently
+decodes gzip responses. It is thread-safe, so one pool can back a thread pool
+of concurrent requests.
+
+Plain http:// URLs are supported, which lets local stand-in servers replace
+real endpoints in tests.
+"""
+
+import gzip
+import http.client
+import ssl
+import threading
+import zlib
+from urllib.parse import urljoin, urlsplit
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+USER_AGENT = "k0rdent-catalog"
+
+
+class HTTPError(Exception):
+    def __init__(self, url: str, status: int, reason: str = ""):
+        super().__init__(f"HTTP {status} {reason} for {url}".strip())
+        self.url = url
+        self.status = status
+
+
+# What a request can fail with: error statuses, protocol and connection errors
+ERRORS = (HTTPError, http.client.HTTPException, OSError)
+
+
+class Response:
+    """A completed or streaming response. Use as a context manager when streaming."""
+
+    def __init__(self, url: str, raw: http.client.HTTPResponse, release):
+        self.url = url
+        self.status = raw.status
+        self.reason = raw.reason
+        self.headers = raw.headers
+        self._raw = raw
+        self._release = release
+        self._body = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def iter_content(self, chunk_size: int = 1 << 16):
+        """Yield the (undecoded) body in chunks, returning the connection to the pool at the end."""
+        while True:
+            chunk = self._raw.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        self.close()
+
+    def read(self) -> bytes:
+        """Read and decode the whole body."""
+        if self._body is None:
+            data = self._raw.read()
+            encoding = (self.headers.get("Content-Encoding") or "").lower()
+            if encoding == "gzip":
+                data = gzip.decompress(data)
+            elif encoding == "deflate":
+                data = zlib.decompress(data)
+            self._body = data
+            self.close()
+        return self._body
+
+    def close(self):
+        if self._release is not None:
+            release, self._release = self._release, None
+            release(self._raw)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            self.close()
+            raise HTTPError(self.url, self.status, self.reason)
+
+
+class HTTPPool:
+    def __init__(self, timeout: float = 30, max_idle_per_host: int = 8, user_agent: str = USER_AGENT):
+        self.timeout = timeout
+        self.max_idle_per_host = max_idle_per_host
+        self.user_agent = user_agent
+        self._idle = {}  # (scheme, host, port) -> [HTTPConnection]
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _acquire(self, key: tuple) -> tuple[http.client.HTTPConnection, bool]:
+        """Return (connection, reused)."""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, host, port = key
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=self.timeout)
+        return conn, False
+
+    def _release(self, key: tuple, conn: http.client.HTTPConnection, raw: http.client.HTTPResponse):
+        # Only connections whose response was fully consumed can be reused
+        if raw.will_close or not raw.isclosed():
+            conn.close()
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _send(self, method: str, url: str, headers: dict, body: bytes | None) -> Response:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        while True:
+            conn, reused = self._acquire(key)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                raw = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused:
+                    continue  # stale keep-alive connection, retry on a fresh one
+                raise
+            except Exception:
+                conn.close()
+                raise
+            return Response(url, raw, lambda r, c=conn: self._release(key, c, r))
+
+    def request(self, method: str, url: str, headers: dict | None = None, body: bytes | None = None,
+                stream: bool = False, max_redirects: int = 5) -> Response:
+        """Send a request, following redirects. The body is read eagerly unless stream=True."""
+        headers = {"User-Agent": self.user_agent, "Accept-Encoding": "gzip", **(headers or {})}
+        if stream:
+            headers.pop("Accept-Encoding")
+        for _ in range(max_redirects + 1):
+            resp = self._send(method, url, headers, body)
+            if resp.status not in REDIRECT_CODES or "Location" not in resp.headers:
+                break
+            location = urljoin(url, resp.headers["Location"])
+            resp.read()
+            if urlsplit(location).netloc != urlsplit(url).netloc:
+                headers = {k: v for k, v in headers.items() if k.lower() != "authorization"}
+            if resp.status == 303:
+                method, body = "GET", None
+            url = location
+        else:
+            raise HTTPError(url, resp.status, "too many redirects")
+        if not stream:
+            resp.read()
+        return resp
+
+    def get(self, url: str, headers: dict | None = None, stream: bool = False) -> Response:
+        return self.request("GET", url, headers=headers, stream=stream)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
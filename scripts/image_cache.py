@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Local pull-through image cache for kind test clusters.
+
+Runs one `registry:2` container in proxy mode per upstream registry
+(registry:2 can proxy a single remote). The containers are attached to the
+`kind` docker network, and kind nodes are pointed at them with containerd
+hosts.toml mirror files. The kind configs (scripts/config/kind-*.yaml and
+create_kind_config.sh) set containerd's config_path to their directory, which
+is a no-op on nodes without mirror files. Images are pulled upstream once and
+served locally afterwards. Cached data lives under
+$CATALOG_CACHE_DIR/registry and survives container restarts.
+
+`preload` renders the app's example chart and extracts its images as
+chart_ctl.py check-images does. It warms the cache with each image's manifest
+and layers for the node platform and, with --kind-load, also loads the images
+into a kind cluster, so deploy_mcs.sh starts without any image pull.
+
+Usage:
+    python3 scripts/image_cache.py start                          # start the caches
+    python3 scripts/image_cache.py configure adopted k0rdent      # point kind clusters' nodes at them
+    python3 scripts/image_cache.py preload dex kyverno            # warm the caches with app images
+    python3 scripts/image_cache.py preload dex --kind-load adopted
+    python3 scripts/image_cache.py stop
+
+Environment variables:
+    CATALOG_CACHE_DIR - cache root, registry data goes to registry/<upstream>
+    PRELOAD_IMAGES    - "true" to make deploy_mcs.sh preload app images into the kind cluster
+"""
+
+import argparse
+import concurrent.futures
+import platform
+import subprocess
+
+import helm_cache
+import http_pool
+import oci_client
+
+REGISTRY_IMAGE = "registry:2"
+REGISTRY_DIR = helm_cache.CACHE_DIR / "registry"
+CONTAINER_PREFIX = "kind-cache-"
+KIND_NETWORK = "kind"
+BASE_PORT = 5101
+CERTS_DIR = "/etc/containerd/certs.d"
+
+# Registry name in image references -> upstream URL. Order fixes the published host ports.
+UPSTREAMS = {
+    "docker.io": "https://registry-1.docker.io",
+    "ghcr.io": "https://ghcr.io",
+    "quay.io": "https://quay.io",
+    "registry.k8s.io": "https://registry.k8s.io",
+    "gcr.io": "https://gcr.io",
+    "public.ecr.aws": "https://public.ecr.aws",
+    "mcr.microsoft.com": "https://mcr.microsoft.com",
+    "docker.elastic.co": "https://docker.elastic.co",
+    "nvcr.io": "https://nvcr.io",
+    "registry.gitlab.com": "https://registry.gitlab.com",
+}
+
+
+def _container(registry: str) -> str:
+    return CONTAINER_PREFIX + registry.replace(".", "-")
+
+
+def _host_port(registry: str) -> int:
+    return BASE_PORT + list(UPSTREAMS).index(registry)
+
+
+def _docker(*args: str, check: bool = True, capture: bool = False, input: str | None = None) -> str:
+    result = subprocess.run(["docker", *args], text=True, input=input,
+                            stdout=subprocess.PIPE if capture else subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, check=False)
+    if check and result.returncode != 0:
+        raise RuntimeError(f"docker {' '.join(args)}: {result.stderr.strip()}")
+    return result.stdout or ""
+
+
+def node_platform() -> str:
+    machine = platform.machine().lower()
+    return "linux/arm64" if machine in ("arm64", "aarch64") else "linux/amd64"
+
+
+# ---------------------------------------------------------------------------
+# Caches
+# ---------------------------------------------------------------------------
+
+def running() -> set[str]:
+    """Registries whose cache container is running."""
+    names = _docker("ps", "--filter", f"name=^{CONTAINER_PREFIX}", "--format", "{{.Names}}", capture=True).split()
+    return {registry for registry in UPSTREAMS if _container(registry) in names}
+
+
+def start(registries=UPSTREAMS):
+    active = running()
+    for registry in registries:
+        if registry in active:
+            continue
+        name = _container(registry)
+        data_dir = REGISTRY_DIR / registry
+        data_dir.mkdir(parents=True, exist_ok=True)
+        _docker("rm", "-f", name, check=False)
+        _docker("run", "-d", "--restart=always", "--name", name,
+                "-p", f"127.0.0.1:{_host_port(registry)}:5000",
+                "-e", f"REGISTRY_PROXY_REMOTEURL={UPSTREAMS[registry]}",
+                "-v", f"{data_dir}:/var/lib/registry", REGISTRY_IMAGE)
+        print(f"✅ {registry} cache: {name} (localhost:{_host_port(registry)})")
+
+
+def stop():
+    for registry in running():
+        _docker("rm", "-f", _container(registry), check=False)
+        print(f"Stopped {_container(registry)}")
+
+
+def hosts_toml(registry: str) -> str:
+    return (f'server = "{UPSTREAMS[registry]}"\n\n'
+            f'[host."http://{_container(registry)}:5000"]\n'
+            f'  capabilities = ["pull", "resolve"]\n')
+
+
+def configure(cluster: str):
+    """Attach the caches to the kind network and write containerd mirror config into the cluster's nodes."""
+    active = running()
+    for registry in active:
+        # Fails when already connected, which is fine
+        _docker("network", "connect", KIND_NETWORK, _container(registry), check=False)
+    nodes = subprocess.run(["kind", "get", "nodes", "--name", cluster], text=True,
+                           stdout=subprocess.PIPE, check=True).stdout.split()
+    for node in nodes:
+        for registry in active:
+            directory = f"{CERTS_DIR}/{registry}"
+            _docker("exec", "-i", node, "sh", "-c", f"mkdir -p {directory} && cat > {directory}/hosts.toml",
+                    input=hosts_toml(registry))
+    print(f"✅ {cluster}: {len(nodes)} nodes use {len(active)} registry caches")
+
+
+# ---------------------------------------------------------------------------
+# Preloading
+# ---------------------------------------------------------------------------
+
+def app_images(apps: list[str]) -> list[str]:
+    import chart_ctl
+    import helm_repos
+
+    with helm_repos.RepoSession(helm_repos.collect_repositories(apps)):
+        return sorted({image for app in apps for image in chart_ctl.get_chart_images(app)})
+
+
+def cached_reference(image: str) -> str | None:
+    """'nginx:1.27' -> 'localhost:5101/library/nginx:1.27', None if the registry has no cache."""
+    registry, repository, reference = oci_client.parse_reference(image)
+    if registry == "index.docker.io":
+        registry = "docker.io"
+    if registry not in UPSTREAMS:
+        return None
+    separator = "@" if reference.startswith("sha256:") else ":"
+    return f"localhost:{_host_port(registry)}/{repository}{separator}{reference}"
+
+
+def warm(images: list[str], jobs: int) -> list[str]:
+    """Pull images through the caches. Returns the images that could not be cached."""
+    client = oci_client.OCIClient()
+    target = node_platform()
+    failed = []
+    todo = {}
+    for image in images:
+        ref = cached_reference(image)
+        if ref:
+            todo[ref] = image
+        else:
+            print(f"- {image}: no cache for its registry")
+            failed.append(image)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(client.pull, ref, target): image for ref, image in todo.items()}
+        for future in concurrent.futures.as_completed(futures):
+            image = futures[future]
+            try:
+                print(f"- {image} ({future.result() / 1e6:.1f} MB)")
+            except (*http_pool.ERRORS, ValueError, KeyError) as e:
+                print(f"::warning::Unable to cache '{image}': {e}")
+                failed.append(image)
+    return failed
+
+
+def kind_load(images: list[str], cluster: str):
+    """docker pull images from the caches and load them into the kind cluster's nodes."""
+    for image in images:
+        ref = cached_reference(image)
+        if not ref or "@" in image:
+            # Digest references cannot be tagged; nodes pull them through the mirror instead
+            continue
+        _docker("pull", "--platform", node_platform(), ref)
+        _docker("tag", ref, image)
+        subprocess.run(["kind", "load", "docker-image", image, "--name", cluster], check=True)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Pull-through image cache for kind test clusters")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("start", help="Start the registry caches")
+    sub.add_parser("stop", help="Stop the registry caches (cached data is kept)")
+
+    configure_parser = sub.add_parser("configure", help="Point kind cluster nodes at the caches")
+    configure_parser.add_argument("clusters", nargs="+", metavar="cluster")
+
+    preload_parser = sub.add_parser("preload", help="Warm the caches with the images of apps' example charts")
+    preload_parser.add_argument("apps", nargs="+", metavar="app")
+    preload_parser.add_argument("--kind-load", metavar="CLUSTER", help="Also load the images into this kind cluster")
+    preload_parser.add_argument("--jobs", "-j", type=int, default=8, help="Images pulled concurrently")
+
+    args = parser.parse_args()
+
+    if args.command == "start":
+        start()
+    elif args.command == "stop":
+        stop()
+    elif args.command == "configure":
+        for cluster in args.clusters:
+            configure(cluster)
+    elif args.command == "preload":
+        images = app_images(args.apps)
+        print(f"{len(images)} images found")
+        start({oci_client.parse_reference(i)[0] for i in images} & set(UPSTREAMS))
+        failed = warm(images, args.jobs)
+        if args.kind_load:
+            kind_load([i for i in images if i not in failed], args.kind_load)
+        if failed:
+            print(f"⚠️  {len(failed)} images not cached, they will be pulled from upstream")
+
+
+if __name__ == "__main__":
+    main()
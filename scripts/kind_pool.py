@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""Pool of pre-warmed kind-based k0rdent test setups.
+
+Setting up k0rdent for an app test (deploy_k0rdent.sh + deploy_cld.sh: two kind
+clusters, kcm, an adopted ClusterDeployment) takes minutes. The pool keeps N of
+these setups ready. A slot is a management cluster built from
+config/kind-k0rdent-cluster.yaml with kcm installed from
+config/min-kcm-values.yaml and config/min-kcm-management.yaml, plus a child
+cluster from config/kind-adopted-cluster.yaml adopted as ClusterDeployment
+"adopted". Host ports of the kind configs are shifted by the slot number so
+slots can run side by side. When image_cache.py caches are running, new
+clusters are pointed at them.
+
+A test acquires a slot, which writes kcfg_k0rdent and kcfg_adopted into the
+working directory, runs as if deploy_k0rdent.sh and deploy_cld.sh had been
+run, and releases the slot. Releasing resets it instead of recreating it:
+MultiClusterServices are deleted, and so are the helm releases,
+ServiceTemplates and namespaces created since the slot was built. After
+--max-uses tests, a slot is deleted and rebuilt.
+
+A lease ends at a deadline (--lease) and, when acquire is given the caller's
+PID, with that process. Slots whose lease ended without a release, or that
+were left building or resetting by a process that died, are reclaimed by
+`fill` and `acquire`: their clusters are deleted and rebuilt.
+
+Usage:
+    python3 scripts/kind_pool.py fill --size 2                      # build slots until 2 exist
+    eval "$(python3 scripts/kind_pool.py acquire --pid $$)"         # sets KUBECONFIG, KIND_POOL_SLOT, PRELOAD_KIND_CLUSTER
+    APP=dex TEST_MODE=adopted ./scripts/install_servicetemplates.sh
+    APP=dex TEST_MODE=adopted ./scripts/deploy_mcs.sh
+    python3 scripts/kind_pool.py release "$KIND_POOL_SLOT"          # reset and return to the pool
+    python3 scripts/kind_pool.py release "$KIND_POOL_SLOT" --broken # delete and rebuild instead
+    python3 scripts/kind_pool.py status
+    python3 scripts/kind_pool.py drain                              # delete all slots
+
+Environment variables:
+    CATALOG_KIND_POOL_DIR - pool state and kubeconfigs (default: $CATALOG_CACHE_DIR/kind-pool)
+    KIND_POOL_MAX_USES    - tests per slot before it is rebuilt (default: 10)
+    KIND_POOL_LEASE       - seconds a lease lasts unless released (default: 10800)
+    KUBECTL               - kubectl binary (default: kubectl)
+"""
+
+import argparse
+import base64
+import fcntl
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import fsutil
+import helm_cache
+import image_cache
+import yaml
+
+ROOT_DIR = Path(__file__).parent.parent
+CONFIG_DIR = ROOT_DIR / "scripts" / "config"
+POOL_DIR = Path(os.environ.get("CATALOG_KIND_POOL_DIR", helm_cache.CACHE_DIR / "kind-pool"))
+STATE_FILE = POOL_DIR / "pool.json"
+
+KUBECTL = os.environ.get("KUBECTL", "kubectl")
+MAX_USES = int(os.environ.get("KIND_POOL_MAX_USES", "10"))
+LEASE_SECONDS = float(os.environ.get("KIND_POOL_LEASE", str(3 * 60 * 60)))
+
+# Keep in sync with deploy_k0rdent.sh and setup_provider_credential.sh
+KCM_CHART = "oci://ghcr.io/k0rdent/kcm/charts/kcm"
+KCM_VERSION = "1.10.0"
+ADOPTED_CREDENTIAL_CHART = "oci://ghcr.io/k0rdent/catalog/charts/adopted-credential"
+ADOPTED_CREDENTIAL_VERSION = "0.0.1"
+ADOPTED_CLD = "adopted"
+METRICS_SERVER_REPO = "https://kubernetes-sigs.github.io/metrics-server/"
+
+POLL_SECONDS = 5
+
+
+# ---------------------------------------------------------------------------
+# State: {"slots": {name: {"state": building|ready|leased|resetting, "uses": n, ...}}}
+# Leased slots record lease_until and maybe the owner PID; building and resetting
+# slots the PID of the process doing it.
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def _state():
+    """Locked read-modify-write access to the pool state."""
+    POOL_DIR.mkdir(parents=True, exist_ok=True)
+    with open(POOL_DIR / "pool.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        state = json.loads(STATE_FILE.read_text()) if STATE_FILE.exists() else {"slots": {}}
+        yield state
+        fsutil.write_atomic(STATE_FILE, json.dumps(state, indent=2, sort_keys=True).encode())
+
+
+def _slot_names(index: int) -> tuple[str, str]:
+    return f"k0rdent-pool-{index}", f"adopted-pool-{index}"
+
+
+def _kubeconfig(slot: str, cluster: str) -> Path:
+    return POOL_DIR / slot / f"kcfg_{cluster}"
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _abandoned(slot: dict) -> bool:
+    """True for a lease that ended without a release, or a build or reset whose process died."""
+    if slot["state"] == "leased":
+        if time.time() > slot.get("lease_until", 0):
+            return True
+        return bool(slot.get("owner")) and not _alive(slot["owner"])
+    return slot["state"] in ("building", "resetting") and "pid" in slot and not _alive(slot["pid"])
+
+
+# ---------------------------------------------------------------------------
+# Cluster operations
+# ---------------------------------------------------------------------------
+
+def _run(cmd: list[str], kubeconfig: Path | None = None, capture: bool = False, check: bool = True,
+         echo: bool = True) -> str:
+    env = dict(os.environ)
+    if kubeconfig:
+        env["KUBECONFIG"] = str(kubeconfig)
+    if echo:
+        print(f"+ {' '.join(cmd)}", flush=True)
+    result = subprocess.run(cmd, env=env, cwd=ROOT_DIR, text=True, stdout=subprocess.PIPE if capture else None,
+                            check=False)
+    if check and result.returncode != 0:
+        raise RuntimeError(f"'{' '.join(cmd)}' failed with exit code {result.returncode}")
+    return result.stdout or ""
+
+
+def _kind_config(template: str, name: str, offset: int, path: Path):
+    """Write a kind config based on template with its name set and host ports shifted by offset."""
+    with open(CONFIG_DIR / template) as f:
+        config = yaml.safe_load(f)
+    config["name"] = name
+    for node in config.get("nodes", []):
+        for mapping in node.get("extraPortMappings", []):
+            mapping["hostPort"] += offset
+    with open(path, "w") as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+
+
+def _create_kind_cluster(template: str, name: str, offset: int, kubeconfig: Path):
+    config = kubeconfig.with_name(f"kind-{name}.yaml")
+    _kind_config(template, name, offset, config)
+    _run(["kind", "create", "cluster", "--config", str(config), "--kubeconfig", str(kubeconfig)])
+    if image_cache.running():
+        image_cache.configure(name)
+
+
+def _namespaces(kubeconfig: Path) -> list[str]:
+    out = _run([KUBECTL, "get", "namespaces", "-o", "jsonpath={.items[*].metadata.name}"], kubeconfig, capture=True)
+    return sorted(out.split())
+
+
+def _releases(kubeconfig: Path) -> list[str]:
+    """Helm releases of all namespaces as namespace/name."""
+    out = _run(["helm", "list", "-A", "-a", "-o", "json"], kubeconfig, capture=True)
+    return sorted(f"{r['namespace']}/{r['name']}" for r in json.loads(out or "[]"))
+
+
+def _servicetemplates(kubeconfig: Path) -> list[str]:
+    """ServiceTemplates of all namespaces as namespace/name."""
+    out = _run([KUBECTL, "get", "servicetemplates", "-A", "-o",
+                "jsonpath={range .items[*]}{.metadata.namespace}/{.metadata.name}{'\\n'}{end}"],
+               kubeconfig, capture=True)
+    return sorted(out.split())
+
+
+def _wait(kubeconfig: Path, *args: str):
+    _run([sys.executable, "./scripts/kube_wait.py", *args], kubeconfig)
+
+
+def build_slot(index: int) -> dict:
+    """Create the clusters of slot index and bring k0rdent up with the child adopted."""
+    mgmt, child = _slot_names(index)
+    (POOL_DIR / mgmt).mkdir(parents=True, exist_ok=True)
+    mgmt_kcfg, child_kcfg = _kubeconfig(mgmt, "k0rdent"), _kubeconfig(mgmt, "adopted")
+
+    _create_kind_cluster("kind-k0rdent-cluster.yaml", mgmt, index, mgmt_kcfg)
+    _run(["helm", "install", "kcm", KCM_CHART, "--version", KCM_VERSION, "-n", "kcm-system", "--create-namespace",
+          "-f", str(CONFIG_DIR / "min-kcm-values.yaml"), "--timeout=20m"], mgmt_kcfg)
+    _run([KUBECTL, "apply", "-f", str(CONFIG_DIR / "min-kcm-management.yaml")], mgmt_kcfg)
+    _run([KUBECTL, "create", "ns", "projectsveltos"], mgmt_kcfg)
+    _wait(mgmt_kcfg, "pods", "-n", "kcm-system")
+    _wait(mgmt_kcfg, "pods", "-n", "projectsveltos")
+
+    _create_kind_cluster("kind-adopted-cluster.yaml", child, index, child_kcfg)
+    _run(["helm", "upgrade", "--install", "adopted-credential", ADOPTED_CREDENTIAL_CHART,
+          "--version", ADOPTED_CREDENTIAL_VERSION, "-n", "kcm-system"], mgmt_kcfg)
+    internal = _run(["kind", "get", "kubeconfig", "--internal", "-n", child], capture=True)
+    patch = json.dumps({"data": {"value": base64.b64encode(internal.encode()).decode()}})
+    print("+ kubectl patch secret adopted-credential-secret -n kcm-system (kubeconfig of the child)")
+    _run([KUBECTL, "patch", "secret", "adopted-credential-secret", "-n", "kcm-system", "-p", patch], mgmt_kcfg,
+         echo=False)
+    _run([KUBECTL, "apply", "-n", "kcm-system", "-f", str(CONFIG_DIR / "adopted-cld.yaml")], mgmt_kcfg)
+    _wait(mgmt_kcfg, "cluster", ADOPTED_CLD, "-n", "kcm-system")
+    # As deploy_cld.sh does, for `kubectl top` in deploy_mcs.sh
+    _run(["helm", "install", "metrics-server", "metrics-server", "--repo", METRICS_SERVER_REPO,
+          "-n", "kube-system", "--set", "args={--kubelet-insecure-tls,--kubelet-preferred-address-types=InternalIP,Hostname}"],
+         child_kcfg)
+    _wait(child_kcfg, "pods", "-n", "kube-system")
+
+    return {
+        "state": "ready",
+        "uses": 0,
+        "clusters": [mgmt, child],
+        "namespaces": {"k0rdent": _namespaces(mgmt_kcfg), "adopted": _namespaces(child_kcfg)},
+        "releases": _releases(mgmt_kcfg),
+        "servicetemplates": _servicetemplates(mgmt_kcfg),
+        "built": time.time(),
+    }
+
+
+def delete_slot(name: str, slot: dict):
+    for cluster in slot.get("clusters", []):
+        _run(["kind", "delete", "cluster", "-n", cluster], check=False)
+    shutil.rmtree(POOL_DIR / name, ignore_errors=True)
+
+
+def reset_slot(name: str, slot: dict):
+    """Remove everything tests leave behind, keeping the clusters and k0rdent.
+
+    Only helm releases, ServiceTemplates and namespaces that did not exist when the
+    slot was built are removed, so kcm's own releases and templates stay.
+    """
+    if "releases" not in slot or "servicetemplates" not in slot:
+        raise RuntimeError("slot state has no baseline of releases and ServiceTemplates")
+    mgmt_kcfg, child_kcfg = _kubeconfig(name, "k0rdent"), _kubeconfig(name, "adopted")
+    _run([KUBECTL, "delete", "multiclusterservices", "--all", "--wait=true", "--timeout=10m"], mgmt_kcfg)
+    for release in sorted(set(_releases(mgmt_kcfg)) - set(slot["releases"])):
+        namespace, release_name = release.split("/", 1)
+        _run(["helm", "uninstall", release_name, "-n", namespace, "--wait"], mgmt_kcfg, check=False)
+    for template in sorted(set(_servicetemplates(mgmt_kcfg)) - set(slot["servicetemplates"])):
+        namespace, template_name = template.split("/", 1)
+        _run([KUBECTL, "delete", "servicetemplate", template_name, "-n", namespace, "--wait=true"], mgmt_kcfg)
+    for cluster, kubeconfig in (("k0rdent", mgmt_kcfg), ("adopted", child_kcfg)):
+        extra = sorted(set(_namespaces(kubeconfig)) - set(slot["namespaces"][cluster]))
+        if extra:
+            _run([KUBECTL, "delete", "namespaces", *extra, "--wait=true", "--timeout=10m"], kubeconfig)
+
+
+# ---------------------------------------------------------------------------
+# Pool operations
+# ---------------------------------------------------------------------------
+
+def _build_into_pool(index: int):
+    name = _slot_names(index)[0]
+    try:
+        slot = build_slot(index)
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"❌ Building {name} failed: {e}")
+        delete_slot(name, {"clusters": list(_slot_names(index))})
+        with _state() as state:
+            state["slots"].pop(name, None)
+        return False
+    with _state() as state:
+        state["slots"][name] = slot
+    print(f"✅ {name} ready")
+    return True
+
+
+def reclaim(rebuild: bool) -> list[str]:
+    """Delete abandoned slots and, with rebuild, build them again. Returns their names."""
+    with _state() as state:
+        names = sorted(name for name, slot in state["slots"].items() if _abandoned(slot))
+        for name in names:
+            state["slots"][name].update(state="building", pid=os.getpid())
+        slots = {name: dict(state["slots"][name]) for name in names}
+    for name, slot in slots.items():
+        print(f"♻️  Reclaiming abandoned {name}")
+        delete_slot(name, slot)
+        if rebuild:
+            _build_into_pool(int(name.rsplit("-", 1)[1]))
+        else:
+            with _state() as state:
+                state["slots"].pop(name, None)
+    return names
+
+
+def fill(size: int, jobs: int) -> bool:
+    """Build slots until the pool has size of them (any state), rebuilding abandoned ones."""
+    reclaim(rebuild=False)
+    with _state() as state:
+        taken = {int(name.rsplit("-", 1)[1]) for name in state["slots"]}
+        missing = max(0, size - len(taken))
+        indexes = [i for i in range(1, size + len(taken) + 1) if i not in taken][:missing]
+        for index in indexes:
+            state["slots"][_slot_names(index)[0]] = {"state": "building", "uses": 0, "pid": os.getpid(),
+                                                     "clusters": list(_slot_names(index))}
+    if not indexes:
+        print(f"Pool already has {len(taken)} slots")
+        return True
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        return all(pool.map(_build_into_pool, indexes))
+
+
+def acquire(target_dir: Path, timeout: float, lease: float = LEASE_SECONDS, owner: int | None = None) -> str | None:
+    """Lease the least used ready slot and write its kubeconfigs into target_dir.
+
+    The lease ends after lease seconds or, if given, when the owner process exits.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        with _state() as state:
+            ready = [(slot["uses"], name) for name, slot in state["slots"].items() if slot["state"] == "ready"]
+            if ready:
+                _, name = min(ready)
+                state["slots"][name].update(state="leased", leased=time.time(), lease_until=time.time() + lease,
+                                            owner=owner)
+                break
+        if reclaim(rebuild=True):
+            continue
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(POLL_SECONDS)
+    for cluster in ("k0rdent", "adopted"):
+        shutil.copyfile(_kubeconfig(name, cluster), target_dir / f"kcfg_{cluster}")
+        os.chmod(target_dir / f"kcfg_{cluster}", 0o600)
+    return name
+
+
+def release(name: str, broken: bool = False, max_uses: int = MAX_USES, refill: bool = True):
+    with _state() as state:
+        slot = state["slots"].get(name)
+        if not slot or slot["state"] != "leased":
+            raise SystemExit(f"Slot '{name}' is not leased")
+        slot["uses"] += 1
+        slot.update(state="resetting", pid=os.getpid())
+    recycle = broken or slot["uses"] >= max_uses
+    if not recycle:
+        try:
+            reset_slot(name, slot)
+        except (RuntimeError, OSError, ValueError) as e:
+            print(f"Resetting {name} failed, recycling it: {e}")
+            recycle = True
+    if recycle:
+        print(f"♻️  Recycling {name} after {slot['uses']} uses")
+        delete_slot(name, slot)
+        with _state() as state:
+            del state["slots"][name]
+        if refill:
+            _build_into_pool(int(name.rsplit("-", 1)[1]))
+        return
+    with _state() as state:
+        state["slots"][name].update(state="ready", uses=slot["uses"])
+        for key in ("pid", "owner", "lease_until"):
+            state["slots"][name].pop(key, None)
+    print(f"✅ {name} reset ({slot['uses']}/{max_uses} uses)")
+
+
+def drain():
+    with _state() as state:
+        slots = dict(state["slots"])
+        state["slots"] = {}
+    for name, slot in slots.items():
+        delete_slot(name, slot)
+
+
+def print_status():
+    with _state() as state:
+        slots = state["slots"]
+    if not slots:
+        print("Pool is empty")
+    for name, slot in sorted(slots.items()):
+        print(f"{name}: {slot['state']}, {slot['uses']} uses")
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Pool of pre-warmed kind-based k0rdent test setups")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    fill_parser = sub.add_parser("fill", help="Build slots until the pool has --size of them")
+    fill_parser.add_argument("--size", type=int, required=True)
+    fill_parser.add_argument("--jobs", type=int, default=2, help="Slots built at once")
+
+    acquire_parser = sub.add_parser("acquire", help="Lease a ready slot, print env to eval")
+    acquire_parser.add_argument("--dir", type=Path, default=Path("."), help="Where to write kcfg_k0rdent/kcfg_adopted")
+    acquire_parser.add_argument("--timeout", type=float, default=30 * 60, help="Seconds to wait for a ready slot")
+    acquire_parser.add_argument("--lease", type=float, default=LEASE_SECONDS,
+                                help="Seconds after which an unreleased slot is reclaimed")
+    acquire_parser.add_argument("--pid", type=int, help="Owner process, the slot is reclaimed once it exits")
+
+    release_parser = sub.add_parser("release", help="Reset a leased slot and return it to the pool")
+    release_parser.add_argument("slot")
+    release_parser.add_argument("--broken", action="store_true", help="Delete and rebuild instead of resetting")
+    release_parser.add_argument("--max-uses", type=int, default=MAX_USES, help="Rebuild after this many tests")
+    release_parser.add_argument("--no-refill", action="store_true", help="Do not rebuild a recycled slot")
+
+    sub.add_parser("status", help="Show the slots")
+    sub.add_parser("drain", help="Delete all slots")
+
+    args = parser.parse_args()
+
+    if args.command == "fill":
+        sys.exit(0 if fill(args.size, args.jobs) else 1)
+    elif args.command == "acquire":
+        name = acquire(args.dir, args.timeout, args.lease, args.pid)
+        if not name:
+            print("No ready slot", file=sys.stderr)
+            sys.exit(1)
+        print(f"export KIND_POOL_SLOT={name}")
+        print(f"export KUBECONFIG={(args.dir / 'kcfg_k0rdent').resolve()}")
+        print(f"export PRELOAD_KIND_CLUSTER={_slot_names(int(name.rsplit('-', 1)[1]))[1]}")
+    elif args.command == "release":
+        release(args.slot, args.broken, args.max_uses, not args.no_refill)
+    elif args.command == "status":
+        print_status()
+    elif args.command == "drain":
+        drain()
+
+
+if __name__ == "__main__":
+    main()
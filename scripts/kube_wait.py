@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""Event-driven waiters for Kubernetes objects.
+
+Instead of polling `kubectl get` every few seconds, a waiter lists the objects
+once and then follows the watch API from the list's resourceVersion
+(`kubectl get --raw '...?watch=1&resourceVersion=N'`), evaluating the condition
+in process after every event. It returns as soon as the condition holds. A
+watch that ends (server timeout, dropped connection) is resumed from the last
+seen resourceVersion, and an expired one (410 Gone) falls back to a fresh list.
+
+Usage:
+    python3 scripts/kube_wait.py pods -n kcm-system                          # all pods ready
+    python3 scripts/kube_wait.py pods -n dex --expect dex- --mode running    # also wait for a dex-* pod
+    python3 scripts/kube_wait.py pods-removed -n dex
+    python3 scripts/kube_wait.py servicetemplates                            # all valid, none is fine too
+    python3 scripts/kube_wait.py servicetemplates dex-0-19-1                 # dex-0-19-1 exists and all valid
+    python3 scripts/kube_wait.py cluster aws-example-user -n kcm-system
+    python3 scripts/kube_wait.py cluster-removed aws-example-user -n kcm-system
+
+Exit code is 0 when the condition holds and 1 on timeout.
+
+Environment variables:
+    KUBECTL             - kubectl binary to run (default: kubectl), e.g. a stand-in replaying recorded streams
+    KUBECONFIG          - passed through to kubectl
+    K0RDENT_API_VERSION - k0rdent.mirantis.com API version (default: v1beta1)
+    DEBUG               - "1" to describe pods whenever they change to a not running state
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+KUBECTL = os.environ.get("KUBECTL", "kubectl")
+K0RDENT_API = f"/apis/k0rdent.mirantis.com/{os.environ.get('K0RDENT_API_VERSION', 'v1beta1')}"
+
+# resource -> API prefix
+RESOURCES = {
+    "pods": "/api/v1",
+    "servicetemplates": K0RDENT_API,
+    "clusterdeployments": K0RDENT_API,
+}
+
+# Server side timeout of one watch request; the watch is resumed afterwards
+WATCH_SECONDS = 300
+RETRY_SECONDS = 3
+
+
+def _kubectl_raw(path: str) -> subprocess.Popen:
+    return subprocess.Popen([KUBECTL, "get", "--raw", path], stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, text=True)
+
+
+class Watch:
+    """Current objects of one resource, kept up to date from a list and a watch event stream."""
+
+    def __init__(self, resource: str, namespace: str | None = None):
+        prefix = RESOURCES[resource]
+        self.path = f"{prefix}/namespaces/{namespace}/{resource}" if namespace else f"{prefix}/{resource}"
+        self.objects = {}  # (namespace, name) -> object
+        self.resource_version = None
+
+    @staticmethod
+    def _key(obj: dict) -> tuple:
+        meta = obj.get("metadata", {})
+        return meta.get("namespace", ""), meta.get("name", "")
+
+    def list(self) -> bool:
+        """Replace the known objects with a fresh list. False if kubectl failed."""
+        proc = _kubectl_raw(self.path)
+        out, err = proc.communicate()
+        if proc.returncode != 0:
+            print(f"Failed to list {self.path}: {err.strip()}")
+            return False
+        data = json.loads(out)
+        self.objects = {self._key(obj): obj for obj in data.get("items") or []}
+        self.resource_version = data.get("metadata", {}).get("resourceVersion")
+        return True
+
+    def _watch(self, seconds: int):
+        """Yield (type, object) events until the watch ends.
+
+        Returns True if the watch can be resumed from the last resourceVersion, False if it
+        expired (410 Gone) or kubectl failed and the objects must be listed again.
+        """
+        query = urlencode({"watch": "1", "allowWatchBookmarks": "true",
+                           "resourceVersion": self.resource_version, "timeoutSeconds": seconds})
+        proc = _kubectl_raw(f"{self.path}?{query}")
+        try:
+            for line in proc.stdout:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                obj = event.get("object", {})
+                if event.get("type") == "ERROR":
+                    print(f"Watch of {self.path} ended: {obj.get('message', obj)}")
+                    return False
+                self.resource_version = obj.get("metadata", {}).get("resourceVersion", self.resource_version)
+                yield event["type"], obj
+            proc.wait()
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            _, err = proc.communicate()
+        if proc.returncode != 0:
+            print(f"Watch of {self.path} failed: {err.strip()}")
+            return False
+        return True
+
+    def wait(self, condition, timeout: float, on_change=None) -> bool:
+        """Wait until condition(objects) holds; on_change(type, object) is called for every event."""
+        deadline = time.monotonic() + timeout
+        while not self.list():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(RETRY_SECONDS)
+        if condition(self.objects):
+            return True
+
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            seconds = max(1, min(WATCH_SECONDS, int(deadline - started) + 1))
+            events = self._watch(seconds)
+            try:
+                while True:
+                    kind, obj = next(events)
+                    if kind == "BOOKMARK":
+                        continue
+                    if kind == "DELETED":
+                        self.objects.pop(self._key(obj), None)
+                    else:
+                        self.objects[self._key(obj)] = obj
+                    if on_change:
+                        on_change(kind, obj)
+                    if condition(self.objects):
+                        return True
+                    if time.monotonic() >= deadline:
+                        return False
+            except StopIteration as stop:
+                resumable = stop.value
+            finally:
+                events.close()
+            if time.monotonic() - started < 1:
+                time.sleep(1)
+            if not resumable:
+                # Expired or failed: start over from a fresh list
+                time.sleep(RETRY_SECONDS)
+                if self.list() and condition(self.objects):
+                    return True
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Pods
+# ---------------------------------------------------------------------------
+
+MODES = ("ready", "running", "creating")
+
+
+def pod_state(pod: dict) -> dict:
+    """{"ready": ..., "running": ..., "creating": ...} of one pod, as the deployment test judges it."""
+    status = pod.get("status", {})
+    phase = status.get("phase")
+    containers = status.get("containerStatuses") or []
+    if phase == "Succeeded":
+        return {"ready": True, "running": True, "creating": True}
+    if phase == "Running":
+        return {"ready": all(c.get("ready") for c in containers), "running": True, "creating": True}
+    reasons = {c["state"]["waiting"].get("reason") for c in containers if "waiting" in c.get("state", {})}
+    return {"ready": False, "running": False, "creating": reasons == {"ContainerCreating"}}
+
+
+def missing_pods(pods: dict, expected: list[str]) -> list[str]:
+    names = [name for _, name in pods]
+    return [pattern for pattern in expected if not any(re.search(pattern, name) for name in names)]
+
+
+def pods_condition(mode: str, expected: list[str]):
+    def condition(pods: dict) -> bool:
+        if not pods or missing_pods(pods, expected):
+            return False
+        return all(pod_state(pod)[mode] for pod in pods.values())
+    return condition
+
+
+def _describe_pod(pod: dict) -> str:
+    status = pod.get("status", {})
+    reasons = [c["state"]["waiting"].get("reason", "") for c in status.get("containerStatuses") or []
+               if "waiting" in c.get("state", {})]
+    ready = sum(1 for c in status.get("containerStatuses") or [] if c.get("ready"))
+    total = len(status.get("containerStatuses") or [])
+    text = f"{pod['metadata']['name']}: {status.get('phase', 'Unknown')} {ready}/{total}"
+    return f"{text} ({', '.join(reasons)})" if reasons else text
+
+
+def _pods_progress(watch: Watch, mode: str, expected: list[str]):
+    debug = os.environ.get("DEBUG") == "1"
+    namespace = watch.path.split("/namespaces/")[-1].split("/")[0]
+
+    def on_change(kind: str, pod: dict):
+        if kind == "DELETED":
+            print(f"  {pod['metadata']['name']}: deleted")
+        else:
+            print(f"  {_describe_pod(pod)}")
+            if debug and not pod_state(pod)["running"]:
+                subprocess.run([KUBECTL, "describe", "pod", pod["metadata"]["name"], "-n", namespace], check=False)
+        pods = watch.objects
+        done = sum(1 for p in pods.values() if pod_state(p)[mode])
+        missing = missing_pods(pods, expected)
+        print(f"⏳ {done}/{len(pods)} pods {mode}" + (f", expected pods not found: {' '.join(missing)}" if missing else ""))
+    return on_change
+
+
+def dump_pods(pods: dict):
+    print("🔍 Dumping pod statuses for debugging...")
+    for pod in pods.values():
+        status = pod.get("status", {})
+        print(f"📦 Pod: {pod['metadata']['name']} (Phase: {status.get('phase')})")
+        for c in status.get("containerStatuses") or []:
+            state, details = next(iter((c.get("state") or {"unknown": {}}).items()))
+            print(f" └─ Container: {c.get('name')}")
+            print(f"    • Ready: {str(c.get('ready', False)).lower()}")
+            print(f"    • State: {state}")
+            print(f"    • Reason: {details.get('reason', '-')}")
+            print(f"    • Message: {details.get('message', '-')}")
+        print()
+
+
+def wait_pods(namespace: str, mode: str = "ready", expected: list[str] = (), timeout: float = 25 * 60) -> bool:
+    watch = Watch("pods", namespace)
+    expected = list(expected)
+    if watch.wait(pods_condition(mode, expected), timeout, _pods_progress(watch, mode, expected)):
+        print({"ready": "✅ All pods are ready!", "running": "✅ All pods running!",
+               "creating": "✅ All pods at least in ContainerCreating state!"}[mode])
+        return True
+    print(f"❌ Timeout reached: Some pods are still not {mode}")
+    missing = missing_pods(watch.objects, expected)
+    if missing:
+        print(f"Expected pods not found: {' '.join(missing)}")
+    dump_pods(watch.objects)
+    return False
+
+
+def wait_pods_removed(namespace: str, timeout: float = 10 * 60) -> bool:
+    watch = Watch("pods", namespace)
+
+    def on_change(kind: str, pod: dict):
+        print(f"  {pod['metadata']['name']}: {'deleted' if kind == 'DELETED' else pod.get('status', {}).get('phase')}")
+        print(f"⏳ {len(watch.objects)} pods found...")
+
+    if watch.wait(lambda pods: not pods, timeout, on_change):
+        print("✅ All pods removed!")
+        return True
+    print(f"❌ Timeout reached after {timeout:.0f}s: Some pods in namespace '{namespace}' are still not removed")
+    for pod in watch.objects.values():
+        print(f"  {_describe_pod(pod)}")
+    return False
+
+
+# ---------------------------------------------------------------------------
+# k0rdent objects
+# ---------------------------------------------------------------------------
+
+def _ready_condition(obj: dict) -> bool:
+    conditions = obj.get("status", {}).get("conditions") or []
+    return any(c.get("type") == "Ready" and c.get("status") == "True" for c in conditions)
+
+
+def wait_servicetemplates(namespace: str | None = None, timeout: float = 10 * 60, names: list[str] = ()) -> bool:
+    """Wait until all service templates are valid. No templates at all is fine, unless names are required."""
+    watch = Watch("servicetemplates", namespace)
+
+    def valid(templates: dict) -> bool:
+        missing = set(names) - {name for _, name in templates}
+        return not missing and all(t.get("status", {}).get("valid") is True for t in templates.values())
+
+    def on_change(kind: str, template: dict):
+        invalid = [name for (_, name), t in watch.objects.items() if t.get("status", {}).get("valid") is not True]
+        if invalid:
+            print(f"⏳ Some service templates not validated: {' '.join(invalid)}")
+        missing = sorted(set(names) - {name for _, name in watch.objects})
+        if missing:
+            print(f"⏳ Waiting for service templates: {' '.join(missing)}")
+
+    if watch.wait(valid, timeout, on_change):
+        print("✅ All servicetemplates OK")
+        return True
+    print(f"❌ Timeout reached after {timeout:.0f}s: Some service templates are still missing or not validated")
+    for (ns, name), t in sorted(watch.objects.items()):
+        status = t.get("status", {})
+        print(f"  {ns}/{name}: valid={status.get('valid', False)} {status.get('validationError', '')}".rstrip())
+    return False
+
+
+def wait_cluster(name: str, namespace: str = "kcm-system", timeout: float = 15 * 60) -> bool:
+    watch = Watch("clusterdeployments", namespace)
+
+    def on_change(kind: str, cld: dict):
+        if cld["metadata"]["name"] == name:
+            pending = [c.get("type") for c in cld.get("status", {}).get("conditions") or []
+                       if c.get("status") != "True"]
+            print(f"⏳ Waiting for cluster, not ready: {' '.join(pending) or '-'}")
+
+    if watch.wait(lambda clds: _ready_condition(clds.get((namespace, name), {})), timeout, on_change):
+        print("✅ Cluster is ready!")
+        return True
+    print(f"❌ Timeout reached after {timeout:.0f}s: Cluster '{name}' is still not ready")
+    for c in watch.objects.get((namespace, name), {}).get("status", {}).get("conditions") or []:
+        print(f"  {c.get('type')}: {c.get('status')} {c.get('message', '')}".rstrip())
+    return False
+
+
+def wait_cluster_removed(name: str, namespace: str = "kcm-system", timeout: float = 15 * 60) -> bool:
+    watch = Watch("clusterdeployments", namespace)
+    if watch.wait(lambda clds: (namespace, name) not in clds, timeout):
+        print("✅ Cluster not found!")
+        return True
+    print(f"❌ Timeout reached after {timeout:.0f}s: Cluster '{name}' is still not removed")
+    return False
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Wait for Kubernetes objects using the watch API")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pods = sub.add_parser("pods", help="Wait until all pods of a namespace are ready (or running/creating)")
+    pods.add_argument("-n", "--namespace", required=True)
+    pods.add_argument("--mode", choices=MODES, default="ready")
+    pods.add_argument("--expect", action="append", default=[], metavar="PATTERN",
+                      help="A pod matching PATTERN must exist (repeatable)")
+    pods.add_argument("--timeout", type=float, default=25 * 60, help="Seconds")
+
+    removed = sub.add_parser("pods-removed", help="Wait until a namespace has no pods")
+    removed.add_argument("-n", "--namespace", required=True)
+    removed.add_argument("--timeout", type=float, default=10 * 60, help="Seconds")
+
+    templates = sub.add_parser("servicetemplates", help="Wait until all service templates are valid")
+    templates.add_argument("names", nargs="*", help="Templates that must exist (default: none)")
+    templates.add_argument("-n", "--namespace", help="Namespace (default: all)")
+    templates.add_argument("--timeout", type=float, default=10 * 60, help="Seconds")
+
+    cluster = sub.add_parser("cluster", help="Wait until a ClusterDeployment is ready")
+    cluster.add_argument("name")
+    cluster.add_argument("-n", "--namespace", default="kcm-system")
+    cluster.add_argument("--timeout", type=float, default=15 * 60, help="Seconds")
+
+    cluster_removed = sub.add_parser("cluster-removed", help="Wait until a ClusterDeployment is gone")
+    cluster_removed.add_argument("name")
+    cluster_removed.add_argument("-n", "--namespace", default="kcm-system")
+    cluster_removed.add_argument("--timeout", type=float, default=15 * 60, help="Seconds")
+
+    args = parser.parse_args()
+
+    if args.command == "pods":
+        ok = wait_pods(args.namespace, args.mode, args.expect, args.timeout)
+    elif args.command == "pods-removed":
+        ok = wait_pods_removed(args.namespace, args.timeout)
+    elif args.command == "servicetemplates":
+        ok = wait_servicetemplates(args.namespace, args.timeout, args.names)
+    elif args.command == "cluster":
+        ok = wait_cluster(args.name, args.namespace, args.timeout)
+    else:
+        ok = wait_cluster_removed(args.name, args.namespace, args.timeout)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Structured image extraction from rendered Helm manifests.
+
+Walks a multi-document `helm template` output one document at a time with the
+libyaml C loader (when available), so memory stays flat on multi-MB renders.
+Images are read only from places that actually run containers: Pod specs and
+pod templates of workloads (containers, initContainers, ephemeralContainers)
+and well-known CRDs. `image:` strings inside ConfigMap data, comments or
+values blobs are never picked up.
+"""
+
+from pathlib import Path
+
+import yaml
+
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+CONTAINER_KEYS = ("containers", "initContainers", "ephemeralContainers")
+
+# kind -> path from the document root to the pod spec
+POD_SPEC_PATHS = {
+    "Pod": ("spec",),
+    "PodTemplate": ("template", "spec"),
+    "Deployment": ("spec", "template", "spec"),
+    "StatefulSet": ("spec", "template", "spec"),
+    "DaemonSet": ("spec", "template", "spec"),
+    "ReplicaSet": ("spec", "template", "spec"),
+    "ReplicationController": ("spec", "template", "spec"),
+    "Job": ("spec", "template", "spec"),
+    "CronJob": ("spec", "jobTemplate", "spec", "template", "spec"),
+}
+
+# Custom resources whose operators start containers from an image given in the spec
+CRD_IMAGE_PATHS = {
+    ("monitoring.coreos.com", "Prometheus"): [("spec", "image")],
+    ("monitoring.coreos.com", "PrometheusAgent"): [("spec", "image")],
+    ("monitoring.coreos.com", "Alertmanager"): [("spec", "image")],
+    ("monitoring.coreos.com", "ThanosRuler"): [("spec", "image")],
+    ("elasticsearch.k8s.elastic.co", "Elasticsearch"): [("spec", "image")],
+    ("kibana.k8s.elastic.co", "Kibana"): [("spec", "image")],
+    ("apm.k8s.elastic.co", "ApmServer"): [("spec", "image")],
+    ("beat.k8s.elastic.co", "Beat"): [("spec", "image")],
+    ("agent.k8s.elastic.co", "Agent"): [("spec", "image")],
+    ("logstash.k8s.elastic.co", "Logstash"): [("spec", "image")],
+    ("kafka.strimzi.io", "Kafka"): [("spec", "kafka", "image"), ("spec", "zookeeper", "image")],
+    ("kafka.strimzi.io", "KafkaConnect"): [("spec", "image")],
+    ("kafka.strimzi.io", "KafkaMirrorMaker2"): [("spec", "image")],
+    ("postgresql.cnpg.io", "Cluster"): [("spec", "imageName")],
+    ("opentelemetry.io", "OpenTelemetryCollector"): [("spec", "image")],
+    ("opentelemetry.io", "Instrumentation"): [
+        ("spec", lang, "image") for lang in ("java", "nodejs", "python", "dotnet", "go", "apacheHttpd", "nginx")
+    ],
+}
+
+
+def _get(obj, path: tuple):
+    for key in path:
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(key)
+    return obj
+
+
+def _container_images(pod_spec) -> list[str]:
+    images = []
+    if not isinstance(pod_spec, dict):
+        return images
+    for key in CONTAINER_KEYS:
+        for container in pod_spec.get(key) or []:
+            if isinstance(container, dict) and isinstance(container.get("image"), str):
+                images.append(container["image"])
+    return images
+
+
+def _nested_pod_specs(obj):
+    """Yield every dict under obj that holds container lists — pod templates embedded in CRDs."""
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            if any(isinstance(item.get(key), list) for key in CONTAINER_KEYS):
+                yield item
+            stack.extend(v for v in item.values() if isinstance(v, (dict, list)))
+        elif isinstance(item, list):
+            stack.extend(v for v in item if isinstance(v, (dict, list)))
+
+
+def document_images(doc: dict) -> list[str]:
+    """Images started by a single Kubernetes object."""
+    if not isinstance(doc, dict):
+        return []
+    kind = doc.get("kind", "")
+    api_group = str(doc.get("apiVersion", "")).rpartition("/")[0]
+
+    if kind == "List":
+        return [image for item in doc.get("items") or [] for image in document_images(item)]
+
+    path = POD_SPEC_PATHS.get(kind)
+    if path and api_group in ("", "apps", "batch"):
+        return _container_images(_get(doc, path))
+
+    if "." not in api_group:
+        # Other built-in kinds (ConfigMap, Service, ...) do not run containers
+        return []
+
+    images = []
+    for spec in _nested_pod_specs(doc.get("spec")):
+        images.extend(_container_images(spec))
+    for image_path in CRD_IMAGE_PATHS.get((api_group, kind), []):
+        image = _get(doc, image_path)
+        if isinstance(image, str):
+            images.append(image)
+    return images
+
+
+def _is_valid_image_ref(ref: str) -> bool:
+    return bool(ref) and "{{" not in ref and " " not in ref
+
+
+def iter_images(stream):
+    """Yield image references from a YAML stream (file object or string), one document at a time."""
+    try:
+        for doc in yaml.load_all(stream, Loader=YamlLoader):
+            for image in document_images(doc):
+                image = image.strip()
+                if _is_valid_image_ref(image):
+                    yield image
+    except yaml.YAMLError as e:
+        print(f"    Warning: failed to parse rendered manifests: {e}")
+
+
+def extract_images(rendered_path: Path) -> list[str]:
+    """Unique, sorted image references from a rendered manifest file."""
+    with open(rendered_path, encoding="utf-8") as f:
+        return sorted(set(iter_images(f)))
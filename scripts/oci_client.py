@@ -0,0 +1,180 @@
+"""Minimal OCI distribution client for image platform checks.
+
+Replaces one `crane manifest` process per image with pooled HTTP requests:
+a HEAD resolves the tag to a digest, a GET of the manifest (index) lists the
+platforms, and the result is cached on disk under $CATALOG_CACHE_DIR/oci keyed
+by digest, which is immutable. Bearer tokens are requested anonymously and
+cached per registry and repository until they expire.
+
+Registries on localhost, 127.0.0.1 and any host listed in OCI_INSECURE_REGISTRIES
+(comma separated) are accessed over plain http, so a local `registry:2`
+container can stand in for a real registry in tests.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+import fsutil
+import helm_cache
+from http_pool import HTTPError, HTTPPool
+
+OCI_CACHE_DIR = helm_cache.CACHE_DIR / "oci"
+
+DOCKER_HUB = "docker.io"
+DOCKER_HUB_API = "registry-1.docker.io"
+
+INDEX_TYPES = (
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+)
+MANIFEST_TYPES = (
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+)
+ACCEPT = ", ".join(INDEX_TYPES + MANIFEST_TYPES)
+
+
+def parse_reference(image: str) -> tuple[str, str, str]:
+    """Split an image reference into (registry, repository, tag or digest), Docker Hub style defaults."""
+    name, reference = image, "latest"
+    if "@" in name:
+        name, reference = name.split("@", 1)
+    else:
+        last = name.rsplit("/", 1)[-1]
+        if ":" in last:
+            name, reference = name.rsplit(":", 1)
+    first, _, rest = name.partition("/")
+    if rest and ("." in first or ":" in first or first == "localhost"):
+        registry, repository = first, rest
+    else:
+        registry, repository = DOCKER_HUB, name
+    if registry in (DOCKER_HUB, "index.docker.io") and "/" not in repository:
+        repository = f"library/{repository}"
+    return registry, repository, reference
+
+
+def _insecure_registries() -> set:
+    hosts = {"localhost", "127.0.0.1"}
+    hosts.update(h.strip() for h in os.environ.get("OCI_INSECURE_REGISTRIES", "").split(",") if h.strip())
+    return hosts
+
+
+def _parse_challenge(header: str) -> dict:
+    """Parse `Bearer realm="...",service="...",scope="..."` into a dict."""
+    return dict(re.findall(r'(\w+)="([^"]*)"', header))
+
+
+def _platform(p: dict) -> str:
+    parts = [p.get("os", ""), p.get("architecture", "")]
+    if p.get("variant"):
+        parts.append(p["variant"])
+    return "/".join(parts)
+
+
+class OCIClient:
+    """Thread-safe registry client. One instance can be shared by a thread pool."""
+
+    def __init__(self, pool: HTTPPool | None = None, cache_dir: Path = OCI_CACHE_DIR):
+        self.pool = pool or HTTPPool(timeout=30)
+        self.cache_dir = Path(cache_dir)
+        self.insecure = _insecure_registries()
+        self._tokens = {}  # (registry, repository) -> (token, expires_at)
+        self._lock = threading.Lock()
+
+    def _base_url(self, registry: str) -> str:
+        host = DOCKER_HUB_API if registry in (DOCKER_HUB, "index.docker.io") else registry
+        scheme = "http" if registry.split(":")[0] in self.insecure or registry in self.insecure else "https"
+        return f"{scheme}://{host}"
+
+    def _fetch_token(self, challenge: dict, repository: str) -> tuple[str, float]:
+        params = {"scope": challenge.get("scope") or f"repository:{repository}:pull"}
+        if challenge.get("service"):
+            params["service"] = challenge["service"]
+        resp = self.pool.get(f"{challenge['realm']}?{urlencode(params)}")
+        resp.raise_for_status()
+        data = json.loads(resp.read())
+        expires_in = int(data.get("expires_in") or 60)
+        return data.get("token") or data.get("access_token", ""), time.time() + expires_in - 10
+
+    def _request(self, method: str, registry: str, repository: str, path: str, accept: str = ACCEPT,
+                 stream: bool = False):
+        url = f"{self._base_url(registry)}/v2/{repository}/{path}"
+        key = (registry, repository)
+        headers = {"Accept": accept}
+        with self._lock:
+            token = self._tokens.get(key)
+        if token and token[1] > time.time():
+            headers["Authorization"] = f"Bearer {token[0]}"
+        resp = self.pool.request(method, url, headers=headers, stream=stream)
+        if resp.status == 401 and "WWW-Authenticate" in resp.headers:
+            resp.read()
+            challenge = _parse_challenge(resp.headers["WWW-Authenticate"])
+            if "realm" in challenge:
+                token = self._fetch_token(challenge, repository)
+                with self._lock:
+                    self._tokens[key] = token
+                headers["Authorization"] = f"Bearer {token[0]}"
+                resp = self.pool.request(method, url, headers=headers, stream=stream)
+        resp.raise_for_status()
+        return resp
+
+    def resolve_digest(self, image: str) -> str:
+        registry, repository, reference = parse_reference(image)
+        if reference.startswith("sha256:"):
+            return reference
+        resp = self._request("HEAD", registry, repository, f"manifests/{reference}")
+        digest = resp.headers.get("Docker-Content-Digest", "")
+        if not digest:
+            raise HTTPError(resp.url, resp.status, "no Docker-Content-Digest header")
+        return digest
+
+    def _cache_file(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest.replace(':', '-')}.json"
+
+    def platforms(self, image: str) -> list[str]:
+        """Return ['linux/amd64', 'linux/arm64/v8', ...] for an image, cached by manifest digest."""
+        registry, repository, _ = parse_reference(image)
+        digest = self.resolve_digest(image)
+        cache_file = self._cache_file(digest)
+        if cache_file.exists():
+            with open(cache_file) as f:
+                return json.load(f)["platforms"]
+
+        manifest = json.loads(self._request("GET", registry, repository, f"manifests/{digest}").read())
+        if manifest.get("mediaType") in INDEX_TYPES or "manifests" in manifest:
+            platforms = [_platform(m.get("platform", {})) for m in manifest.get("manifests", [])]
+        else:
+            config_digest = manifest.get("config", {}).get("digest")
+            config = json.loads(self._request("GET", registry, repository, f"blobs/{config_digest}",
+                                              accept="*/*").read())
+            platforms = [_platform(config)]
+
+        fsutil.write_atomic(cache_file, json.dumps({"image": image, "platforms": platforms}).encode())
+        return platforms
+
+    def pull(self, image: str, platform: str) -> int:
+        """Fetch the manifest, config and layers of image for platform ('linux/amd64'), discarding the data.
+
+        Pulling through a registry mirror this way fills its cache. Returns the number of blob bytes read.
+        """
+        registry, repository, reference = parse_reference(image)
+        manifest = json.loads(self._request("GET", registry, repository, f"manifests/{reference}").read())
+        if manifest.get("mediaType") in INDEX_TYPES or "manifests" in manifest:
+            matches = [m for m in manifest.get("manifests", [])
+                       if _platform(m.get("platform", {})).startswith(platform)]
+            if not matches:
+                raise HTTPError(image, 404, f"no {platform} manifest")
+            manifest = json.loads(self._request("GET", registry, repository,
+                                                f"manifests/{matches[0]['digest']}").read())
+        size = 0
+        for blob in [manifest.get("config", {})] + manifest.get("layers", []):
+            with self._request("GET", registry, repository, f"blobs/{blob['digest']}",
+                               accept="*/*", stream=True) as resp:
+                for chunk in resp.iter_content(1 << 20):
+                    size += len(chunk)
+        return size
@@ -8,21 +8,29 @@ Usage:
     python3 scripts/scan_app.py cert-manager          # scan a single app
     python3 scripts/scan_app.py cert-manager cilium    # scan multiple apps
     python3 scripts/scan_app.py                        # scan all apps
+    python3 scripts/scan_app.py --shard 2/8            # scan the 2nd of 8 cost-balanced shards
 
 Environment variables:
-    OUTPUT_DIR  - directory for scan reports (default: scan-reports)
+    OUTPUT_DIR         - directory for scan reports (default: scan-reports)
+    CATALOG_CACHE_DIR  - rendered-manifest cache root (default: ~/.cache/k0rdent-catalog)
+    CATALOG_DURATIONS_FILE - recorded scan durations (default: $CATALOG_CACHE_DIR/durations.json)
 """
 
 import argparse
 import json
 import os
-import re
 import shutil
 import subprocess
 import sys
 import tempfile
+import time
 from pathlib import Path
 
+import helm_cache
+import helm_repos
+import manifests
+import scan_report
+import shard
 import yaml
 
 ROOT_DIR = Path(__file__).parent.parent
@@ -60,79 +68,25 @@ def get_charts(app: str) -> list[dict]:
 # Image extraction
 # ---------------------------------------------------------------------------
 
-def _add_helm_repos(chart_dir: Path):
-    """Add helm repos required by chart dependencies."""
-    chart_yaml = chart_dir / "Chart.yaml"
-    if not chart_yaml.exists():
-        return
-    with open(chart_yaml) as f:
-        chart_data = yaml.safe_load(f)
-    for dep in chart_data.get("dependencies", []):
-        repo = dep.get("repository", "")
-        if repo and not repo.startswith("oci://"):
-            repo_name = repo.rstrip("/").rsplit("/", 1)[-1]
-            run(["helm", "repo", "add", repo_name, repo])
-
-
-def _template_chart(chart_dir: Path) -> str | None:
-    """Build dependencies and template a chart directory. Returns rendered YAML or None."""
-    _add_helm_repos(chart_dir)
-
-    res = run(["helm", "dependency", "build", str(chart_dir)])
-    if res.returncode != 0:
-        print("    Warning: helm dependency build failed")
-        return None
-
-    res = run(["helm", "template", "chart", str(chart_dir)])
-    if res.returncode != 0:
-        print("    Warning: helm template failed")
-        return None
-
-    return res.stdout
-
-
-def _is_valid_image_ref(ref: str) -> bool:
-    """Check if a string looks like a valid container image reference (not a bare name)."""
-    if "{{" in ref:
-        return False
-    # Must contain at least a slash (registry/repo) or dot (domain)
-    return "/" in ref or "." in ref
-
-
-def _parse_images(rendered_yaml: str) -> list[str]:
-    """Extract unique image references from rendered Helm YAML."""
-    images = set()
-    for match in re.findall(r'image:\s*["\']?([^"\'\s]+)', rendered_yaml):
-        if _is_valid_image_ref(match):
-            images.add(match)
-    return sorted(images)
+def _chart_images(chart_dir: Path, key: str | None = None) -> list[str]:
+    """Render a chart directory through the rendered-manifest cache and extract its images."""
+    rendered_path = helm_cache.render_chart(chart_dir, key)
+    if rendered_path is None:
+        return []
+    return manifests.extract_images(rendered_path)
 
 
 def _pull_remote_chart(dep_name: str, version: str, repository: str) -> Path | None:
-    """Pull a chart from remote registry into a temp directory. Returns chart path or None."""
-    tmp_dir = tempfile.mkdtemp(prefix="scan-chart-")
-    if repository.startswith("oci://"):
-        ref = f"{repository.rstrip('/')}/{dep_name}"
-    else:
-        # HTTP repo — add it first
-        repo_name = repository.rstrip("/").rsplit("/", 1)[-1]
-        run(["helm", "repo", "add", repo_name, repository])
-        run(["helm", "repo", "update"])
-        ref = f"{repo_name}/{dep_name}"
-
-    res = run(["helm", "pull", ref, "--version", version, "--untar", "-d", tmp_dir])
-    if res.returncode != 0:
-        print(f"    Warning: helm pull failed for {ref}:{version}")
-        shutil.rmtree(tmp_dir)
+    """Unpack a chart from the shared chart cache into a temp directory. Returns chart path or None."""
+    tgz = helm_cache.fetch_chart(repository, dep_name, version)
+    if tgz is None:
         return None
 
-    # Find the unpacked chart directory
-    for entry in Path(tmp_dir).iterdir():
-        if entry.is_dir():
-            return entry
-
-    shutil.rmtree(tmp_dir)
-    return None
+    tmp_dir = Path(tempfile.mkdtemp(prefix="scan-chart-"))
+    chart_dir = helm_cache.unpack_chart(tgz, tmp_dir)
+    if chart_dir is None:
+        shutil.rmtree(tmp_dir)
+    return chart_dir
 
 
 def extract_images(app: str, chart: dict) -> list[str]:
@@ -143,23 +97,26 @@ def extract_images(app: str, chart: dict) -> list[str]:
     # Try local chart directory
     local_dir = APPS_DIR / app / "charts" / f"{name}-{version}"
     if local_dir.is_dir():
-        rendered = _template_chart(local_dir)
-        return _parse_images(rendered) if rendered else []
+        return _chart_images(local_dir)
 
-    # Fallback: pull from remote
+    # Fallback: pull from remote, unless this chart version was rendered before
     repository = chart.get("repository", "")
     dep_name = chart.get("dep_name", name)
     if not repository:
         print("    No local chart and no repository configured")
         return []
 
+    key = helm_cache.remote_chart_key(repository, dep_name, version)
+    cached = helm_cache.lookup_render(key)
+    if cached:
+        return manifests.extract_images(cached)
+
     print(f"    Pulling from {repository}...")
     remote_dir = _pull_remote_chart(dep_name, version, repository)
     if not remote_dir:
         return []
 
-    rendered = _template_chart(remote_dir)
-    images = _parse_images(rendered) if rendered else []
+    images = _chart_images(remote_dir, key)
 
     # Cleanup temp directory
     shutil.rmtree(remote_dir.parent)
@@ -179,10 +136,11 @@ def scan_image(image: str) -> dict | None:
 
 
 def scan_chart(app: str, chart: dict, app_dir: Path):
-    """Scan a single chart version and write {chartName}-{version}.json."""
+    """Scan a single chart version and write a compact {chartName}-{version}.json.gz report."""
     name = chart["name"]
     version = chart["version"]
     print(f"  Chart: {name}-{version}")
+    started = time.monotonic()
 
     images = extract_images(app, chart)
     if not images:
@@ -199,13 +157,14 @@ def scan_chart(app: str, chart: dict, app_dir: Path):
             r["Image"] = image
             all_results.append(r)
 
-    report_path = app_dir / f"{name}-{version}.json"
-    with open(report_path, "w") as f:
-        json.dump(all_results, f, indent=2)
+    report_path = app_dir / f"{name}-{version}{scan_report.SUFFIX}"
+    scan_report.write(report_path, all_results)
+    (app_dir / f"{name}-{version}.json").unlink(missing_ok=True)
 
     total = sum(len(r.get("Vulnerabilities") or []) for r in all_results)
     scanned = len({r.get("Image") for r in all_results})
     print(f"    {scanned} images, {total} CVEs → {report_path}")
+    shard.record("scan", app, f"{name}-{version}", time.monotonic() - started)
 
 
 def scan_app(app: str):
@@ -242,13 +201,19 @@ def main():
 
     parser = argparse.ArgumentParser(description="Scan catalog app images for CVEs")
     parser.add_argument("apps", nargs="*", help="Apps to scan (default: all)")
+    parser.add_argument("--shard", type=shard.parse_shard, metavar="i/N",
+                        help="Scan only shard i of N, balanced on recorded scan durations")
     args = parser.parse_args()
 
     os.chdir(ROOT_DIR)
 
     apps = args.apps if args.apps else get_all_apps()
-    for app in apps:
-        scan_app(app)
+    if args.shard:
+        apps = shard.shard_apps("scan", apps, *args.shard)
+        print(f"==> Shard {args.shard[0]}/{args.shard[1]}: {' '.join(apps) or '(empty)'}")
+    with helm_repos.RepoSession(helm_repos.collect_repositories(apps)):
+        for app in apps:
+            scan_app(app)
 
     print("==> Scan complete.")
 
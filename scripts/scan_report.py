@@ -0,0 +1,115 @@
+"""Compact scan report format.
+
+Raw Trivy JSON carries descriptions, CVSS vectors, references and layer data
+for every finding. The catalog site only reads vulnerability IDs, severities,
+package names and versions, so scan_app stores just those, with every string
+interned once in a table and referenced by index, gzip-compressed:
+
+    {
+      "format": "k0rdent-scan/v1",
+      "strings": ["nginx:1.27", "CVE-2024-0001", "HIGH", "openssl", "3.0.1", ...],
+      "images": [
+        {
+          "image": 0,
+          "vulnerabilities": [[id, severity, package, installed, fixed], ...],
+          "packages": [[name, version], ...]
+        }
+      ]
+    }
+
+load() reads both this format ({name}-{version}.json.gz) and raw Trivy
+result lists ({name}-{version}.json) from older artifacts, and returns
+Trivy-shaped results, so consumers need not care which one they got.
+"""
+
+import gzip
+import json
+from pathlib import Path
+
+FORMAT = "k0rdent-scan/v1"
+SUFFIX = ".json.gz"
+SUFFIXES = (SUFFIX, ".json")
+
+VULN_FIELDS = ("VulnerabilityID", "Severity", "PkgName", "InstalledVersion", "FixedVersion")
+# Trivy's value when a field is missing, where it has one
+VULN_DEFAULTS = {"Severity": "UNKNOWN"}
+PACKAGE_FIELDS = ("Name", "Version")
+
+
+class _StringTable:
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+
+    def __call__(self, value) -> int:
+        value = "" if value is None else str(value)
+        idx = self._index.get(value)
+        if idx is None:
+            idx = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return idx
+
+
+def compact(results: list) -> dict:
+    """Convert Trivy results (each tagged with "Image" by scan_app) to the compact format."""
+    intern = _StringTable()
+    images = {}
+    for r in results:
+        img = r.get("Image", r.get("Target", "unknown"))
+        entry = images.get(img)
+        if entry is None:
+            entry = images[img] = {"image": intern(img), "vulnerabilities": [], "packages": [], "_seen": set()}
+        for v in r.get("Vulnerabilities") or []:
+            entry["vulnerabilities"].append([intern(v.get(f) or VULN_DEFAULTS.get(f, "")) for f in VULN_FIELDS])
+        for p in r.get("Packages") or []:
+            row = tuple(intern(p.get(f, "")) for f in PACKAGE_FIELDS)
+            if p.get("Name") and row not in entry["_seen"]:
+                entry["_seen"].add(row)
+                entry["packages"].append(list(row))
+    for entry in images.values():
+        del entry["_seen"]
+    return {"format": FORMAT, "strings": intern.strings, "images": list(images.values())}
+
+
+def expand(report: dict) -> list:
+    """Convert a compact report back to Trivy-shaped results with only the kept fields."""
+    strings = report["strings"]
+    results = []
+    for entry in report.get("images", []):
+        results.append({
+            "Image": strings[entry["image"]],
+            "Vulnerabilities": [dict(zip(VULN_FIELDS, (strings[i] for i in row)))
+                                for row in entry.get("vulnerabilities", [])],
+            "Packages": [dict(zip(PACKAGE_FIELDS, (strings[i] for i in row)))
+                         for row in entry.get("packages", [])],
+        })
+    return results
+
+
+def write(path: Path, results: list):
+    """Write results as a gzip-compressed compact report. mtime is zeroed for reproducible output."""
+    data = json.dumps(compact(results), separators=(",", ":"), ensure_ascii=False).encode()
+    with open(path, "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+
+
+def load(path) -> list:
+    """Read a compact (.json.gz) or raw Trivy (.json) report as Trivy-shaped results."""
+    path = str(path)
+    if path.endswith(".gz"):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    if isinstance(data, dict) and data.get("format") == FORMAT:
+        return expand(data)
+    return data
+
+
+def strip_suffix(fname: str) -> str | None:
+    """'cert-manager-1.20.2.json.gz' -> 'cert-manager-1.20.2', or None if not a report file."""
+    for suffix in SUFFIXES:
+        if fname.endswith(suffix):
+            return fname[:-len(suffix)]
+    return None
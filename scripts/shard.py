@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Split scans and e2e tests into cost-balanced shards.
+
+scan_app.py records how long each chart version took to scan and
+e2e_app_test.sh how long each app took to test. The planner estimates every
+app as the sum of its recorded work items (unknown items cost the median of
+all recorded ones) and assigns apps longest-first to the least loaded shard.
+
+Usage:
+    python3 scripts/shard.py plan --kind scan --shards 8              # JSON matrix for all apps
+    python3 scripts/shard.py plan --kind e2e --shards 4 dex kyverno   # only the given apps
+    python3 scripts/shard.py apps --kind e2e --shard 2/4              # apps of one shard, one per line
+    python3 scripts/shard.py record e2e dex 312.5                     # record a duration (seconds)
+    python3 scripts/shard.py merge shard-1.json shard-2.json          # fold other durations files in
+
+Matrix output ({"include": [...]}) can be used directly as a GitHub Actions
+strategy.matrix; each entry has `shard` ("i/N"), `apps` (space separated) and
+`estimate` (seconds).
+
+Environment variables:
+    CATALOG_DURATIONS_FILE - durations store (default: $CATALOG_CACHE_DIR/durations.json)
+"""
+
+import argparse
+import fcntl
+import heapq
+import json
+import os
+import statistics
+from contextlib import contextmanager
+from pathlib import Path
+
+import fsutil
+import helm_cache
+
+ROOT_DIR = Path(__file__).parent.parent
+APPS_DIR = ROOT_DIR / "apps"
+DURATIONS_FILE = Path(os.environ.get("CATALOG_DURATIONS_FILE", helm_cache.CACHE_DIR / "durations.json"))
+
+KINDS = ("scan", "e2e")
+DEFAULT_SECONDS = 60.0
+# Weight of a new measurement against the recorded value, smooths out noisy runs
+SMOOTHING = 0.5
+
+
+# ---------------------------------------------------------------------------
+# Durations store: {kind: {app: {item: seconds}}}
+# ---------------------------------------------------------------------------
+
+def load_durations(path: Path = DURATIONS_FILE) -> dict:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+@contextmanager
+def _locked(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def _update(durations: dict, kind: str, app: str, item: str, seconds: float):
+    items = durations.setdefault(kind, {}).setdefault(app, {})
+    previous = items.get(item)
+    if previous is None:
+        items[item] = round(seconds, 1)
+    else:
+        items[item] = round(previous + SMOOTHING * (seconds - previous), 1)
+
+
+def record(kind: str, app: str, item: str, seconds: float, path: Path = DURATIONS_FILE):
+    """Record how long one work item (a chart version, an e2e run) of an app took."""
+    with _locked(path):
+        durations = load_durations(path)
+        _update(durations, kind, app, item, seconds)
+        fsutil.write_atomic(path, json.dumps(durations, indent=2, sort_keys=True).encode())
+
+
+def merge(sources: list[Path], path: Path = DURATIONS_FILE):
+    """Fold durations recorded elsewhere (e.g. by parallel CI jobs) into path."""
+    with _locked(path):
+        durations = load_durations(path)
+        for source in sources:
+            for kind, apps in load_durations(Path(source)).items():
+                for app, items in apps.items():
+                    for item, seconds in items.items():
+                        _update(durations, kind, app, item, seconds)
+        fsutil.write_atomic(path, json.dumps(durations, indent=2, sort_keys=True).encode())
+
+
+# ---------------------------------------------------------------------------
+# Planning
+# ---------------------------------------------------------------------------
+
+def all_apps(kind: str) -> list[str]:
+    marker = "charts/st-charts.yaml" if kind == "scan" else "example/Chart.yaml"
+    return sorted(d.name for d in APPS_DIR.iterdir()
+                  if (d / marker).exists() and d.name != "k0rdent-utils")
+
+
+def work_items(kind: str, app: str) -> list[str]:
+    """Units of work an app consists of: scanned chart versions, or the app itself for e2e."""
+    if kind == "scan":
+        import scan_app
+        return [f"{c['name']}-{c['version']}" for c in scan_app.get_charts(app)] or [app]
+    return [app]
+
+
+def estimate(kind: str, apps: list[str], durations: dict) -> dict[str, float]:
+    """Estimated seconds per app."""
+    recorded = durations.get(kind, {})
+    known = [s for items in recorded.values() for s in items.values()]
+    default = statistics.median(known) if known else DEFAULT_SECONDS
+    return {
+        app: sum(recorded.get(app, {}).get(item, default) for item in work_items(kind, app))
+        for app in apps
+    }
+
+
+def plan(costs: dict[str, float], shards: int) -> list[dict]:
+    """Longest-processing-time-first bin packing into `shards` balanced shards."""
+    bins = [{"apps": [], "estimate": 0.0} for _ in range(shards)]
+    heap = [(0.0, i) for i in range(shards)]
+    for app in sorted(costs, key=lambda a: (-costs[a], a)):
+        load, i = heapq.heappop(heap)
+        bins[i]["apps"].append(app)
+        bins[i]["estimate"] = load + costs[app]
+        heapq.heappush(heap, (bins[i]["estimate"], i))
+    return bins
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """'2/4' -> (2, 4), 1-based."""
+    try:
+        index, total = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid shard '{spec}', expected i/N")
+    if not 1 <= index <= total:
+        raise argparse.ArgumentTypeError(f"invalid shard '{spec}', expected 1 <= i <= N")
+    return index, total
+
+
+def shard_apps(kind: str, apps: list[str], index: int, total: int) -> list[str]:
+    """Apps of shard index (1-based) of total out of apps, balanced on recorded durations."""
+    bins = plan(estimate(kind, apps, load_durations()), total)
+    return sorted(bins[index - 1]["apps"])
+
+
+def matrix(kind: str, apps: list[str], shards: int) -> dict:
+    bins = plan(estimate(kind, apps, load_durations()), min(shards, len(apps)) or 1)
+    return {"include": [
+        {"shard": f"{i}/{len(bins)}", "apps": " ".join(sorted(b["apps"])), "estimate": round(b["estimate"])}
+        for i, b in enumerate(bins, 1) if b["apps"]
+    ]}
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan cost-balanced shards of catalog scans and e2e tests")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = sub.add_parser("plan", help="Print a JSON matrix of N balanced shards")
+    plan_parser.add_argument("--kind", choices=KINDS, required=True)
+    plan_parser.add_argument("--shards", type=int, required=True)
+    plan_parser.add_argument("apps", nargs="*", help="Apps to plan (default: all)")
+
+    apps_parser = sub.add_parser("apps", help="Print the apps of one shard")
+    apps_parser.add_argument("--kind", choices=KINDS, required=True)
+    apps_parser.add_argument("--shard", type=parse_shard, required=True, metavar="i/N", help="Shard, 1-based")
+    apps_parser.add_argument("apps", nargs="*", help="Apps to plan (default: all)")
+
+    record_parser = sub.add_parser("record", help="Record a duration in seconds")
+    record_parser.add_argument("kind", choices=KINDS)
+    record_parser.add_argument("app")
+    record_parser.add_argument("seconds", type=float)
+    record_parser.add_argument("--item", help="Work item (default: the app itself)")
+
+    merge_parser = sub.add_parser("merge", help="Merge durations files into the store")
+    merge_parser.add_argument("files", nargs="+")
+
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        if args.shards < 1:
+            parser.error("--shards must be at least 1")
+        print(json.dumps(matrix(args.kind, args.apps or all_apps(args.kind), args.shards)))
+    elif args.command == "apps":
+        apps = shard_apps(args.kind, args.apps or all_apps(args.kind), *args.shard)
+        print("\n".join(apps))
+    elif args.command == "record":
+        record(args.kind, args.app, args.item or args.app, args.seconds)
+    elif args.command == "merge":
+        merge([Path(f) for f in args.files if os.path.exists(f)])
+
+
+if __name__ == "__main__":
+    main()
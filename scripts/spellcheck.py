@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Spell check the summary and description of apps' data.yaml.
+
+All apps are checked in one process against one persistent `hunspell -a`
+pipe, and every failing app is reported, not just the first one. Words known
+to the catalog dictionaries (hunspell_dict.txt and apps/*/hunspell_dict.txt)
+are accepted with hunspell's personal dictionary casing rules.
+
+Hunspell's verdict only depends on the text, so the words it does not know are
+cached per text hash in $CATALOG_CACHE_DIR/spellcheck.json. Unchanged apps are
+only matched against the (possibly updated) catalog dictionaries. A run over
+all apps drops the entries of texts that no longer exist.
+
+Usage:
+    python3 scripts/spellcheck.py              # all apps
+    python3 scripts/spellcheck.py dex kyverno
+    python3 scripts/spellcheck.py --no-cache
+
+Environment variables:
+    HUNSPELL_DICT - hunspell dictionary (default: en_US)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import fsutil
+import helm_cache
+import yaml
+
+ROOT_DIR = Path(__file__).parent.parent
+APPS_DIR = ROOT_DIR / "apps"
+CACHE_FILE = helm_cache.CACHE_DIR / "spellcheck.json"
+HUNSPELL_DICT = os.environ.get("HUNSPELL_DICT", "en_US")
+FIELDS = ("summary", "description")
+
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+# Whitespace and ASCII punctuation, as `tr '[:space:][:punct:]' '\n'` splits
+SEPARATORS = re.compile(r"[\s!-/:-@\[-`{-~]+")
+
+
+class Hunspell:
+    """A persistent `hunspell -a` process (ispell pipe protocol, terse mode)."""
+
+    def __init__(self, dictionary: str = HUNSPELL_DICT):
+        self.proc = subprocess.Popen(["hunspell", "-a", "-i", "utf-8", "-d", dictionary],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                                     encoding="utf-8", bufsize=1)
+        self.proc.stdout.readline()  # version banner
+        self.proc.stdin.write("!\n")  # terse: report misspelled words only
+
+    def unknown(self, words: list[str]) -> list[str]:
+        """Words of the list hunspell does not know."""
+        if not words:
+            return []
+        # '^' keeps a line from being read as a pipe command
+        self.proc.stdin.write("^" + " ".join(words) + "\n")
+        self.proc.stdin.flush()
+        unknown = []
+        for line in self.proc.stdout:
+            if not line.strip():
+                break
+            if line[0] in "&#":
+                unknown.append(line.split()[1])
+        return unknown
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
+
+
+def load_dictionary() -> set[str]:
+    words = set()
+    for path in [ROOT_DIR / "hunspell_dict.txt", *sorted(APPS_DIR.glob("*/hunspell_dict.txt"))]:
+        with open(path, encoding="utf-8") as f:
+            words.update(line.strip() for line in f if line.strip())
+    return words
+
+
+def is_known(word: str, dictionary: set[str]) -> bool:
+    """Personal dictionary casing: 'foo' also accepts 'Foo' and 'FOO', 'Foo' also accepts 'FOO'."""
+    if word in dictionary:
+        return True
+    if word.isupper():
+        return word.lower() in dictionary or word.capitalize() in dictionary
+    return word == word.capitalize() and word.lower() in dictionary
+
+
+def app_words(app: str) -> list[str]:
+    with open(APPS_DIR / app / "data.yaml", encoding="utf-8") as f:
+        data = yaml.load(f, Loader=YamlLoader) or {}
+    text = "\n".join(str(data.get(field) or "") for field in FIELDS)
+    return sorted({word for word in SEPARATORS.split(text) if word})
+
+
+def check(apps: list[str], use_cache: bool = True, prune: bool = False) -> dict[str, list[str]]:
+    """Unknown words per app, for apps that have any. prune keeps only the cache entries of these apps."""
+    cache = {}
+    if use_cache and CACHE_FILE.exists():
+        with open(CACHE_FILE) as f:
+            cache = json.load(f)
+    dictionary = load_dictionary()
+    hunspell = None
+    failures = {}
+    used = set()
+    try:
+        for app in apps:
+            words = app_words(app)
+            key = hashlib.sha256("\n".join([HUNSPELL_DICT, *words]).encode()).hexdigest()
+            used.add(key)
+            if key not in cache:
+                if hunspell is None:
+                    hunspell = Hunspell()
+                cache[key] = sorted(set(hunspell.unknown(words)))
+            unknown = [word for word in cache[key] if not is_known(word, dictionary)]
+            if unknown:
+                failures[app] = unknown
+    finally:
+        if hunspell:
+            hunspell.close()
+    if use_cache:
+        if prune:
+            cache = {key: cache[key] for key in used}
+        fsutil.write_atomic(CACHE_FILE, json.dumps(cache, sort_keys=True).encode())
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spell check apps' data.yaml summary and description")
+    parser.add_argument("apps", nargs="*", help="Apps to check (default: all)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the results cache")
+    args = parser.parse_args()
+
+    apps = args.apps or sorted(p.parent.name for p in APPS_DIR.glob("*/data.yaml"))
+    print(f"⏳ Running spell check for {len(apps)} data.yaml files")
+    failures = check(apps, not args.no_cache, prune=not args.apps)
+    for app, words in failures.items():
+        print("==========")
+        print(f"❌ Some unknown words detected in spell check (apps/{app}/data.yaml):")
+        print("\n".join(words))
+        print(f"Fix them or add to 'apps/{app}/hunspell_dict.txt' - spell check dictionary.")
+    if failures:
+        print("==========")
+        print(f"❌ Spell check failed for {len(failures)} apps: {' '.join(failures)}")
+        sys.exit(1)
+    print("✅ Spell check OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Scripts import their siblings directly, as when run as `python3 scripts/x.py`
+sys.path.insert(0, str(Path(__file__).parent.parent))
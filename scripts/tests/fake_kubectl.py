@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""kubectl stand-in replaying recorded list responses and watch event streams.
+
+Only `kubectl get --raw PATH` is supported. FAKE_KUBECTL_RECORDING points to a
+JSON file:
+
+    {"lists": [<list response>, ...],
+     "watches": [[<event>, ...], {"events": [...], "exit": 1, "stderr": "..."}, ...]}
+
+A path with `watch=1` in its query replays the next watch, any other path the
+next list. When a recording is used up, lists repeat the last response and
+watches end without events. Every call is appended to <recording>.calls as a
+JSON list of arguments, the replay position is kept in <recording>.state.
+"""
+
+import json
+import os
+import sys
+
+
+def main():
+    recording = os.environ["FAKE_KUBECTL_RECORDING"]
+    with open(recording + ".calls", "a") as f:
+        f.write(json.dumps(sys.argv[1:]) + "\n")
+    if sys.argv[1:3] != ["get", "--raw"] or len(sys.argv) != 4:
+        sys.exit(f"fake kubectl: unsupported command {sys.argv[1:]}")
+
+    with open(recording) as f:
+        data = json.load(f)
+    state_file = recording + ".state"
+    state = {"lists": 0, "watches": 0}
+    if os.path.exists(state_file):
+        with open(state_file) as f:
+            state = json.load(f)
+
+    kind = "watches" if "watch=1" in sys.argv[3] else "lists"
+    recorded = data.get(kind, [])
+    position = state[kind]
+    state[kind] += 1
+    with open(state_file, "w") as f:
+        json.dump(state, f)
+
+    if kind == "lists":
+        if not recorded:
+            sys.exit("fake kubectl: no list recorded")
+        print(json.dumps(recorded[min(position, len(recorded) - 1)]))
+        return
+    stream = recorded[position] if position < len(recorded) else []
+    if isinstance(stream, list):
+        stream = {"events": stream}
+    for event in stream.get("events", []):
+        print(json.dumps(event), flush=True)
+    if stream.get("stderr"):
+        print(stream["stderr"], file=sys.stderr)
+    sys.exit(stream.get("exit", 0))
+
+
+if __name__ == "__main__":
+    main()
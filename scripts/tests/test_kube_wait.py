@@ -0,0 +1,166 @@
+"""kube_wait waiters against fake_kubectl.py replaying recorded list/watch streams."""
+
+import json
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import kube_wait
+import pytest
+
+FAKE_KUBECTL = Path(__file__).parent / "fake_kubectl.py"
+
+
+@pytest.fixture
+def kubectl(tmp_path, monkeypatch):
+    """Returns replay(lists, watches) that records a session and returns a reader of the calls made."""
+    recording = tmp_path / "recording.json"
+    monkeypatch.setattr(kube_wait, "KUBECTL", str(FAKE_KUBECTL))
+    monkeypatch.setattr(kube_wait, "RETRY_SECONDS", 0)
+    monkeypatch.setattr(kube_wait.time, "sleep", lambda seconds: None)
+    monkeypatch.setenv("FAKE_KUBECTL_RECORDING", str(recording))
+
+    def replay(lists, watches=()):
+        recording.write_text(json.dumps({"lists": lists, "watches": list(watches)}))
+
+        def calls():
+            path = Path(f"{recording}.calls")
+            return [json.loads(line)[-1] for line in path.read_text().splitlines()] if path.exists() else []
+        return calls
+    return replay
+
+
+def pod(name, rv, phase="Pending", ready=None, waiting=None):
+    statuses = []
+    if ready is not None:
+        statuses.append({"name": "app", "ready": ready, "state": {"running": {}}})
+    if waiting:
+        statuses.append({"name": "app", "ready": False, "state": {"waiting": {"reason": waiting}}})
+    return {"metadata": {"name": name, "namespace": "dex", "resourceVersion": str(rv)},
+            "status": {"phase": phase, "containerStatuses": statuses}}
+
+
+def pod_list(rv, *pods):
+    return {"metadata": {"resourceVersion": str(rv)}, "items": list(pods)}
+
+
+def event(kind, obj):
+    return {"type": kind, "object": obj}
+
+
+def watch_params(path):
+    return {k: v[0] for k, v in parse_qs(urlsplit(path).query).items()}
+
+
+def test_pods_ready_from_watch_events(kubectl):
+    calls = kubectl(
+        [pod_list(10, pod("dex-1", 9))],
+        [[event("MODIFIED", pod("dex-1", 11, "Running", ready=False)),
+          event("BOOKMARK", {"metadata": {"resourceVersion": "12"}}),
+          event("MODIFIED", pod("dex-1", 13, "Running", ready=True))]])
+    assert kube_wait.wait_pods("dex", "ready", timeout=30)
+    paths = calls()
+    assert paths[0] == "/api/v1/namespaces/dex/pods"
+    assert watch_params(paths[1])["resourceVersion"] == "10"
+    assert len(paths) == 2
+
+
+def test_pods_ready_already_at_list(kubectl):
+    calls = kubectl([pod_list(10, pod("dex-1", 9, "Running", ready=True))])
+    assert kube_wait.wait_pods("dex", "ready", timeout=30)
+    assert len(calls()) == 1
+
+
+def test_pods_creating_waits_for_expected_pod(kubectl):
+    kubectl(
+        [pod_list(10, pod("dex-1", 9, waiting="ContainerCreating"))],
+        [[event("ADDED", pod("dex-db-1", 11, waiting="ImagePullBackOff")),
+          event("MODIFIED", pod("dex-db-1", 12, waiting="ContainerCreating"))]])
+    assert kube_wait.wait_pods("dex", "creating", expected=["dex-db-"], timeout=30)
+
+
+def test_pods_creating_not_reached(kubectl):
+    kubectl([pod_list(10, pod("dex-1", 9, waiting="ImagePullBackOff"))])
+    assert not kube_wait.wait_pods("dex", "creating", timeout=0.5)
+
+
+def test_pods_removed(kubectl):
+    kubectl(
+        [pod_list(10, pod("dex-1", 8, "Running", ready=True), pod("dex-2", 9, "Running", ready=True))],
+        [[event("MODIFIED", pod("dex-1", 11, "Running", ready=False)),
+          event("DELETED", pod("dex-1", 12)),
+          event("DELETED", pod("dex-2", 13))]])
+    assert kube_wait.wait_pods_removed("dex", timeout=30)
+
+
+def test_watch_resumes_from_last_resource_version(kubectl):
+    calls = kubectl(
+        [pod_list(10, pod("dex-1", 9))],
+        [[event("MODIFIED", pod("dex-1", 15, "Running", ready=False))],
+         [event("MODIFIED", pod("dex-1", 16, "Running", ready=True))]])
+    assert kube_wait.wait_pods("dex", "ready", timeout=30)
+    paths = calls()
+    assert [watch_params(p)["resourceVersion"] for p in paths[1:]] == ["10", "15"]
+    assert len(paths) == 3  # no relist between the watches
+
+
+def test_expired_watch_relists(kubectl):
+    gone = {"type": "ERROR", "object": {"kind": "Status", "code": 410, "message": "too old resource version"}}
+    calls = kubectl(
+        [pod_list(10, pod("dex-1", 9)), pod_list(20, pod("dex-1", 19, "Running", ready=False))],
+        [[gone],
+         [event("MODIFIED", pod("dex-1", 21, "Running", ready=True))]])
+    assert kube_wait.wait_pods("dex", "ready", timeout=30)
+    paths = calls()
+    assert paths[2] == "/api/v1/namespaces/dex/pods"
+    assert watch_params(paths[3])["resourceVersion"] == "20"
+
+
+def test_failed_watch_relists(kubectl):
+    calls = kubectl(
+        [pod_list(10, pod("dex-1", 9)), pod_list(20, pod("dex-1", 19, "Running", ready=True))],
+        [{"events": [], "exit": 1, "stderr": "connection refused"}])
+    assert kube_wait.wait_pods("dex", "ready", timeout=30)
+    assert len(calls()) == 3
+
+
+def cluster(rv, ready):
+    return {"metadata": {"name": "c1", "namespace": "kcm-system", "resourceVersion": str(rv)},
+            "status": {"conditions": [{"type": "Ready", "status": "True" if ready else "False"}]}}
+
+
+def test_cluster_ready(kubectl):
+    calls = kubectl([pod_list(10, cluster(9, False))], [[event("MODIFIED", cluster(11, True))]])
+    assert kube_wait.wait_cluster("c1", timeout=30)
+    assert calls()[0] == "/apis/k0rdent.mirantis.com/v1beta1/namespaces/kcm-system/clusterdeployments"
+
+
+def test_cluster_removed(kubectl):
+    kubectl([pod_list(10, cluster(9, True))], [[event("DELETED", cluster(11, True))]])
+    assert kube_wait.wait_cluster_removed("c1", timeout=30)
+
+
+def template(name, rv, valid):
+    return {"metadata": {"name": name, "namespace": "kcm-system", "resourceVersion": str(rv)},
+            "status": {"valid": valid}}
+
+
+def test_servicetemplates_valid(kubectl):
+    kubectl([pod_list(10, template("dex-1", 9, False))], [[event("MODIFIED", template("dex-1", 11, True))]])
+    assert kube_wait.wait_servicetemplates(timeout=30)
+
+
+def test_no_servicetemplates_is_ok(kubectl):
+    calls = kubectl([pod_list(10)])
+    assert kube_wait.wait_servicetemplates(timeout=30)
+    assert len(calls()) == 1
+
+
+def test_servicetemplates_wait_for_named(kubectl):
+    kubectl([pod_list(10)], [[event("ADDED", template("dex-1", 11, False)),
+                              event("MODIFIED", template("dex-1", 12, True))]])
+    assert kube_wait.wait_servicetemplates(timeout=30, names=["dex-1"])
+
+
+def test_servicetemplates_named_missing(kubectl):
+    kubectl([pod_list(10, template("other", 9, True))])
+    assert not kube_wait.wait_servicetemplates(timeout=0.5, names=["dex-1"])
@@ -0,0 +1,145 @@
+"""update_api_data's GitHubClient against a local stand-in for the GitHub REST API."""
+
+import concurrent.futures
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import update_api_data
+
+
+class FakeGitHub:
+    """Serves /repos/{owner}/{repo}, replaying queued responses per path before the default one."""
+
+    def __init__(self):
+        self.responses = {}  # path -> [(status, headers, body)]
+        self.delay = 0.0
+        self.default_headers = {"X-RateLimit-Remaining": "4000"}
+        self.requests = []  # (time, path, headers)
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def queue(self, path: str, status: int, headers: dict | None = None, body: bytes = b""):
+        self.responses.setdefault(path, []).append((status, headers or {}, body))
+
+    def respond(self, path: str, headers) -> tuple[int, dict, bytes]:
+        with self.lock:
+            self.requests.append((time.monotonic(), path, dict(headers)))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            queued = self.responses.get(path)
+            response = queued.pop(0) if queued else None
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        if response:
+            return response
+        stars = sum(map(ord, path)) % 1000
+        return 200, {"ETag": f'"{stars}"'}, json.dumps({"stargazers_count": stars}).encode()
+
+
+@pytest.fixture
+def github(monkeypatch):
+    fake = FakeGitHub()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            status, headers, body = fake.respond(self.path, self.headers)
+            self.send_response(status)
+            for key, value in {**fake.default_headers, **headers}.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    monkeypatch.setattr(update_api_data, "GITHUB_API_URL", f"http://127.0.0.1:{server.server_port}")
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+def expected_stars(repo: str) -> int:
+    return sum(map(ord, f"/repos/{repo}")) % 1000
+
+
+def test_stars_fetched_concurrently(github):
+    github.delay = 0.2
+    repos = [f"org/repo-{i}" for i in range(8)]
+    client = update_api_data.GitHubClient(max_workers=4)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda r: update_api_data.fetch_github_stars(client, r, {}), repos))
+    client.pool.close()
+    assert [r["gh_stars"] for r in results] == [expected_stars(r) for r in repos]
+    assert github.max_in_flight == 4
+
+
+def test_conditional_request_not_modified(github):
+    github.queue("/repos/org/app", 304)
+    client = update_api_data.GitHubClient()
+    cached = {"gh_stars": 7, "etag": '"abc"'}
+    assert update_api_data.fetch_github_stars(client, "org/app", cached) == {**cached, "not_modified": True}
+    assert github.requests[0][2]["If-None-Match"] == '"abc"'
+
+
+def test_low_remaining_budget_shrinks_concurrency(github):
+    github.default_headers = {"X-RateLimit-Remaining": "8"}
+    client = update_api_data.GitHubClient(max_workers=8)
+    update_api_data.fetch_github_stars(client, "org/app", {})
+    assert client.limiter.limit == 2
+
+
+def test_exhausted_budget_pauses_until_reset(github):
+    github.queue("/repos/org/app", 200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(time.time()))},
+                 b'{"stargazers_count": 1}')
+    client = update_api_data.GitHubClient()
+    assert update_api_data.fetch_github_stars(client, "org/app", {})["gh_stars"] == 1
+    update_api_data.fetch_github_stars(client, "org/other", {})
+    (first, _, _), (second, _, _) = github.requests
+    assert second - first >= 0.9
+
+
+def test_retry_after(github):
+    github.queue("/repos/org/app", 429, {"Retry-After": "0.3"})
+    client = update_api_data.GitHubClient()
+    assert update_api_data.fetch_github_stars(client, "org/app", {})["gh_stars"] == expected_stars("org/app")
+    (first, _, _), (second, _, _) = github.requests
+    assert second - first >= 0.3
+
+
+def test_secondary_rate_limit_backs_off(github, monkeypatch):
+    monkeypatch.setattr(update_api_data, "SECONDARY_BACKOFF", 0.1)
+    body = b'{"message": "You have exceeded a secondary rate limit"}'
+    github.queue("/repos/org/app", 403, {}, body)
+    github.queue("/repos/org/app", 403, {}, body)
+    client = update_api_data.GitHubClient()
+    assert update_api_data.fetch_github_stars(client, "org/app", {})["gh_stars"] == expected_stars("org/app")
+    times = [t for t, _, _ in github.requests]
+    assert len(times) == 3
+    assert times[1] - times[0] >= 0.1 and times[2] - times[1] >= 0.2  # doubled
+    assert client.limiter.backoff == 0.1  # reset by the successful response
+
+
+def test_forbidden_without_rate_limit_is_not_retried(github):
+    github.queue("/repos/org/private", 403, {}, b'{"message": "Resource not accessible"}')
+    client = update_api_data.GitHubClient()
+    assert update_api_data.fetch_github_stars(client, "org/private", {}) is None
+    assert len(github.requests) == 1
+
+
+def test_gives_up_after_max_attempts(github, monkeypatch):
+    monkeypatch.setattr(update_api_data, "MAX_ATTEMPTS", 2)
+    for _ in range(2):
+        github.queue("/repos/org/app", 429, {"Retry-After": "0"})
+    client = update_api_data.GitHubClient()
+    assert update_api_data.fetch_github_stars(client, "org/app", {}) is None
+    assert len(github.requests) == 2
@@ -1,26 +1,56 @@
 #!/usr/bin/env python3
-"""Fetch GitHub stars and GHCR pull counts, store in per-app YAML files.
+"""Fetch GitHub stars and GHCR pull counts, store them in apps/_stats.json.
+
+Stars entries also keep the ETag/Last-Modified of the last GitHub response; refreshes
+send them back as conditional requests, and a 304 (which costs no rate limit)
+only bumps `updated`. The store is written once per run, atomically.
 
 Usage:
     python3 scripts/update_api_data.py stars                          # update stars for all apps
     python3 scripts/update_api_data.py stars cert-manager nginx       # specific apps
     python3 scripts/update_api_data.py stars --max-age PT6H           # skip data < 6 hours old
     python3 scripts/update_api_data.py stars --max-age P0D            # force update
-    python3 scripts/update_api_data.py pulls                          # not implemented yet
+    python3 scripts/update_api_data.py stars --graphql                # batched GraphQL, 100 repos per request
+    python3 scripts/update_api_data.py pulls                          # update GHCR pull counts
+    python3 scripts/update_api_data.py migrate                        # import per-app stars.yaml/pulls.yaml
+
+Environment variables:
+    GITHUB_TOKEN    - GitHub token, raises the API rate limit from 60 to 5000 requests/hour
+    GITHUB_API_URL  - GitHub REST API endpoint (default: https://api.github.com)
+    GITHUB_GRAPHQL_URL - GitHub GraphQL endpoint for --graphql (default: $GITHUB_API_URL/graphql)
+    GHCR_PACKAGES_URL  - packages listing scraped by pulls (default: k0rdent org, catalog repo)
 """
 
 import argparse
+import codecs
+import concurrent.futures
 import json
 import os
 import re
-import urllib.request
+import threading
+import time
 from datetime import datetime, timedelta, timezone
+from html.parser import HTMLParser
 
+import api_stats
+import http_pool
 import yaml
+from http_pool import HTTPError, HTTPPool
 
 CATALOG_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 APPS_DIR = os.path.join(CATALOG_ROOT, 'apps')
 
+GITHUB_API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+GITHUB_GRAPHQL_URL = os.environ.get('GITHUB_GRAPHQL_URL', f'{GITHUB_API_URL}/graphql')
+# GitHub caps a query at 500k nodes; 100 single-field lookups stay far below it
+GRAPHQL_BATCH = 100
+GHCR_PACKAGES_URL = os.environ.get('GHCR_PACKAGES_URL', 'https://github.com/orgs/k0rdent/packages?repo_name=catalog')
+PACKAGE_PREFIX = 'catalog/charts/'
+MAX_ATTEMPTS = 4
+# GitHub asks to wait at least a minute after a secondary rate limit without Retry-After
+SECONDARY_BACKOFF = 60.0
+MAX_BACKOFF = 600.0
+
 
 def load_dotenv():
     env_file = os.path.join(CATALOG_ROOT, '.env')
@@ -50,12 +80,8 @@ def parse_iso8601_duration(duration: str) -> timedelta:
     )
 
 
-def should_skip(yaml_file: str, max_age: timedelta) -> bool:
-    """Check if existing YAML data is fresh enough to skip."""
-    if not os.path.exists(yaml_file):
-        return False
-    with open(yaml_file) as f:
-        data = yaml.safe_load(f)
+def should_skip(data: dict, max_age: timedelta) -> bool:
+    """Check if an existing stats entry is fresh enough to skip."""
     if not data or 'updated' not in data:
         return False
     updated = datetime.fromisoformat(data['updated'].replace('Z', '+00:00'))
@@ -81,25 +107,175 @@ def get_all_app_names() -> list:
     ])
 
 
-def fetch_github_stars(github_repo: str) -> int:
-    """Fetch star count from GitHub API."""
-    if not github_repo:
-        return 0
-    url = f"https://api.github.com/repos/{github_repo}"
-    req = urllib.request.Request(url, headers={
-        "Accept": "application/vnd.github.v3+json",
-        "User-Agent": "k0rdent-catalog",
-    })
-    token = os.environ.get("GITHUB_TOKEN", "")
-    if token:
-        req.add_header("Authorization", f"token {token}")
+class RateLimiter:
+    """Bounds concurrent GitHub API requests by the remaining rate-limit budget.
+
+    Concurrency shrinks as X-RateLimit-Remaining runs low, all workers pause
+    until X-RateLimit-Reset once it is exhausted, and secondary rate limits
+    (403/429 with Retry-After, or without any hint) pause everyone with
+    exponential backoff.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.limit = max_workers
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.backoff = SECONDARY_BACKOFF
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while True:
+                wait = self.paused_until - time.time()
+                if wait <= 0 and self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                self.cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def pause(self, seconds: float):
+        with self.cond:
+            self.paused_until = max(self.paused_until, time.time() + seconds)
+            self.cond.notify_all()
+
+    def update(self, headers):
+        """Adapt concurrency to the rate-limit headers of a response."""
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        remaining = int(remaining)
+        with self.cond:
+            # Keep in-flight requests well within the remaining budget
+            self.limit = max(1, min(self.max_workers, remaining // 4))
+            self.backoff = SECONDARY_BACKOFF
+            self.cond.notify_all()
+        if remaining == 0:
+            reset = int(headers.get("X-RateLimit-Reset") or 0)
+            self.pause(max(reset - time.time(), 0) + 1)
+
+    def on_limited(self, headers) -> float:
+        """Pause for a rate-limited response. Returns the pause in seconds."""
+        if headers.get("Retry-After"):
+            delay = float(headers["Retry-After"])
+        elif headers.get("X-RateLimit-Remaining") == "0":
+            delay = max(int(headers.get("X-RateLimit-Reset") or 0) - time.time(), 0) + 1
+        else:
+            with self.cond:
+                delay, self.backoff = self.backoff, min(self.backoff * 2, MAX_BACKOFF)
+        self.pause(delay)
+        return delay
+
+
+def _is_rate_limited(resp) -> bool:
+    if resp.status == 429:
+        return True
+    if resp.status != 403:
+        return False
+    if resp.headers.get("Retry-After") or resp.headers.get("X-RateLimit-Remaining") == "0":
+        return True
+    return b"rate limit" in resp.read().lower()
+
+
+class GitHubClient:
+    """REST client for repository metadata sharing one keep-alive pool across threads."""
+
+    def __init__(self, token: str = "", max_workers: int = 8):
+        self.pool = HTTPPool(timeout=10, max_idle_per_host=max_workers)
+        self.limiter = RateLimiter(max_workers)
+        self.headers = {"Accept": "application/vnd.github.v3+json"}
+        if token:
+            self.headers["Authorization"] = f"token {token}"
+
+    def request(self, method: str, url: str, headers: dict | None = None, body: bytes | None = None):
+        """Send a request, retrying rate-limited responses. Returns the response."""
+        headers = {**self.headers, **(headers or {})}
+        for _ in range(MAX_ATTEMPTS):
+            self.limiter.acquire()
+            try:
+                resp = self.pool.request(method, url, headers=headers, body=body)
+            finally:
+                self.limiter.release()
+            if _is_rate_limited(resp):
+                delay = self.limiter.on_limited(resp.headers)
+                print(f"  Rate limited on {url}, pausing {delay:.0f}s")
+                continue
+            self.limiter.update(resp.headers)
+            return resp
+        raise HTTPError(url, resp.status, "rate limited")
+
+    def get_repo(self, github_repo: str, headers: dict | None = None):
+        """GET /repos/{owner}/{repo}."""
+        return self.request("GET", f"{GITHUB_API_URL}/repos/{github_repo}", headers)
+
+    def graphql(self, query: str, variables: dict) -> dict:
+        """POST a GraphQL query. Returns the response `data`, which may be partial."""
+        body = json.dumps({"query": query, "variables": variables}).encode()
+        resp = self.request("POST", GITHUB_GRAPHQL_URL, {"Content-Type": "application/json"}, body)
+        resp.raise_for_status()
+        result = json.loads(resp.read())
+        for error in result.get("errors") or []:
+            print(f"  Warning: GraphQL: {error.get('message', error)}")
+        return result.get("data") or {}
+
+
+def fetch_github_stars(client: GitHubClient, github_repo: str, cached: dict) -> dict | None:
+    """Fetch star count from GitHub API, revalidating the cached ETag/Last-Modified.
+
+    Returns {gh_stars, etag, last_modified, not_modified} or None on failure. A 304
+    does not count against the rate limit and keeps the cached star count.
+    """
+    headers = {}
+    if 'gh_stars' in cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
     try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            data = json.loads(resp.read())
-            return data.get("stargazers_count", 0)
-    except Exception as e:
+        resp = client.get_repo(github_repo, headers)
+        if resp.status == 304:
+            return {**cached, 'not_modified': True}
+        resp.raise_for_status()
+        return {
+            'gh_stars': json.loads(resp.read()).get("stargazers_count", 0),
+            'etag': resp.headers.get('ETag', ''),
+            'last_modified': resp.headers.get('Last-Modified', ''),
+            'not_modified': False,
+        }
+    except (*http_pool.ERRORS, ValueError) as e:
         print(f"  Warning: GitHub stars failed for {github_repo}: {e}")
-        return 0
+        return None
+
+
+def fetch_github_stars_graphql(client: GitHubClient, github_repos: list[str]) -> dict[str, int]:
+    """Fetch stargazerCount for many repositories, GRAPHQL_BATCH aliased lookups per request.
+
+    Returns {owner/repo: stars}; repositories that could not be resolved are left out.
+    """
+    stars = {}
+    for start in range(0, len(github_repos), GRAPHQL_BATCH):
+        batch = github_repos[start:start + GRAPHQL_BATCH]
+        params, fields, variables = [], [], {}
+        for i, repo in enumerate(batch):
+            owner, _, name = repo.partition('/')
+            params.append(f"$o{i}: String!, $n{i}: String!")
+            fields.append(f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ stargazerCount }}")
+            variables[f"o{i}"], variables[f"n{i}"] = owner, name
+        query = f"query({', '.join(params)}) {{ {' '.join(fields)} }}"
+        try:
+            data = client.graphql(query, variables)
+        except (*http_pool.ERRORS, ValueError) as e:
+            print(f"  Warning: GraphQL stars failed for {len(batch)} repositories: {e}")
+            continue
+        for i, repo in enumerate(batch):
+            node = data.get(f"r{i}")
+            if node is not None:
+                stars[repo] = node.get("stargazerCount", 0)
+    return stars
 
 
 # --- Subcommand: stars ---
@@ -111,19 +287,23 @@ def cmd_stars(args):
 
     token = os.environ.get("GITHUB_TOKEN", "")
     if not token:
-        print("Warning: GITHUB_TOKEN not set. Requests may be rate-limited (60/hour).")
+        if args.graphql:
+            print("Warning: GITHUB_TOKEN not set. The GitHub GraphQL API requires authentication.")
+        else:
+            print("Warning: GITHUB_TOKEN not set. Requests may be rate-limited (60/hour).")
 
     print(f"Updating stars for {len(app_names)} apps (max-age: {args.max_age})")
-    updated = 0
+    stats = api_stats.load()
+    targets = []
     for app_name in app_names:
         data_file = os.path.join(APPS_DIR, app_name, 'data.yaml')
-        stars_file = os.path.join(APPS_DIR, app_name, 'stars.yaml')
+        cached = api_stats.get(stats, app_name, 'stars')
 
         if not os.path.exists(data_file):
             print(f"  {app_name}: skipped (no data.yaml)")
             continue
 
-        if should_skip(stars_file, max_age):
+        if should_skip(cached, max_age):
             print(f"  {app_name}: skipped (fresh)")
             continue
 
@@ -135,17 +315,46 @@ def cmd_stars(args):
             print(f"  {app_name}: skipped (no github_repo)")
             continue
 
-        stars = fetch_github_stars(github_repo)
+        targets.append((app_name, github_repo, cached))
+
+    client = GitHubClient(token, max_workers=args.jobs)
+    if args.graphql:
+        by_repo = fetch_github_stars_graphql(client, sorted({t[1] for t in targets}))
+        results = []
+        for _, github_repo, cached in targets:
+            if github_repo not in by_repo:
+                print(f"  Warning: GitHub stars failed for {github_repo}")
+                results.append(None)
+            elif by_repo[github_repo] == cached.get('gh_stars'):
+                # Unchanged count, the REST validators are still good
+                results.append({**cached, 'not_modified': False})
+            else:
+                results.append({'gh_stars': by_repo[github_repo], 'not_modified': False})
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as executor:
+            results = list(executor.map(lambda t: fetch_github_stars(client, t[1], t[2]), targets))
+    client.pool.close()
 
-        with open(stars_file, 'w') as f:
-            yaml.dump({
-                'gh_stars': stars,
-                'updated': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
-            }, f, default_flow_style=False, sort_keys=False)
+    updated = 0
+    for (app_name, _, _), result in zip(targets, results):
+        if result is None:
+            continue
 
-        print(f"  {app_name}: {stars} stars")
+        stars = {
+            'gh_stars': result['gh_stars'],
+            'updated': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        }
+        # Validators for conditional requests on the next refresh
+        for key in ('etag', 'last_modified'):
+            if result.get(key):
+                stars[key] = result[key]
+        api_stats.put(stats, app_name, 'stars', stars)
+
+        note = " (not modified)" if result['not_modified'] else ""
+        print(f"  {app_name}: {result['gh_stars']} stars{note}")
         updated += 1
 
+    api_stats.save(stats)
     print(f"Done: {updated} updated, {len(app_names) - updated} skipped")
 
 
@@ -161,37 +370,100 @@ def parse_human_count(s: str) -> int:
     return int(s.replace(',', ''))
 
 
-def scrape_ghcr_pulls() -> dict:
-    """Scrape all pages of GitHub packages to get chart_name -> pull_count."""
+class PackagesPageParser(HTMLParser):
+    """Streaming parser for a GitHub org packages page.
+
+    Each package link (title="catalog/charts/NAME") opens a package; the text
+    following the next octicon-download icon is that package's download count,
+    so a package without a count never shifts counts onto its neighbours.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pulls = {}
+        self.total_pages = 1
+        self._package = None
+        self._in_download_svg = 0
+        self._want_count = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        title = attrs.get('title') or ''
+        if tag == 'a' and title.startswith(PACKAGE_PREFIX):
+            self._package = title[len(PACKAGE_PREFIX):]
+            self._want_count = False
+        elif tag == 'svg' and 'octicon-download' in (attrs.get('class') or ''):
+            self._in_download_svg = 1
+        elif self._in_download_svg:
+            self._in_download_svg += 1
+        if attrs.get('data-total-pages', '').isdigit():
+            self.total_pages = max(self.total_pages, int(attrs['data-total-pages']))
+        m = re.search(r'[?&]page=(\d+)', attrs.get('href') or '') if tag == 'a' else None
+        if m:
+            self.total_pages = max(self.total_pages, int(m.group(1)))
+
+    def handle_endtag(self, tag):
+        if self._in_download_svg:
+            self._in_download_svg -= 1
+            if not self._in_download_svg and self._package:
+                self._want_count = True
+
+    def handle_data(self, data):
+        if not self._want_count or not data.strip():
+            return
+        self._want_count = False
+        try:
+            self.pulls[self._package] = parse_human_count(data)
+        except ValueError:
+            pass
+
+
+def fetch_packages_page(pool: HTTPPool, page: int) -> PackagesPageParser:
+    """Fetch one packages page, parsing it while it streams in."""
+    parser = PackagesPageParser()
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    with pool.get(f"{GHCR_PACKAGES_URL}&page={page}", stream=True) as resp:
+        resp.raise_for_status()
+        for chunk in resp.iter_content():
+            parser.feed(decoder.decode(chunk))
+    parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+    return parser
+
+
+def scrape_ghcr_pulls(jobs: int = 8) -> dict:
+    """Scrape all pages of GitHub packages to get chart_name -> pull_count.
+
+    The first page tells how many pages there are; the rest are fetched concurrently.
+    """
     pulls = {}
-    page = 1
-    while True:
-        url = f"https://github.com/orgs/k0rdent/packages?repo_name=catalog&page={page}"
-        req = urllib.request.Request(url, headers={"User-Agent": "k0rdent-catalog"})
+    with HTTPPool(timeout=15, max_idle_per_host=jobs) as pool:
         try:
-            with urllib.request.urlopen(req, timeout=15) as resp:
-                html = resp.read().decode('utf-8')
-        except Exception as e:
-            print(f"  Warning: Failed to fetch page {page}: {e}")
-            break
-
-        names = re.findall(r'title="catalog/charts/([^"]+)"', html)
-        counts = re.findall(
-            r'octicon-download.*?</svg>\s*([\d,.]+[kKmM]?)\s*</span>',
-            html, re.DOTALL
-        )
-
-        if not names:
-            break
-
-        for name, count in zip(names, counts):
-            pulls[name] = parse_human_count(count)
-
-        # Check if there's a next page
-        if f'page={page + 1}' not in html:
-            break
-        page += 1
-        print(f"  Scraped page {page - 1}: {len(names)} packages")
+            first = fetch_packages_page(pool, 1)
+        except (*http_pool.ERRORS, ValueError) as e:
+            print(f"  Warning: Failed to fetch page 1: {e}")
+            return pulls
+        pulls.update(first.pulls)
+        print(f"  Scraped page 1: {len(first.pulls)} packages")
+
+        def fetch(page):
+            try:
+                return page, fetch_packages_page(pool, page)
+            except (*http_pool.ERRORS, ValueError) as e:
+                print(f"  Warning: Failed to fetch page {page}: {e}")
+                return page, None
+
+        # Paginators may only link a window of pages, so keep going while later pages reveal more
+        total_pages, next_page = first.total_pages, 2
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            while next_page <= total_pages:
+                pages = range(next_page, total_pages + 1)
+                next_page = total_pages + 1
+                for page, parser in executor.map(fetch, pages):
+                    if parser is not None:
+                        pulls.update(parser.pulls)
+                        total_pages = max(total_pages, parser.total_pages)
+                        print(f"  Scraped page {page}: {len(parser.pulls)} packages")
 
     print(f"  Total: {len(pulls)} packages scraped")
     return pulls
@@ -202,14 +474,13 @@ def cmd_pulls(args):
     app_names = args.apps if args.apps else get_all_app_names()
 
     print("Fetching GHCR pull counts...")
-    all_pulls = scrape_ghcr_pulls()
+    all_pulls = scrape_ghcr_pulls(args.jobs)
 
     print(f"Updating pulls for {len(app_names)} apps (max-age: {args.max_age})")
+    stats = api_stats.load()
     updated = 0
     for app_name in app_names:
-        pulls_file = os.path.join(APPS_DIR, app_name, 'pulls.yaml')
-
-        if should_skip(pulls_file, max_age):
+        if should_skip(api_stats.get(stats, app_name, 'pulls'), max_age):
             continue
 
         # Get first chart name for this app
@@ -219,19 +490,26 @@ def cmd_pulls(args):
 
         count = all_pulls.get(chart_name, 0)
 
-        with open(pulls_file, 'w') as f:
-            yaml.dump({
-                'gh_pulls': count,
-                'updated': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
-            }, f, default_flow_style=False, sort_keys=False)
+        api_stats.put(stats, app_name, 'pulls', {
+            'gh_pulls': count,
+            'updated': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        })
 
         if count > 0:
             print(f"  {app_name}: {count:,} pulls ({chart_name})")
         updated += 1
 
+    api_stats.save(stats)
     print(f"Done: {updated} updated, {len(app_names) - updated} skipped")
 
 
+# --- Subcommand: migrate ---
+
+def cmd_migrate(args):
+    count = api_stats.migrate()
+    print(f"Imported {count} stars.yaml/pulls.yaml files into {os.path.relpath(api_stats.STATS_FILE, CATALOG_ROOT)}")
+
+
 # --- Main ---
 
 def main():
@@ -245,6 +523,10 @@ def main():
     stars_parser.add_argument('apps', nargs='*', help='App names to update (default: all)')
     stars_parser.add_argument('--max-age', default='P1D',
                               help='Skip data newer than this ISO 8601 duration (default: P1D). Use P0D to force.')
+    stars_parser.add_argument('--jobs', type=int, default=8,
+                              help='Concurrent GitHub API requests, reduced as the rate limit runs low (default: 8)')
+    stars_parser.add_argument('--graphql', action='store_true',
+                              help=f'Fetch stars with batched GraphQL queries, {GRAPHQL_BATCH} repositories per request')
     stars_parser.set_defaults(func=cmd_stars)
 
     # pulls subcommand
@@ -252,8 +534,14 @@ def main():
     pulls_parser.add_argument('apps', nargs='*', help='App names to update (default: all)')
     pulls_parser.add_argument('--max-age', default='P1D',
                               help='Skip data newer than this ISO 8601 duration (default: P1D). Use P0D to force.')
+    pulls_parser.add_argument('--jobs', type=int, default=8,
+                              help='Concurrent package page fetches (default: 8)')
     pulls_parser.set_defaults(func=cmd_pulls)
 
+    # migrate subcommand
+    migrate_parser = subparsers.add_parser('migrate', help='Import per-app stars.yaml/pulls.yaml into apps/_stats.json')
+    migrate_parser.set_defaults(func=cmd_migrate)
+
     args = parser.parse_args()
     args.func(args)
 
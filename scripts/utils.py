@@ -1,12 +1,18 @@
 import yaml
 from collections import defaultdict
 import argparse
-from jinja2 import Template
+import json
+import re
+import shlex
 import textwrap
 import os
-import ruyaml
 import sys
 
+# jinja2 and ruyaml are imported where they are used: the test-env family of
+# subcommands is called from bash per app and must not pay for them at start-up.
+
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 mcs_tpl = """
 apiVersion: k0rdent.mirantis.com/v1beta1
 kind: MultiClusterService
@@ -65,6 +71,8 @@ def get_mcs_services(namespace: str, chart_data: dict, chart_values_data: dict):
 
 
 def chart_2_mcs_str(chart_dict: dict, chart_folder: str, app_name: str, app_metadata: dict):
+    from jinja2 import Template
+
     template = Template(mcs_tpl)
     chart_values_data = get_chart_values_data(chart_folder)
     namespace = app_metadata.get('test_namespace', app_name)
@@ -101,6 +109,8 @@ def get_servicetemplate_install_cmd(repo: str, charts: list) -> str:
 
 
 def init_ruyaml():
+    import ruyaml
+
     yml = ruyaml.YAML()
     yml.preserve_quotes = True
     yml.indent(mapping=4, sequence=4, offset=2)
@@ -214,41 +224,62 @@ def charts_2_verify_code(charts: list) -> str:
     return cmd
 
 
+def get_test_vars(app: str) -> dict:
+    """All test env vars of an app from its data.yaml. Absent wait settings are empty strings."""
+    with open(f"apps/{app}/data.yaml", "r", encoding='utf-8') as file:
+        app_data = yaml.load(file, Loader=YamlLoader) or {}
+    default = app_data.get('type', 'app') != 'infra'
+    return {
+        "INSTALL_SERVICETEMPLATES": str(app_data.get('test_install_servicetemplates', default)).lower(),
+        "DEPLOY_CHART": str(app_data.get('test_deploy_chart', False)).lower(),
+        "DEPLOY_MULTICLUSTERSERVICE": str(app_data.get('test_deploy_multiclusterservice', default)).lower(),
+        "CHECK_IMAGES": str(app_data.get('test_check_images', default)).lower(),
+        "WAIT_FOR_PODS": str(app_data.get('test_wait_for_pods', '')),
+        "WAIT_FOR_RUNNING": str(app_data.get('test_wait_for_running', '')).lower(),
+        "WAIT_FOR_CREATING": str(app_data.get('test_wait_for_creating', '')).lower(),
+    }
+
+
+def env_prefix(app: str) -> str:
+    """'cert-manager' -> 'CERT_MANAGER_'"""
+    return re.sub(r'[^A-Za-z0-9]', '_', app).upper() + "_"
+
+
+def test_env(args):
+    test_vars = {app: get_test_vars(app) for app in args.apps}
+    if args.format == "json":
+        print(json.dumps(test_vars, indent=2))
+        return
+    # A single app's vars are printed as is, several apps' are prefixed with the app name
+    prefixed = len(args.apps) > 1
+    for app, app_vars in test_vars.items():
+        for name, value in app_vars.items():
+            name = env_prefix(app) + name if prefixed else name
+            print(f"{name}={shlex.quote(value)}")
+
+
 def print_test_vars(args):
-    app = args.app
-    app_data = get_app_data(app)
-    default = True
-    if app_data.get('type', 'app') == 'infra':
-        default = False
-    test_install_servicetemplates = str(app_data.get('test_install_servicetemplates', default)).lower()
-    print(f"INSTALL_SERVICETEMPLATES={test_install_servicetemplates}")
-    test_deploy_chart = str(app_data.get('test_deploy_chart', False)).lower()
-    print(f"DEPLOY_CHART={test_deploy_chart}")
-    test_deploy_multiclusterservice = str(app_data.get('test_deploy_multiclusterservice', default)).lower()
-    print(f"DEPLOY_MULTICLUSTERSERVICE={test_deploy_multiclusterservice}")
-    test_check_images = str(app_data.get('test_check_images', default)).lower()
-    print(f"CHECK_IMAGES={test_check_images}")
+    test_vars = get_test_vars(args.app)
+    for name in ("INSTALL_SERVICETEMPLATES", "DEPLOY_CHART", "DEPLOY_MULTICLUSTERSERVICE", "CHECK_IMAGES"):
+        print(f"{name}={test_vars[name]}")
 
 
 def get_wait_for_pods(args):
-    app = args.app
-    app_data = get_app_data(app)
-    if 'test_wait_for_pods' in app_data:
-        print(f"{app_data['test_wait_for_pods']}")
+    value = get_test_vars(args.app)["WAIT_FOR_PODS"]
+    if value:
+        print(value)
 
 
 def get_wait_for_running(args):
-    app = args.app
-    app_data = get_app_data(app)
-    if 'test_wait_for_running' in app_data:
-        print(f"{app_data['test_wait_for_running']}".lower())
+    value = get_test_vars(args.app)["WAIT_FOR_RUNNING"]
+    if value:
+        print(value)
 
 
 def get_wait_for_creating(args):
-    app = args.app
-    app_data = get_app_data(app)
-    if 'test_wait_for_creating' in app_data:
-        print(f"{app_data['test_wait_for_creating']}".lower())
+    value = get_test_vars(args.app)["WAIT_FOR_CREATING"]
+    if value:
+        print(value)
 
 
 def try_add_charts_data(app: str, metadata: dict):
@@ -328,5 +359,12 @@ if __name__ == '__main__':
     get_creating.add_argument("app")
     get_creating.set_defaults(func=get_wait_for_creating)
 
+    env = subparsers.add_parser("test-env", help="Print all testing env vars of one or more apps at once")
+    env.add_argument("apps", nargs="+", metavar="app",
+                     help="Apps; with several apps env var names are prefixed with the app name (CERT_MANAGER_...)")
+    env.add_argument("--format", choices=["env", "json"], default="env",
+                     help="Sourceable KEY=value lines or JSON keyed by app")
+    env.set_defaults(func=test_env)
+
     args = parser.parse_args()
     args.func(args)
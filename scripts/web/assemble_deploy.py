@@ -10,14 +10,29 @@ Expects:
 
 Produces:
     tsweb/deploy/ - complete deployment directory
+
+Assembly is incremental: the deploy tree is first planned as a map of
+deploy path -> source file (or generated content), then the previous deploy
+tree is synced to it. Files from dist/ and public/ are hardlinked (copied
+when on another filesystem), unchanged paths are left alone and stale ones
+removed. Deploy files may share inodes with the sources, so never edit them
+in place. Use --clean to start from an empty deploy directory.
+
+Static app detail pages are pre-rendered into the plan by render_app_pages.py;
+only pages whose inputs changed are rendered again.
 """
 
+import argparse
+import filecmp
 import json
 import os
 import shutil
 import subprocess
+import tempfile
 import yaml
 
+import render_app_pages
+
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 VERSIONS_FILE = os.path.join(ROOT_DIR, 'versions.yaml')
 DIST_DIR = os.path.join(ROOT_DIR, 'tsweb', 'dist')
@@ -27,113 +42,202 @@ SPA_ROUTES = ['contribute', 'solutions', 'infra', 'configurator']
 REDIRECT_HTML = '<html><head><meta http-equiv="refresh" content="0;url=latest/"></head></html>'
 
 
-def create_spa_stubs(target_dir: str):
+# ---------------------------------------------------------------------------
+# Plan: deploy relative path -> source file path (str) or content (bytes)
+# ---------------------------------------------------------------------------
+
+def plan_tree(plan: dict, dst: str, src: str):
+    """Plan all files of src directory under dst."""
+    for dirpath, _, filenames in os.walk(src):
+        rel_dir = os.path.relpath(dirpath, src)
+        for name in filenames:
+            plan[os.path.normpath(os.path.join(dst, rel_dir, name))] = os.path.join(dirpath, name)
+
+
+def create_spa_stubs(plan: dict, target_dir: str):
     """Place index.html at known SPA routes so direct URL access works."""
     index_html = os.path.join(DIST_DIR, 'index.html')
     for route in SPA_ROUTES:
-        route_dir = os.path.join(target_dir, route)
-        os.makedirs(route_dir, exist_ok=True)
-        shutil.copy2(index_html, os.path.join(route_dir, 'index.html'))
-
+        plan[os.path.join(target_dir, route, 'index.html')] = index_html
 
-def add_latest():
-    """Copy SPA bundle into /latest/ with 404 fallbacks and route stubs."""
-    latest_dir = os.path.join(DEPLOY_DIR, 'latest')
-    os.makedirs(latest_dir, exist_ok=True)
 
+def add_latest(plan: dict):
+    """SPA bundle into /latest/ with 404 fallbacks and route stubs."""
     # SPA bundle
-    for item in os.listdir(DIST_DIR):
-        src = os.path.join(DIST_DIR, item)
-        dst = os.path.join(latest_dir, item)
-        if os.path.isdir(src):
-            shutil.copytree(src, dst, dirs_exist_ok=True)
-        else:
-            shutil.copy2(src, dst)
+    plan_tree(plan, 'latest', DIST_DIR)
 
     # 404 fallbacks
     index_html = os.path.join(DIST_DIR, 'index.html')
-    shutil.copy2(index_html, os.path.join(DEPLOY_DIR, '404.html'))
-    shutil.copy2(index_html, os.path.join(latest_dir, '404.html'))
+    plan['404.html'] = index_html
+    plan[os.path.join('latest', '404.html')] = index_html
 
     # Root redirect
-    with open(os.path.join(DEPLOY_DIR, 'index.html'), 'w') as f:
-        f.write(REDIRECT_HTML)
+    plan['index.html'] = REDIRECT_HTML.encode()
 
-    create_spa_stubs(latest_dir)
+    create_spa_stubs(plan, 'latest')
 
     # versions.json
     versions_json = os.path.join(PUBLIC_DIR, 'versions.json')
     if os.path.exists(versions_json):
-        shutil.copy2(versions_json, os.path.join(latest_dir, 'versions.json'))
+        plan[os.path.join('latest', 'versions.json')] = versions_json
 
 
-def add_versions(cfg: dict):
-    """Copy versioned data and create SPA stubs per version."""
+def add_versions(plan: dict, cfg: dict):
+    """Versioned data and SPA stubs per version."""
     index_html = os.path.join(DIST_DIR, 'index.html')
     versions_json = os.path.join(PUBLIC_DIR, 'versions.json')
 
     for v in cfg['versions']:
         src = os.path.join(PUBLIC_DIR, v)
-        dst = os.path.join(DEPLOY_DIR, v)
         if not os.path.exists(src):
             continue
 
-        shutil.copytree(src, dst, dirs_exist_ok=True)
+        plan_tree(plan, v, src)
 
         # SPA for direct URL access
-        shutil.copy2(index_html, os.path.join(dst, 'index.html'))
-        shutil.copy2(index_html, os.path.join(dst, '404.html'))
+        plan[os.path.join(v, 'index.html')] = index_html
+        plan[os.path.join(v, '404.html')] = index_html
 
-        # SPA assets
+        # SPA assets, unless the version data brings its own
         assets_src = os.path.join(DIST_DIR, 'assets')
-        assets_dst = os.path.join(dst, 'assets')
-        if os.path.exists(assets_src) and not os.path.exists(assets_dst):
-            shutil.copytree(assets_src, assets_dst)
+        if os.path.exists(assets_src) and not os.path.exists(os.path.join(src, 'assets')):
+            plan_tree(plan, os.path.join(v, 'assets'), assets_src)
 
-        create_spa_stubs(dst)
+        create_spa_stubs(plan, v)
 
         if os.path.exists(versions_json):
-            shutil.copy2(versions_json, os.path.join(dst, 'versions.json'))
+            plan[os.path.join(v, 'versions.json')] = versions_json
 
 
-def add_latest_data(cfg: dict):
+def add_latest_data(plan: dict, cfg: dict):
     """/latest/ gets the latest version's data and logos."""
-    latest = cfg['latest']
-    latest_src = os.path.join(PUBLIC_DIR, latest)
-    latest_deploy = os.path.join(DEPLOY_DIR, 'latest')
-
+    latest_src = os.path.join(PUBLIC_DIR, cfg['latest'])
     if os.path.exists(latest_src):
-        shutil.copytree(latest_src, latest_deploy, dirs_exist_ok=True)
+        plan_tree(plan, 'latest', latest_src)
 
-    logos_src = os.path.join(latest_src, 'logos')
-    if os.path.exists(logos_src):
-        shutil.copytree(logos_src, os.path.join(latest_deploy, 'logos'), dirs_exist_ok=True)
 
-
-def add_git_sha():
-    """Write current git commit SHA to deploy directory."""
+def add_git_sha(plan: dict):
+    """Current git commit SHA in deploy directory."""
     sha = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
-    with open(os.path.join(DEPLOY_DIR, 'sha.json'), 'w') as f:
-        json.dump({'sha': sha[:8]}, f)
+    plan['sha.json'] = json.dumps({'sha': sha[:8]}).encode()
+
+
+# ---------------------------------------------------------------------------
+# Sync
+# ---------------------------------------------------------------------------
+
+class SyncStats:
+    def __init__(self):
+        self.linked = self.linked_bytes = 0
+        self.copied = self.copied_bytes = 0
+        self.unchanged = self.removed = 0
+
+    def __str__(self):
+        return (f"{self.linked} files linked ({self.linked_bytes / 1e6:.1f} MB), "
+                f"{self.copied} copied or written ({self.copied_bytes / 1e6:.1f} MB), "
+                f"{self.unchanged} unchanged, {self.removed} removed")
+
+
+def _replace(dst: str, write):
+    """Atomically replace dst with a file created by write(tmp_path)."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dst), prefix='.tmp-')
+    os.close(fd)
+    os.unlink(tmp)
+    try:
+        write(tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def sync_file(dst: str, source, stats: SyncStats):
+    if os.path.isdir(dst) and not os.path.islink(dst):
+        shutil.rmtree(dst)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    exists = os.path.isfile(dst)
+
+    if isinstance(source, bytes):
+        if exists and os.path.getsize(dst) == len(source):
+            with open(dst, 'rb') as f:
+                if f.read() == source:
+                    stats.unchanged += 1
+                    return
+
+        def write(tmp):
+            with open(tmp, 'wb') as f:
+                f.write(source)
+        _replace(dst, write)
+        stats.copied += 1
+        stats.copied_bytes += len(source)
+        return
+
+    if exists and os.path.samefile(source, dst):
+        stats.unchanged += 1
+        return
+    size = os.path.getsize(source)
+    try:
+        _replace(dst, lambda tmp: os.link(source, tmp))
+        stats.linked += 1
+        stats.linked_bytes += size
+    except OSError:
+        # Different filesystem: fall back to copying changed files
+        if exists and filecmp.cmp(source, dst, shallow=False):
+            stats.unchanged += 1
+            return
+        _replace(dst, lambda tmp: shutil.copy2(source, tmp))
+        stats.copied += 1
+        stats.copied_bytes += size
+
+
+def remove_stale(plan: dict, stats: SyncStats):
+    """Remove files and directories of the previous deploy tree that are not planned anymore."""
+    for dirpath, dirnames, filenames in os.walk(DEPLOY_DIR, topdown=False):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if os.path.relpath(path, DEPLOY_DIR) not in plan:
+                os.unlink(path)
+                stats.removed += 1
+        if dirpath != DEPLOY_DIR and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+
+def sync(plan: dict) -> SyncStats:
+    stats = SyncStats()
+    os.makedirs(DEPLOY_DIR, exist_ok=True)
+    remove_stale(plan, stats)
+    for rel_path, source in plan.items():
+        sync_file(os.path.join(DEPLOY_DIR, rel_path), source, stats)
+    return stats
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Assemble tsweb/deploy from SPA build and catalog data')
+    parser.add_argument('--clean', action='store_true', help='Remove the previous deploy tree first')
+    args = parser.parse_args()
+
     os.chdir(ROOT_DIR)
 
     print("==> Assembling deploy folder...")
 
-    if os.path.exists(DEPLOY_DIR):
+    if args.clean and os.path.exists(DEPLOY_DIR):
         shutil.rmtree(DEPLOY_DIR)
 
     with open(VERSIONS_FILE) as f:
         cfg = yaml.safe_load(f)
 
-    add_latest()
-    add_versions(cfg)
-    add_latest_data(cfg)
-    add_git_sha()
+    plan = {}
+    add_latest(plan)
+    add_versions(plan, cfg)
+    add_latest_data(plan, cfg)
+    rendered, reused = render_app_pages.add_app_pages(plan, cfg, DEPLOY_DIR)
+    add_git_sha(plan)
+    stats = sync(plan)
 
     print(f"  Assembled {len(cfg['versions'])} versions, latest={cfg['latest']}")
+    print(f"  App pages: {rendered} rendered, {reused} unchanged")
+    print(f"  {stats}")
     print("==> Deploy folder assembled.")
 
 
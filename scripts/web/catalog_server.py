@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""Catalog query service over the generated catalog JSON.
+
+Optional HTTP service (asyncio, standard library only) for tooling that
+otherwise downloads catalog.json/index.json and filters it client side. It
+loads every version's catalog.json (apps and infra) and index.json from the
+build output into in-memory indexes by tag, support tier, validation target
+and chart name, and answers filtered, sorted and paginated queries. Responses
+carry an ETag and honour If-None-Match. The build output is polled and
+reloaded when it changes; queries keep being served from the previous data
+until the new one is loaded.
+
+Run it standalone or next to nginx in the site container, proxying /api/ to it:
+
+    location /api/ { proxy_pass http://127.0.0.1:8090; }
+
+Endpoints:
+    GET /healthz
+    GET /api/versions
+    GET /api/<version|latest>/apps       ?tag=&support=&validated=&chart=&type=&q=&sort=&page=&per_page=
+    GET /api/<version|latest>/apps/<name>
+    GET /api/<version|latest>/facets     # values with app counts, for filter UIs
+
+Repeated tag and validated parameters must all match, repeated support, chart
+and type parameters match any. sort is a field (name, title, stars, pulls,
+created, lastUpdated), '-' prefixed for descending order.
+
+Usage:
+    python3 scripts/web/catalog_server.py
+    curl 'localhost:8090/api/latest/apps?tag=Security&validated=aws&sort=-stars&per_page=10'
+
+Environment variables:
+    CATALOG_DATA_DIR        - build output with versions.json and <version>/catalog.json (default: tsweb/public)
+    CATALOG_HOST            - listen address (default: 127.0.0.1)
+    CATALOG_PORT            - listen port (default: 8090)
+    CATALOG_RELOAD_INTERVAL - seconds between build output checks (default: 5)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import traceback
+from urllib.parse import parse_qs, unquote, urlsplit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.environ.get('CATALOG_DATA_DIR', os.path.join(ROOT_DIR, 'tsweb', 'public'))
+HOST = os.environ.get('CATALOG_HOST', '127.0.0.1')
+PORT = int(os.environ.get('CATALOG_PORT', '8090'))
+RELOAD_INTERVAL = float(os.environ.get('CATALOG_RELOAD_INTERVAL', '5'))
+
+SORT_FIELDS = ['name', 'title', 'stars', 'pulls', 'created', 'lastUpdated']
+PER_PAGE_DEFAULT = 50
+PER_PAGE_MAX = 500
+VERSION_RE = re.compile(r'^v\d+\.\d+\.\d+$')
+
+
+class QueryError(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Indexes
+# ---------------------------------------------------------------------------
+
+class VersionIndex:
+    """One version's catalog entries, indexed by tag, support, validation target, chart and type."""
+
+    def __init__(self, version: str, catalog: dict, index: dict | None, digest: str):
+        self.version = version
+        self.digest = digest
+        self.items = {e['name']: e for e in catalog.get('apps', []) + catalog.get('infra', [])}
+        self.by_tag, self.by_support, self.by_validated = {}, {}, {}
+        self.by_chart, self.by_type = {}, {}
+        for name, e in self.items.items():
+            for tag in e.get('tags', []):
+                self.by_tag.setdefault(tag.casefold(), set()).add(name)
+            self.by_support.setdefault(e.get('support', '').casefold(), set()).add(name)
+            for target, value in (e.get('validated') or {}).items():
+                if value == 'y':
+                    self.by_validated.setdefault(target.casefold(), set()).add(name)
+            if e.get('chartName'):
+                self.by_chart.setdefault(e['chartName'].casefold(), set()).add(name)
+            self.by_type.setdefault(e.get('type', 'app').casefold(), set()).add(name)
+        # index.json lists every chart of an addon, not only the first one
+        for addon in (index or {}).get('addons', []):
+            if addon.get('name') not in self.items:
+                continue
+            for chart in addon.get('charts') or []:
+                if chart.get('name'):
+                    self.by_chart.setdefault(chart['name'].casefold(), set()).add(addon['name'])
+        self.sorted_names = {field: sorted(self.items, key=lambda n, f=field: (_sort_key(self.items[n], f), n))
+                             for field in SORT_FIELDS}
+
+    def query(self, params: dict[str, list[str]]) -> dict:
+        names = set(self.items)
+        for param, index in (('tag', self.by_tag), ('validated', self.by_validated)):
+            for value in params.get(param, []):
+                names &= index.get(value.casefold(), set())
+        for param, index in (('support', self.by_support), ('chart', self.by_chart), ('type', self.by_type)):
+            values = params.get(param)
+            if values:
+                names &= set().union(*(index.get(v.casefold(), set()) for v in values))
+        text = _single(params, 'q', '').casefold()
+        if text:
+            names = {n for n in names if any(text in str(self.items[n].get(f, '')).casefold()
+                                             for f in ('name', 'title', 'desc'))}
+
+        sort = _single(params, 'sort', 'name')
+        field = sort.lstrip('-')
+        if field not in SORT_FIELDS:
+            raise QueryError(f"sort must be one of {', '.join(SORT_FIELDS)}, optionally '-' prefixed")
+        ordered = [n for n in self.sorted_names[field] if n in names]
+        if sort.startswith('-'):
+            ordered.reverse()
+
+        page = _int_param(params, 'page', 1, 1)
+        per_page = _int_param(params, 'per_page', PER_PAGE_DEFAULT, 1, PER_PAGE_MAX)
+        start = (page - 1) * per_page
+        return {
+            'version': self.version,
+            'total': len(ordered),
+            'page': page,
+            'per_page': per_page,
+            'items': [self.items[n] for n in ordered[start:start + per_page]],
+        }
+
+    def facets(self) -> dict:
+        def counts(index):
+            return {k: len(v) for k, v in sorted(index.items())}
+        tags = {}
+        for e in self.items.values():
+            for tag in e.get('tags', []):
+                tags[tag] = tags.get(tag, 0) + 1
+        return {
+            'version': self.version,
+            'tags': dict(sorted(tags.items())),
+            'support': counts(self.by_support),
+            'validated': counts(self.by_validated),
+            'type': counts(self.by_type),
+            'charts': counts(self.by_chart),
+        }
+
+
+def _sort_key(entry: dict, field: str):
+    value = entry.get(field)
+    if field in ('stars', 'pulls'):
+        return value or 0
+    return str(value or '').casefold()
+
+
+def _single(params: dict, name: str, default: str) -> str:
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _int_param(params: dict, name: str, default: int, low: int, high: int | None = None) -> int:
+    try:
+        value = int(_single(params, name, str(default)))
+    except ValueError:
+        raise QueryError(f"{name} must be an integer") from None
+    if value < low or (high is not None and value > high):
+        raise QueryError(f"{name} must be between {low} and {high}" if high else f"{name} must be >= {low}")
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+def _read(path: str) -> bytes | None:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def data_signature(data_dir: str) -> tuple:
+    """mtimes and sizes of the files the catalog is loaded from."""
+    paths = [os.path.join(data_dir, 'versions.json')]
+    if os.path.isdir(data_dir):
+        for name in sorted(n for n in os.listdir(data_dir) if VERSION_RE.match(n)):
+            paths += [os.path.join(data_dir, name, 'catalog.json'), os.path.join(data_dir, name, 'index.json')]
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        signature.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def load_catalog(data_dir: str) -> tuple[dict, dict[str, VersionIndex]]:
+    """(versions.json content, version -> index). Versions without catalog.json are left out."""
+    raw = _read(os.path.join(data_dir, 'versions.json'))
+    if raw:
+        versions_cfg = json.loads(raw)
+    else:
+        found = sorted(n for n in os.listdir(data_dir) if VERSION_RE.match(n))
+        versions_cfg = {'versions': found, 'latest': found[-1] if found else ''}
+
+    indexes = {}
+    for version in versions_cfg.get('versions', []):
+        catalog_raw = _read(os.path.join(data_dir, version, 'catalog.json'))
+        if catalog_raw is None:
+            continue
+        index_raw = _read(os.path.join(data_dir, version, 'index.json'))
+        digest = hashlib.sha256(catalog_raw + b'\0' + (index_raw or b'')).hexdigest()
+        indexes[version] = VersionIndex(version, json.loads(catalog_raw),
+                                        json.loads(index_raw) if index_raw else None, digest)
+    return versions_cfg, indexes
+
+
+class Catalog:
+    """Current catalog data, swapped as a whole on reload."""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.signature = None
+        self.versions_cfg = {}
+        self.indexes = {}
+        self.loaded = None
+
+    def reload(self) -> bool:
+        signature = data_signature(self.data_dir)
+        if signature == self.signature:
+            return False
+        versions_cfg, indexes = load_catalog(self.data_dir)
+        self.versions_cfg, self.indexes, self.signature = versions_cfg, indexes, signature
+        self.loaded = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        return True
+
+    def get(self, version: str) -> VersionIndex | None:
+        if version == 'latest':
+            version = self.versions_cfg.get('latest', '')
+        return self.indexes.get(version)
+
+    async def watch(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await asyncio.to_thread(self.reload):
+                    print(f"Reloaded catalog: {len(self.indexes)} versions")
+            except Exception as e:  # noqa: BLE001 - malformed data must not stop the watcher
+                print(f"::warning::Catalog reload failed, keeping previous data: {e}", file=sys.stderr)
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           414: 'URI Too Long', 500: 'Internal Server Error'}
+
+
+def _etag(*parts: str) -> str:
+    return 'W/"' + hashlib.sha256('\0'.join(parts).encode()).hexdigest()[:32] + '"'
+
+
+def handle(catalog: Catalog, method: str, target: str, headers: dict) -> tuple[int, dict, bytes]:
+    """Route a request: (status, extra headers, JSON body)."""
+    if method not in ('GET', 'HEAD'):
+        return 405, {'Allow': 'GET, HEAD'}, _json({'error': 'method not allowed'})
+    url = urlsplit(target)
+    path = [unquote(p) for p in url.path.strip('/').split('/') if p]
+    params = parse_qs(url.query)
+
+    if path == ['healthz']:
+        return 200, {}, _json({'status': 'ok', 'versions': len(catalog.indexes), 'loaded': catalog.loaded})
+    if path[:1] != ['api'] or len(path) < 2:
+        return 404, {}, _json({'error': 'not found'})
+    if path[1:] == ['versions']:
+        etag = _etag('versions', *(i.digest for i in catalog.indexes.values()), json.dumps(catalog.versions_cfg))
+        return _cached(headers, etag, lambda: catalog.versions_cfg)
+
+    index = catalog.get(path[1])
+    if index is None:
+        return 404, {}, _json({'error': f"unknown version '{path[1]}'"})
+    rest = path[2:]
+    if rest == ['apps']:
+        query = sorted((k, v) for k, values in params.items() for v in values)
+        return _cached(headers, _etag(index.digest, 'apps', json.dumps(query)), lambda: index.query(params))
+    if len(rest) == 2 and rest[0] == 'apps':
+        if rest[1] not in index.items:
+            return 404, {}, _json({'error': f"unknown app '{rest[1]}'"})
+        return _cached(headers, _etag(index.digest, 'app', rest[1]), lambda: index.items[rest[1]])
+    if rest == ['facets']:
+        return _cached(headers, _etag(index.digest, 'facets'), index.facets)
+    return 404, {}, _json({'error': 'not found'})
+
+
+def _cached(headers: dict, etag: str, build) -> tuple[int, dict, bytes]:
+    if_none_match = headers.get('if-none-match', '')
+    if etag in [t.strip() for t in if_none_match.split(',')] or if_none_match.strip() == '*':
+        return 304, {'ETag': etag}, b''
+    try:
+        body = _json(build())
+    except QueryError as e:
+        return 400, {}, _json({'error': str(e)})
+    return 200, {'ETag': etag, 'Cache-Control': 'no-cache'}, body
+
+
+def _json(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+async def _respond(writer: asyncio.StreamWriter, status: int, extra: dict, body: bytes, keep_alive: bool,
+                   send_body: bool = True):
+    head = [f'HTTP/1.1 {status} {REASONS[status]}',
+            f'Content-Length: {len(body)}',
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if body:
+        head.append('Content-Type: application/json; charset=utf-8')
+    head += [f'{k}: {v}' for k, v in extra.items()]
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+    if send_body:
+        writer.write(body)
+    await writer.drain()
+
+
+async def serve_connection(catalog: Catalog, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            # readline raises ValueError for lines over the stream limit
+            try:
+                request_line = await reader.readline()
+            except ValueError:
+                await _respond(writer, 414, {}, _json({'error': 'request line too long'}), keep_alive=False)
+                break
+            if not request_line:
+                break
+            try:
+                method, target, version = request_line.decode('latin-1').split()
+            except ValueError:
+                break
+            headers = {}
+            try:
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+            except ValueError:
+                await _respond(writer, 400, {}, _json({'error': 'header line too long'}), keep_alive=False)
+                break
+            keep_alive = (headers.get('connection', '').lower() != 'close'
+                          and (version == 'HTTP/1.1' or headers.get('connection', '').lower() == 'keep-alive'))
+            # Request bodies are not used, but must not be read as the next request
+            length = headers.get('content-length') or '0'
+            if not length.isdecimal():
+                # The request end is unknown, so the connection cannot be reused
+                status, extra, body = 400, {}, _json({'error': 'invalid Content-Length'})
+                keep_alive = False
+            else:
+                if int(length):
+                    await reader.readexactly(int(length))
+                try:
+                    status, extra, body = handle(catalog, method, target, headers)
+                except Exception:  # noqa: BLE001 - answer 500 instead of dropping the connection
+                    traceback.print_exc()
+                    status, extra, body = 500, {}, _json({'error': 'internal error'})
+            await _respond(writer, status, extra, body, keep_alive, send_body=method != 'HEAD')
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def main():
+    catalog = Catalog(DATA_DIR)
+    catalog.reload()
+    print(f"Loaded {len(catalog.indexes)} versions from {DATA_DIR}")
+    server = await asyncio.start_server(lambda r, w: serve_connection(catalog, r, w), HOST, PORT)
+    print(f"Serving catalog queries on http://{HOST}:{PORT}/api/")
+    watcher = asyncio.create_task(catalog.watch(RELOAD_INTERVAL))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+
+
+if __name__ == '__main__':
+    if not os.path.isdir(DATA_DIR):
+        sys.exit(f"Catalog data directory {DATA_DIR} not found: build the catalog data first "
+                 "(scripts/web/build_catalog_data.py) or set CATALOG_DATA_DIR")
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
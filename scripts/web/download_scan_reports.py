@@ -2,88 +2,199 @@
 """Download latest scan report artifacts from GitHub Actions.
 
 Finds the most recent successful run of helm-app-scan.yml and downloads
-all scan-report-* artifacts into scan-reports/{app}/.
+its scan report artifacts into scan-reports/{app}/: per-shard
+scan-reports-shard-* artifacts holding one directory per app, and per-app
+scan-report-{app} artifacts from older runs.
+
+Artifacts are listed page by page and downloaded concurrently over a shared
+keep-alive connection pool; each zip is streamed to disk, checked against
+the artifact digest and extracted with zipfile, with a bounded number of
+retries per artifact.
+
+Syncing is incremental: {OUTPUT_DIR}/.sync.json records the run id and each
+artifact's id, size, digest and apps. Artifacts already synced are skipped,
+so a rebuild without a new scan run transfers nothing but the run lookup,
+and app directories whose artifacts disappeared are removed.
 
 Requires:
     GH_TOKEN environment variable (GitHub token with actions:read)
-    gh CLI installed
 
 Environment variables:
     GITHUB_REPOSITORY  - owner/repo (e.g. k0rdent/catalog)
-    GH_TOKEN           - GitHub token for API access
+    GH_TOKEN           - GitHub token for API access (GITHUB_TOKEN is used as a fallback)
+    GITHUB_API_URL     - API endpoint (default: https://api.github.com), may point to a local stand-in
+    OUTPUT_DIR         - directory for scan reports (default: scan-reports)
+    DOWNLOAD_JOBS      - concurrent artifact downloads (default: 8)
 """
 
+import concurrent.futures
+import hashlib
 import json
 import os
 import shutil
-import subprocess
 import sys
 import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import fsutil
+import scan_report
+from http_pool import HTTPError, HTTPPool
+
+API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+PER_PAGE = 100
+MAX_ATTEMPTS = 3
+MANIFEST_FILE = ".sync.json"
+
+
+class GitHubAPI:
+    def __init__(self, repo: str, token: str, pool: HTTPPool | None = None):
+        self.repo = repo
+        self.pool = pool or HTTPPool(timeout=60, max_idle_per_host=16)
+        self.headers = {"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
 
+    def url(self, path: str) -> str:
+        return f"{API_URL}/repos/{self.repo}/{path}"
 
-def run(cmd: list[str]) -> subprocess.CompletedProcess:
-    return subprocess.run(cmd, capture_output=True, text=True)
+    def get_json(self, path: str) -> dict:
+        resp = self.pool.get(self.url(path), headers=self.headers)
+        resp.raise_for_status()
+        return json.loads(resp.read())
 
 
-def get_latest_scan_run(repo: str) -> dict | None:
+def get_latest_scan_run(api: GitHubAPI) -> dict | None:
     """Find the latest successful run of helm-app-scan.yml. Returns {id, created_at} or None."""
-    res = run(["gh", "api",
-               f"repos/{repo}/actions/workflows/helm-app-scan.yml/runs?status=success&per_page=1",
-               "--jq", '.workflow_runs[0] | {id: .id, created_at: .created_at}'])
-    if res.returncode != 0 or not res.stdout.strip():
+    try:
+        data = api.get_json("actions/workflows/helm-app-scan.yml/runs?status=success&per_page=1")
+    except (HTTPError, OSError, ValueError) as e:
+        print(f"  Warning: failed to list scan runs: {e}")
         return None
-    data = json.loads(res.stdout.strip())
-    if not data.get("id"):
+    runs = data.get("workflow_runs") or []
+    if not runs or not runs[0].get("id"):
         return None
-    return data
+    return {"id": runs[0]["id"], "created_at": runs[0].get("created_at")}
 
 
-def list_scan_artifacts(repo: str, run_id: str) -> list[dict]:
-    """List all scan-report-* artifacts from a workflow run."""
-    res = run(["gh", "api",
-               f"repos/{repo}/actions/runs/{run_id}/artifacts?per_page=100",
-               "--jq", '.artifacts[] | select(.name | startswith("scan-report-")) | {"name": .name, "id": .id}'])
-    if res.returncode != 0 or not res.stdout.strip():
-        return []
+def list_scan_artifacts(api: GitHubAPI, run_id: str) -> list[dict] | None:
+    """List all scan report artifacts from a workflow run, following pagination. None if listing failed."""
     artifacts = []
-    for line in res.stdout.strip().split("\n"):
-        if line.strip():
-            artifacts.append(json.loads(line))
-    return artifacts
-
-
-def download_artifact(repo: str, artifact: dict, output_dir: str):
-    """Download and unzip a single scan artifact."""
+    page = 1
+    while True:
+        try:
+            data = api.get_json(f"actions/runs/{run_id}/artifacts?per_page={PER_PAGE}&page={page}")
+        except (HTTPError, OSError, ValueError) as e:
+            print(f"::warning::Failed to list scan artifacts of run {run_id}: {e}")
+            return None
+        items = data.get("artifacts") or []
+        artifacts.extend(
+            {"name": a["name"], "id": a["id"], "size": a.get("size_in_bytes", 0), "digest": a.get("digest", "")}
+            for a in items if a["name"].startswith("scan-report") and not a.get("expired")
+        )
+        total = data.get("total_count")
+        if len(items) < PER_PAGE or (total is not None and page * PER_PAGE >= total):
+            return artifacts
+        page += 1
+
+
+def _fetch_zip(api: GitHubAPI, artifact_id, dst) -> str:
+    """Stream an artifact zip into an open file and return its sha256. The API redirects to blob storage."""
+    dst.seek(0)
+    dst.truncate()
+    sha256 = hashlib.sha256()
+    with api.pool.get(api.url(f"actions/artifacts/{artifact_id}/zip"), headers=api.headers, stream=True) as resp:
+        resp.raise_for_status()
+        for chunk in resp.iter_content():
+            sha256.update(chunk)
+            dst.write(chunk)
+    dst.flush()
+    return f"sha256:{sha256.hexdigest()}"
+
+
+def _artifact_app(name: str) -> str | None:
+    """App of a per-app scan-report-{app} artifact, None for shard artifacts holding many apps."""
+    if name.startswith("scan-reports-shard-"):
+        return None
+    return name.removeprefix("scan-report-")
+
+
+def _extract(zf: zipfile.ZipFile, artifact: dict, output_dir: str) -> list[str]:
+    """Replace the app directories an artifact covers with its contents. Returns those apps."""
+    app = _artifact_app(artifact["name"])
+    if app:
+        apps, dest_dir = [app], os.path.join(output_dir, app)
+    else:
+        apps = sorted({m.split("/", 1)[0] for m in zf.namelist() if "/" in m})
+        dest_dir = output_dir
+    for a in apps:
+        shutil.rmtree(os.path.join(output_dir, a), ignore_errors=True)
+    os.makedirs(dest_dir, exist_ok=True)
+    zf.extractall(dest_dir)
+    return apps
+
+
+def download_artifact(api: GitHubAPI, artifact: dict, output_dir: str) -> list[str] | None:
+    """Download, verify and extract a single scan artifact. Returns the apps it contained, None on failure."""
     name = artifact["name"]
-    artifact_id = artifact["id"]
-    app = name.removeprefix("scan-report-")
-
-    app_dir = os.path.join(output_dir, app)
-    os.makedirs(app_dir, exist_ok=True)
-
-    tmp = tempfile.NamedTemporaryFile(suffix=".zip", delete=False)
-    tmp.close()
-
-    res = subprocess.run(
-        ["gh", "api", f"repos/{repo}/actions/artifacts/{artifact_id}/zip"],
-        capture_output=True)
-    if res.returncode != 0:
-        print(f"  Warning: failed to download {name}")
-        os.unlink(tmp.name)
-        return
-
-    with open(tmp.name, "wb") as f:
-        f.write(res.stdout)
-
-    subprocess.run(["unzip", "-o", tmp.name, "-d", app_dir], capture_output=True)
-    os.unlink(tmp.name)
-
-    summarize_app(app, app_dir)
+    with tempfile.TemporaryFile(suffix=".zip") as tmp:
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                digest = _fetch_zip(api, artifact["id"], tmp)
+                if artifact.get("digest") and digest != artifact["digest"]:
+                    raise ValueError(f"digest mismatch: expected {artifact['digest']}, got {digest}")
+                with zipfile.ZipFile(tmp) as zf:
+                    return _extract(zf, artifact, output_dir)
+            except (HTTPError, OSError, ValueError, zipfile.BadZipFile) as e:
+                if attempt == MAX_ATTEMPTS or (isinstance(e, HTTPError) and e.status < 500 and e.status != 429):
+                    print(f"  Warning: failed to download {name}: {e}")
+                    return None
+                time.sleep(2 ** attempt)
+
+
+# ---------------------------------------------------------------------------
+# Sync manifest
+# ---------------------------------------------------------------------------
+
+def load_manifest(output_dir: str) -> dict:
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(output_dir: str, manifest: dict):
+    fsutil.write_atomic(Path(output_dir) / MANIFEST_FILE, json.dumps(manifest, indent=2).encode())
+
+
+def _is_current(entry: dict | None, artifact: dict, output_dir: str) -> bool:
+    """True if an artifact was synced before and all of its app directories are still in place."""
+    if not entry:
+        return False
+    if any(entry.get(k) != artifact.get(k) for k in ("id", "size", "digest")):
+        return False
+    return all(os.path.isdir(os.path.join(output_dir, app)) for app in entry.get("apps", []))
+
+
+def remove_vanished(output_dir: str, previous: dict, current: dict):
+    """Delete app directories that were synced before but are no longer in any artifact."""
+    kept = {app for entry in current.values() for app in entry["apps"]}
+    for entry in previous.values():
+        for app in entry.get("apps", []):
+            if app not in kept and os.path.isdir(os.path.join(output_dir, app)):
+                print(f"  Removing {app}: no longer in the latest scan run")
+                shutil.rmtree(os.path.join(output_dir, app))
 
 
 def summarize_app(app: str, app_dir: str):
     """Print scan report files and CVE summary for an app."""
-    files = sorted(f for f in os.listdir(app_dir) if f.endswith(".json"))
+    names = set(os.listdir(app_dir))
+    # Skip raw trivy reports superseded by a compact one for the same chart version
+    files = sorted(f for f in names
+                   if scan_report.strip_suffix(f) and not (f.endswith(".json") and f + ".gz" in names))
     if not files:
         print(f"  {app}: (empty)")
         return
@@ -93,8 +204,7 @@ def summarize_app(app: str, app_dir: str):
     by_severity = {}
 
     for fname in files:
-        with open(os.path.join(app_dir, fname)) as f:
-            results = json.load(f)
+        results = scan_report.load(os.path.join(app_dir, fname))
         images = set()
         file_cves = 0
         for r in results:
@@ -121,28 +231,66 @@ def main():
         print("Error: GITHUB_REPOSITORY not set")
         sys.exit(1)
 
-    if not shutil.which("gh"):
-        print("Error: gh CLI not installed")
-        sys.exit(1)
-
     output_dir = os.environ.get("OUTPUT_DIR", "scan-reports")
+    jobs = int(os.environ.get("DOWNLOAD_JOBS", "8"))
+    api = GitHubAPI(repo, os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN", ""))
 
     print("==> Downloading latest scan reports...")
-    scan_run = get_latest_scan_run(repo)
+    scan_run = get_latest_scan_run(api)
     if not scan_run:
         print("  No successful scan workflow run found, skipping")
         return
 
     print(f"  Run ID: {scan_run['id']} ({scan_run.get('created_at', 'unknown')})")
-    artifacts = list_scan_artifacts(repo, str(scan_run["id"]))
+    manifest = load_manifest(output_dir)
+    previous = manifest.get("artifacts", {})
+    if manifest.get("run_id") == scan_run["id"] and all(
+            os.path.isdir(os.path.join(output_dir, app)) for entry in previous.values() for app in entry["apps"]):
+        print("  Scan reports are up to date")
+        return
+
+    artifacts = list_scan_artifacts(api, str(scan_run["id"]))
+    if artifacts is None:
+        print("  Keeping cached scan reports")
+        return
     if not artifacts:
         print("  No scan artifacts found")
         return
 
+    current = {}
+    pending = []
     for artifact in artifacts:
-        download_artifact(repo, artifact, output_dir)
-
-    print(f"==> Downloaded {len(artifacts)} scan reports")
+        entry = previous.get(artifact["name"])
+        if _is_current(entry, artifact, output_dir):
+            current[artifact["name"]] = entry
+        else:
+            pending.append(artifact)
+    print(f"  {len(artifacts)} artifacts, {len(artifacts) - len(pending)} unchanged")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(lambda a: download_artifact(api, a, output_dir), pending))
+    api.pool.close()
+
+    for artifact, apps in zip(pending, results):
+        if apps is not None:
+            current[artifact["name"]] = {**artifact, "apps": apps}
+        elif artifact["name"] in previous:
+            # Still in the run: keep the reports synced before, the next sync retries the download
+            current[artifact["name"]] = previous[artifact["name"]]
+
+    remove_vanished(output_dir, previous, current)
+    failed = len(pending) - sum(1 for apps in results if apps is not None)
+    save_manifest(output_dir, {
+        # a failed download must not mark the run as fully synced
+        "run_id": scan_run["id"] if not failed else None,
+        "created_at": scan_run.get("created_at"),
+        "artifacts": current,
+    })
+
+    for app in sorted({app for apps in results if apps for app in apps}):
+        summarize_app(app, os.path.join(output_dir, app))
+
+    print(f"==> Downloaded {len(pending) - failed}/{len(pending)} changed scan report artifacts")
 
 
 if __name__ == "__main__":
@@ -16,6 +16,8 @@ import yaml
 from datetime import datetime, timezone
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import api_stats
+import scan_report
 import utils
 
 CATALOG_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -115,16 +117,15 @@ def resolve_logo(app_name: str, data: dict) -> tuple[str, str | None]:
     return logo_raw, brand_color
 
 
-def read_api_stats(app_path: str) -> tuple[int, int]:
-    stars = pulls = 0
-    stars_path = os.path.join(app_path, 'stars.yaml')
-    if os.path.exists(stars_path):
-        with open(stars_path) as f:
-            stars = (yaml.safe_load(f) or {}).get('gh_stars', 0)
-    pulls_path = os.path.join(app_path, 'pulls.yaml')
-    if os.path.exists(pulls_path):
-        with open(pulls_path) as f:
-            pulls = (yaml.safe_load(f) or {}).get('gh_pulls', 0)
+_api_stats = None  # apps/_stats.json, loaded on first use and shared by all version builds
+
+
+def read_api_stats(app_name: str) -> tuple[int, int]:
+    global _api_stats
+    if _api_stats is None:
+        _api_stats = api_stats.load()
+    stars = api_stats.get(_api_stats, app_name, 'stars').get('gh_stars', 0)
+    pulls = api_stats.get(_api_stats, app_name, 'pulls').get('gh_pulls', 0)
     return stars, pulls
 
 
@@ -388,7 +389,7 @@ def process_app(app_name: str) -> dict | None:
     chart_name = charts[0]['name'] if charts else app_name
 
     logo, brand_color = resolve_logo(app_name, data)
-    stars, pulls = read_api_stats(app_path)
+    stars, pulls = read_api_stats(app_name)
 
     generate_install_json(app_name, data, app_path)
 
@@ -717,10 +718,10 @@ def _is_version_segment(s: str) -> bool:
 
 
 def _parse_scan_filename(fname: str):
-    """Parse 'cert-manager-1.20.2.json' or 'amd-gpu-operator-v1.2.2.json' -> (name, version) or None."""
-    if not fname.endswith('.json'):
+    """Parse 'cert-manager-1.20.2.json.gz' or 'amd-gpu-operator-v1.2.2.json' -> (name, version) or None."""
+    base = scan_report.strip_suffix(fname)
+    if not base:
         return None
-    base = fname[:-5]
     parts = base.split('-')
     for i in range(len(parts) - 1, 0, -1):
         if _is_version_segment(parts[i]):
@@ -737,20 +738,21 @@ def generate_scan_json(app_name: str, output_dir: str) -> bool:
     out_dir = os.path.join(output_dir, 'apps', app_name)
     os.makedirs(out_dir, exist_ok=True)
 
-    charts = {}
-    latest_mtime = 0
-    for fname in sorted(os.listdir(scan_dir)):
+    # Compact .json.gz reports win over raw trivy .json ones for the same chart version
+    reports = {}
+    for fname in sorted(os.listdir(scan_dir), key=lambda f: (not f.endswith(scan_report.SUFFIX), f)):
         parsed = _parse_scan_filename(fname)
-        if not parsed:
-            continue
-        chart_name, version = parsed
+        if parsed and parsed not in reports:
+            reports[parsed] = fname
 
+    charts = {}
+    latest_mtime = 0
+    for (chart_name, version), fname in sorted(reports.items()):
         fpath = os.path.join(scan_dir, fname)
         mtime = os.path.getmtime(fpath)
         if mtime > latest_mtime:
             latest_mtime = mtime
-        with open(fpath, 'r', encoding='utf-8') as f:
-            results = json.load(f)
+        results = scan_report.load(fpath)
 
         if chart_name not in charts:
             charts[chart_name] = {'versions': [], 'scans': {}}
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Pre-render static app detail pages from tsweb/templates.
+
+Renders app_detail.html (extends base.html) for every app and infra entry of
+every version from the already-built catalog.json and apps/<name>/install.json,
+and embeds the result into the SPA shell (dist/index.html): title and meta
+description go to <head>, the template styles to <style id="prerender-style">
+and the page body into <div id="root">. The page paints right away; the SPA
+replaces the root content when it mounts, and main.tsx then drops the
+prerender styles.
+
+Pages land where the SPA routes them, at <version>/apps/<name>/index.html and,
+for infra entries, <version>/infra/<name>/index.html (and the same under
+latest/). The SPA would otherwise be served there through the 404.html fallback.
+
+Called by assemble_deploy.py. Rendering is spread over processes, one task
+per version; a page is only re-rendered when its inputs (templates, SPA shell,
+catalog entry, install.json) changed since the previous assembly, as recorded
+in the deploy tree's .prerender.json.
+
+Usage:
+    python3 scripts/web/render_app_pages.py v1.10.0 dex   # print one page
+
+Environment variables:
+    TEMPLATES_DIR - page templates (default: tsweb/templates)
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TEMPLATES_DIR = os.environ.get('TEMPLATES_DIR', os.path.join(ROOT_DIR, 'tsweb', 'templates'))
+DIST_DIR = os.path.join(ROOT_DIR, 'tsweb', 'dist')
+PUBLIC_DIR = os.path.join(ROOT_DIR, 'tsweb', 'public')
+TEMPLATE = 'app_detail.html'
+MANIFEST = '.prerender.json'
+# Pages live at <version>/apps/<name>/ or <version>/infra/<name>/, links are relative to the version root
+BASE_PATH = '../../'
+
+
+# ---------------------------------------------------------------------------
+# Rendering
+# ---------------------------------------------------------------------------
+
+def _markup(html: str | None):
+    from markupsafe import Markup
+    return Markup(html or '')
+
+
+def page_context(entry: dict, install: dict | None, version: str) -> dict:
+    """Template variables of app_detail.html from a catalog.json entry and install.json."""
+    logo = entry.get('logo', '')
+    if logo and not logo.startswith(('http://', 'https://', '/')):
+        logo = BASE_PATH + logo
+    install = install or {}
+    latest = (install.get('versions') or [{}])[0]
+    examples = {}
+    for i, example in enumerate(install.get('examples', [])):
+        examples[str(i)] = {
+            'type': 'example',
+            'title': example.get('title', ''),
+            'content_html': _markup(example.get('contentHtml')),
+            'install_code_html': _markup(example.get('installHtml')),
+            'verify_code_html': _markup(example.get('verifyHtml')),
+            'deploy_code_html': _markup(example.get('deployHtml')),
+        }
+    return {
+        'base_path': BASE_PATH,
+        'version': version,
+        'title': entry.get('title', entry['name']),
+        'summary': entry.get('desc', ''),
+        'logo': logo,
+        'support_type': entry.get('support', 'community').capitalize(),
+        'tags': entry.get('tags', []),
+        'charts': [{'name': entry.get('chartName', entry['name']), 'versions': entry['versions']}]
+        if entry.get('versions') else [],
+        'description_html': _markup(entry.get('descriptionHtml')),
+        'show_install_tab': entry.get('showInstall', True) and bool(install),
+        'prerequisites_html': _markup(install.get('prerequisitesHtml')),
+        'install_code': bool(latest.get('installHtml')),
+        'install_code_html': _markup(latest.get('installHtml')),
+        'verify_code': bool(latest.get('verifyHtml')),
+        'verify_code_html': _markup(latest.get('verifyHtml')),
+        'deploy_code': bool(latest.get('deployHtml')),
+        'deploy_code_html': _markup(latest.get('deployHtml')),
+        'doc_link': install.get('docLink') or entry.get('doc_link', ''),
+        'examples': examples,
+    }
+
+
+def _section(pattern: str, html: str) -> str:
+    m = re.search(pattern, html, re.DOTALL)
+    return m.group(1) if m else ''
+
+
+def embed(page: str, shell: str) -> str:
+    """Put a rendered template page into the SPA shell."""
+    head = (_section(r'(<title>.*?</title>)', page)
+            + '\n    ' + _section(r'(<meta name="description"[^>]*>)', page))
+    style = _section(r'<style>(.*?)</style>', page)
+    body = _section(r'<body>(.*)</body>', page)
+    shell = re.sub(r'<title>.*?</title>', lambda _: head, shell, count=1, flags=re.DOTALL)
+    shell = shell.replace('</head>', f'<style id="prerender-style">{style}</style>\n  </head>', 1)
+    return shell.replace('<div id="root"></div>', f'<div id="root">{body}</div>', 1)
+
+
+def render_pages(version: str, pages: list[tuple[str, dict, dict | None]], shell: str) -> dict[str, bytes]:
+    """Render (page dir, catalog entry, install.json) pages of one version -> page dir: html."""
+    import jinja2
+
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(TEMPLATES_DIR), autoescape=True)
+    template = env.get_template(TEMPLATE)
+    return {page: embed(template.render(**page_context(entry, install, version)), shell).encode()
+            for page, entry, install in pages}
+
+
+# ---------------------------------------------------------------------------
+# Incremental build
+# ---------------------------------------------------------------------------
+
+def _read_json(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _templates_hash(shell: str) -> str:
+    h = hashlib.sha256(shell.encode())
+    for name in sorted(os.listdir(TEMPLATES_DIR)):
+        with open(os.path.join(TEMPLATES_DIR, name), 'rb') as f:
+            h.update(name.encode() + b'\0' + f.read())
+    return h.hexdigest()
+
+
+def version_pages(version: str, data_dir: str) -> list[tuple[str, dict, dict | None]]:
+    """(page dir, catalog entry, install.json) of the version's pages, page dir being apps/<name> or infra/<name>."""
+    catalog = _read_json(os.path.join(data_dir, 'catalog.json')) or {}
+    return [(os.path.join(section, entry['name']), entry,
+             _read_json(os.path.join(data_dir, 'apps', entry['name'], 'install.json')))
+            for section in ('apps', 'infra') for entry in catalog.get(section, [])]
+
+
+def add_app_pages(plan: dict, cfg: dict, deploy_dir: str, jobs: int | None = None) -> tuple[int, int]:
+    """Plan pre-rendered app pages of all versions. Returns (rendered, reused) page counts.
+
+    Pages whose inputs did not change are planned as the existing deploy file, which
+    the deploy sync then leaves alone.
+    """
+    shell_file = os.path.join(DIST_DIR, 'index.html')
+    if not os.path.exists(shell_file) or not os.path.isdir(TEMPLATES_DIR):
+        return 0, 0
+    with open(shell_file, encoding='utf-8') as f:
+        shell = f.read()
+    base_hash = _templates_hash(shell)
+    previous = _read_json(os.path.join(deploy_dir, MANIFEST)) or {}
+    manifest = {}
+
+    todo = {}  # version -> pages to render
+    reused = 0
+    for version in cfg['versions']:
+        for page, entry, install in version_pages(version, os.path.join(PUBLIC_DIR, version)):
+            rel = os.path.join(version, page, 'index.html')
+            key = hashlib.sha256(json.dumps([base_hash, version, entry, install], sort_keys=True).encode()).hexdigest()
+            manifest[rel] = key
+            if previous.get(rel) == key and os.path.isfile(os.path.join(deploy_dir, rel)):
+                plan[rel] = os.path.join(deploy_dir, rel)
+                reused += 1
+            else:
+                todo.setdefault(version, []).append((page, entry, install))
+
+    rendered = 0
+    if todo:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(render_pages, version, pages, shell): version for version, pages in todo.items()}
+            for future in concurrent.futures.as_completed(futures):
+                version = futures[future]
+                for page, html in future.result().items():
+                    plan[os.path.join(version, page, 'index.html')] = html
+                    rendered += 1
+
+    # /latest/ serves the latest version's data, and the same pages
+    latest = cfg['latest']
+    prefix = latest + os.sep
+    for rel in list(manifest):
+        if rel.startswith(prefix):
+            plan[os.path.join('latest', rel[len(prefix):])] = plan[rel]
+
+    plan[MANIFEST] = json.dumps(manifest, indent=1, sort_keys=True).encode()
+    return rendered, reused
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(f"Usage: {sys.argv[0]} VERSION APP")
+    version, app = sys.argv[1:]
+    with open(os.path.join(DIST_DIR, 'index.html'), encoding='utf-8') as f:
+        shell = f.read()
+    pages = [p for p in version_pages(version, os.path.join(PUBLIC_DIR, version)) if p[1]['name'] == app][:1]
+    if not pages:
+        sys.exit(f"{app} not found in {version} catalog.json")
+    sys.stdout.write(render_pages(version, pages, shell)[pages[0][0]].decode())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,12 @@
 import { createRoot } from "react-dom/client";
 import App from "./components/App.tsx";
 
-createRoot(document.getElementById("root")!).render(<App />);
+var root = document.getElementById("root")!;
+
+// Pre-rendered app pages (render_app_pages.py) carry their own styles until the SPA takes over the root
+var prerenderStyle = document.getElementById("prerender-style");
+if (prerenderStyle) {
+  new MutationObserver(function(_, observer){ prerenderStyle!.remove(); observer.disconnect(); }).observe(root, { childList: true });
+}
+
+createRoot(root).render(<App />);